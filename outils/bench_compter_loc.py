@@ -0,0 +1,315 @@
+"""Mesure les performances de compter_loc.py sur un corpus Java synthétique.
+
+Le corpus est généré de façon déterministe (graine fixe) avec un nombre de fichiers, une
+taille, une densité de commentaires, une profondeur d'imbrication, un nombre d'annotations
+par signature et un nombre de paquets paramétrables. Chaque étape de l'analyse est chronométrée
+séparément et rapportée en fichiers/s et Mo/s. Les étapes préfixées par `compatibilité:`
+mesurent les anciennes fonctions `extraire_classes` et `extraire_méthodes`, gardées pour les
+appelants existants : elles relexent le texte et ne reflètent pas le chemin de production,
+mesuré par `analyser_structure` et `analyser_fichier`.
+
+Les résultats peuvent être enregistrés comme référence JSON ; une exécution ultérieure
+comparée à cette référence échoue (code de sortie 1) si une étape régresse au-delà du seuil,
+ou si les étapes mesurées ne sont plus celles de la référence.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import compter_loc
+
+
+@dataclass(frozen=True)
+class ParamètresCorpus:
+    nb_fichiers: int = 200
+    lignes_par_fichier: int = 300
+    densité_commentaires: float = 0.2
+    profondeur: int = 3
+    annotations: int = 1
+    nb_paquets: int = 20
+    graine: int = 1
+
+
+@dataclass(frozen=True)
+class MesureÉtape:
+    étape: str
+    secondes: float
+    fichiers_par_seconde: float
+    mo_par_seconde: float
+
+
+_ANNOTATIONS = ("@Override", "@Deprecated", "@SuppressWarnings(\"unchecked\")", "@Nullable")
+_TYPES = ("int", "long", "String", "double", "boolean", "List<String>", "Map<String, Integer>")
+
+
+class _GénérateurFichier:
+    def __init__(self, paramètres: ParamètresCorpus, aléa: random.Random) -> None:
+        self.paramètres = paramètres
+        self.aléa = aléa
+        self.lignes: List[str] = []
+
+    def commentaire(self, indentation: str) -> None:
+        if self.aléa.random() >= self.paramètres.densité_commentaires:
+            return
+        if self.aléa.random() < 0.5:
+            self.lignes.append(f"{indentation}// commentaire {{ sur une ligne")
+        else:
+            self.lignes.append(f"{indentation}/*")
+            self.lignes.append(f"{indentation} * bloc de commentaire {{ \"non fermé")
+            self.lignes.append(f"{indentation} */")
+
+    def annotations(self, indentation: str) -> None:
+        for _ in range(self.paramètres.annotations):
+            self.lignes.append(indentation + self.aléa.choice(_ANNOTATIONS))
+
+    def bloc(self, indentation: str, profondeur: int) -> None:
+        self.commentaire(indentation)
+        variable = f"v{len(self.lignes)}"
+        self.lignes.append(f'{indentation}String {variable} = "texte {{ /* pas un commentaire";')
+        if profondeur <= 0:
+            self.lignes.append(f"{indentation}total += {variable}.length();")
+            return
+        if self.aléa.random() < 0.5:
+            self.lignes.append(f"{indentation}for (int i = 0; i < {profondeur}; i++) {{")
+        else:
+            self.lignes.append(f"{indentation}if (total > {profondeur}) {{")
+        self.bloc(indentation + "    ", profondeur - 1)
+        self.lignes.append(f"{indentation}}}")
+
+    def méthode(self, indentation: str, numéro: int) -> None:
+        self.commentaire(indentation)
+        self.annotations(indentation)
+        type_retour = self.aléa.choice(_TYPES)
+        self.lignes.append(
+            f"{indentation}public {type_retour} calcul{numéro}(int a, String b)"
+            + (" throws Exception {" if numéro % 3 == 0 else " {")
+        )
+        self.lignes.append(f"{indentation}    int total = a;")
+        self.bloc(indentation + "    ", self.paramètres.profondeur)
+        self.lignes.append(f"{indentation}    return null;")
+        self.lignes.append(f"{indentation}}}")
+
+    def classe(self, nom: str, indentation: str, profondeur: int, budget: int) -> None:
+        self.commentaire(indentation)
+        self.annotations(indentation)
+        mot_clef = "abstract class" if self.aléa.random() < 0.1 else "class"
+        self.lignes.append(f"{indentation}public {mot_clef} {nom} {{")
+        intérieur = indentation + "    "
+        for numéro in range(3):
+            self.commentaire(intérieur)
+            type_champ = self.aléa.choice(_TYPES)
+            self.lignes.append(f"{intérieur}private {type_champ} champ{numéro};")
+        if profondeur > 0:
+            self.classe(f"{nom}Interne", intérieur, profondeur - 1, budget // 4)
+        numéro = 0
+        limite = len(self.lignes) + budget
+        while len(self.lignes) < limite:
+            self.méthode(intérieur, numéro)
+            numéro += 1
+        self.lignes.append(f"{indentation}}}")
+
+
+def nom_paquet(indice: int) -> str:
+    return f"corpus.module{indice}.noyau"
+
+
+def générer_corpus(dossier: Path, paramètres: ParamètresCorpus) -> List[Path]:
+    aléa = random.Random(paramètres.graine)
+    fichiers: List[Path] = []
+    for indice in range(paramètres.nb_fichiers):
+        paquet = indice % paramètres.nb_paquets
+        générateur = _GénérateurFichier(paramètres, aléa)
+        générateur.lignes.append(f"package {nom_paquet(paquet)};")
+        générateur.lignes.append("")
+        nb_imports = min(paramètres.nb_paquets - 1, 1 + aléa.randrange(4))
+        for cible in aléa.sample(range(paramètres.nb_paquets), nb_imports):
+            if cible != paquet:
+                générateur.lignes.append(f"import {nom_paquet(cible)}.Classe{cible};")
+        générateur.lignes.append("import java.util.List;")
+        générateur.lignes.append("")
+        nom = f"Classe{indice}"
+        générateur.classe(
+            nom, "", max(0, paramètres.profondeur - 1), paramètres.lignes_par_fichier
+        )
+        chemin = dossier / nom_paquet(paquet).replace(".", "/") / f"{nom}.java"
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        chemin.write_text("\n".join(générateur.lignes) + "\n", encoding="utf-8")
+        fichiers.append(chemin)
+    return sorted(fichiers)
+
+
+def _chronométrer(action: Callable[[], object], répétitions: int) -> float:
+    meilleur = float("inf")
+    for _ in range(répétitions):
+        début = time.perf_counter()
+        action()
+        meilleur = min(meilleur, time.perf_counter() - début)
+    return meilleur
+
+
+def mesurer(fichiers: Sequence[Path], répétitions: int = 3) -> List[MesureÉtape]:
+    octets = sum(fichier.stat().st_size for fichier in fichiers)
+    sources = [compter_loc.lire_source_java(fichier) for fichier in fichiers]
+    classes = [
+        compter_loc.extraire_classes(source.lignes, fichier)
+        for source, fichier in zip(sources, fichiers)
+    ]
+    packages = compter_loc.fusionner_analyses(map(compter_loc.analyser_fichier, fichiers)).packages
+
+    étapes: Dict[str, Callable[[], object]] = {
+        "compter_loc_fichier": lambda: [compter_loc.compter_loc_fichier(f) for f in fichiers],
+        "lignes_sans_commentaires": lambda: [
+            compter_loc.lignes_sans_commentaires(f) for f in fichiers
+        ],
+        "analyser_structure": lambda: [
+            compter_loc.analyser_structure(source) for source in sources
+        ],
+        "analyser_fichier": lambda: [compter_loc.analyser_fichier(f) for f in fichiers],
+        "compatibilité:extraire_classes": lambda: [
+            compter_loc.extraire_classes(source.lignes, fichier)
+            for source, fichier in zip(sources, fichiers)
+        ],
+        "compatibilité:extraire_méthodes": lambda: [
+            compter_loc.extraire_méthodes(source.lignes, classes_fichier, fichier)
+            for source, classes_fichier, fichier in zip(sources, classes, fichiers)
+        ],
+        "calculer_metriques_packages": lambda: compter_loc.calculer_metriques_packages(packages),
+    }
+    mesures: List[MesureÉtape] = []
+    for étape, action in étapes.items():
+        secondes = max(_chronométrer(action, répétitions), 1e-9)
+        mesures.append(
+            MesureÉtape(
+                étape=étape,
+                secondes=secondes,
+                fichiers_par_seconde=len(fichiers) / secondes,
+                mo_par_seconde=octets / secondes / 1e6,
+            )
+        )
+    return mesures
+
+
+def comparer(
+    mesures: Sequence[MesureÉtape], référence: Dict[str, Dict[str, float]], seuil: float
+) -> List[str]:
+    # Une étape présente d'un seul côté est un écart : une référence ancienne ne doit pas
+    # cesser silencieusement de surveiller une étape renommée ou retirée.
+    régressions: List[str] = []
+    mesurées = {mesure.étape for mesure in mesures}
+    for étape in sorted(set(référence) - mesurées):
+        régressions.append(f"{étape} : présente dans la référence mais plus mesurée")
+    for mesure in mesures:
+        attendu = référence.get(mesure.étape)
+        if attendu is None:
+            régressions.append(f"{mesure.étape} : absente de la référence")
+            continue
+        plancher = attendu["mo_par_seconde"] * (1 - seuil)
+        if mesure.mo_par_seconde < plancher:
+            régressions.append(
+                f"{mesure.étape} : {mesure.mo_par_seconde:.2f} Mo/s "
+                f"(référence {attendu['mo_par_seconde']:.2f} Mo/s, seuil {seuil:.0%})"
+            )
+    return régressions
+
+
+def afficher_mesures(mesures: Sequence[MesureÉtape]) -> None:
+    en_tête = "{:<34} {:>10} {:>12} {:>10}".format("Étape", "Temps (s)", "Fichiers/s", "Mo/s")
+    print(en_tête)
+    print("-" * len(en_tête))
+    for mesure in mesures:
+        print(
+            "{:<34} {:>10.4f} {:>12.1f} {:>10.2f}".format(
+                mesure.étape, mesure.secondes, mesure.fichiers_par_seconde, mesure.mo_par_seconde
+            )
+        )
+
+
+def construire_parseur() -> argparse.ArgumentParser:
+    défauts = ParamètresCorpus()
+    parseur = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parseur.add_argument("--fichiers", type=int, default=défauts.nb_fichiers)
+    parseur.add_argument("--lignes", type=int, default=défauts.lignes_par_fichier)
+    parseur.add_argument("--commentaires", type=float, default=défauts.densité_commentaires)
+    parseur.add_argument("--profondeur", type=int, default=défauts.profondeur)
+    parseur.add_argument("--annotations", type=int, default=défauts.annotations)
+    parseur.add_argument("--paquets", type=int, default=défauts.nb_paquets)
+    parseur.add_argument("--graine", type=int, default=défauts.graine)
+    parseur.add_argument("--repetitions", type=int, default=3)
+    parseur.add_argument(
+        "--dossier",
+        type=Path,
+        help="dossier où générer le corpus (temporaire par défaut)",
+    )
+    parseur.add_argument(
+        "--reference",
+        type=Path,
+        metavar="FICHIER",
+        help="référence JSON à laquelle comparer les mesures",
+    )
+    parseur.add_argument(
+        "--enregistrer",
+        action="store_true",
+        help="écrire les mesures dans le fichier de référence au lieu de les comparer",
+    )
+    parseur.add_argument(
+        "--seuil",
+        type=float,
+        default=0.25,
+        help="perte de débit tolérée avant de signaler une régression (défaut : 0.25)",
+    )
+    return parseur
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    options = construire_parseur().parse_args(arguments)
+    paramètres = ParamètresCorpus(
+        nb_fichiers=options.fichiers,
+        lignes_par_fichier=options.lignes,
+        densité_commentaires=options.commentaires,
+        profondeur=options.profondeur,
+        annotations=options.annotations,
+        nb_paquets=options.paquets,
+        graine=options.graine,
+    )
+    with tempfile.TemporaryDirectory(prefix="corpus_java_") as temporaire:
+        dossier = options.dossier if options.dossier is not None else Path(temporaire)
+        fichiers = générer_corpus(dossier, paramètres)
+        mesures = mesurer(fichiers, options.repetitions)
+    afficher_mesures(mesures)
+
+    if options.reference is None:
+        return 0
+    if options.enregistrer:
+        contenu = {
+            "paramètres": asdict(paramètres),
+            "étapes": {mesure.étape: asdict(mesure) for mesure in mesures},
+        }
+        options.reference.write_text(
+            json.dumps(contenu, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"\nRéférence enregistrée dans {options.reference}")
+        return 0
+    référence = json.loads(options.reference.read_text(encoding="utf-8"))
+    if référence.get("paramètres") != asdict(paramètres):
+        print("\nLa référence a été mesurée sur un autre corpus : comparaison impossible.")
+        return 2
+    régressions = comparer(mesures, référence["étapes"], options.seuil)
+    if régressions:
+        print("\nÉcarts par rapport à la référence :")
+        for régression in régressions:
+            print(f"  - {régression}")
+        return 1
+    print("\nAucune régression par rapport à la référence.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
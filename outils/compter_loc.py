@@ -2,25 +2,61 @@
 
 Le script implémente un comptage minimal inspiré de cloc :
 - seules les lignes non vides sont comptées ;
-- les commentaires sur une ligne (`//`) et les blocs `/* ... */` sont ignorés.
+- les commentaires sur une ligne (`//`) et les blocs `/* ... */` sont ignorés ;
+- les littéraux (chaînes, caractères, blocs de texte) sont reconnus afin qu'un `/*` ou une
+  accolade qu'ils contiennent ne soit pas pris pour un commentaire ou un bloc.
+
+Chaque fichier est lu une seule fois par un lexeur unique qui fournit à la fois le nombre de
+LOC, les lignes sans commentaires et le flux de jetons.
 
 Ce script est utilisé lorsque l'installation de cloc n'est pas possible dans l'environnement
 (dépôts APT et pip inaccessibles).
 """
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-import re
-from pathlib import Path
-from statistics import mean
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import astuple, dataclass, field, replace
+from itertools import islice
+import argparse
+import csv
+import gzip
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import pickle
 import re
+import subprocess
+import sys
+import time
 from pathlib import Path
-from statistics import mean
-from typing import Iterable, List, Optional, Sequence, Tuple
-from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import (
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
 
 
 @dataclass(frozen=True)
@@ -38,148 +74,271 @@ class ClasseStat:
     est_interface: bool
     ligne_début: int
     ligne_fin: int
+    englobante: Optional[str] = None
+    internes: Tuple[str, ...] = ()
+    métriques: Tuple[Tuple[str, int], ...] = ()
+
+    @property
+    def nom_qualifié(self) -> str:
+        # Nom relatif au paquet : `Externe.Interne` pour une classe interne.
+        return f"{self.englobante}.{self.nom}" if self.englobante else self.nom
+
+    def métrique(self, nom: str) -> Optional[int]:
+        return _valeur_métrique(self.métriques, nom)
 
 
 @dataclass(frozen=True)
 class MéthodeStat:
     fichier: Path
+    # Nom qualifié relatif au paquet de la classe : `Externe.Interne` pour une interne.
     classe: str
     nom: str
     loc: int
     ligne_début: int
     ligne_fin: int
+    métriques: Tuple[Tuple[str, int], ...] = ()
 
+    def métrique(self, nom: str) -> Optional[int]:
+        return _valeur_métrique(self.métriques, nom)
 
-def compter_loc_fichier(fichier: Path) -> int:
-    loc = 0
-    in_block_comment = False
-    with fichier.open("r", encoding="utf-8", errors="ignore") as handle:
-        for ligne in handle:
-            texte = ligne.strip()
-            if in_block_comment:
-                if "*/" in texte:
-                    in_block_comment = False
-                    texte = texte.split("*/", 1)[1].strip()
-                    if not texte:
-                        continue
-                else:
-                    continue
-            if not texte or texte.startswith("//"):
-                continue
-            if "/*" in texte:
-                avant, _, après = texte.partition("/*")
-                if avant.strip():
-                    loc += 1
-                if "*/" in après:
-                    après = après.split("*/", 1)[1]
-                    if après.strip():
-                        loc += 1
-                else:
-                    in_block_comment = True
-                continue
-            loc += 1
-    return loc
 
+def _valeur_métrique(métriques: Tuple[Tuple[str, int], ...], nom: str) -> Optional[int]:
+    # Quelques paires au plus : un parcours évite de bâtir un dictionnaire par lecture.
+    for clé, valeur in métriques:
+        if clé == nom:
+            return valeur
+    return None
 
-def lignes_sans_commentaires(fichier: Path) -> List[str]:
+
+class Jeton(NamedTuple):
+    genre: str
+    texte: str
+    ligne: int
+
+
+@dataclass(frozen=True)
+class SourceJava:
+    fichier: Path
+    loc: int
+    lignes: List[str]
+    lignes_code: List[str]
+    jetons: List[Jeton]
+
+
+# Un seul motif couvre tous les lexèmes Java : les littéraux sont reconnus avant les
+# commentaires pour que "/*" ou "{" dans une chaîne ne perturbent ni l'état des
+# commentaires ni le comptage des accolades.
+_MOTIF_LEXÈME = re.compile(
+    r"""
+    (?P<bloc_texte>\"\"\"(?:\\.|[^\\])*?(?:\"\"\"|\Z))
+  | (?P<chaîne>"(?:\\.|[^"\\\n])*(?:"|$))
+  | (?P<caractère>'(?:\\.|[^'\\\n])*(?:'|$))
+  | (?P<commentaire_bloc>/\*.*?(?:\*/|\Z))
+  | (?P<commentaire_ligne>//[^\n]*)
+  | (?P<fin_ligne>\n)
+  | (?P<espace>[ \t\f\r]+)
+  | (?P<identifiant>[^\W\d][\w$]*|\$[\w$]*)
+  | (?P<nombre>\.?\d(?:[eEpP][+-]|[\w.])*)
+  | (?P<opérateur>>>>=|<<=|>>=|>>>|\.\.\.|->|::|\+\+|--|&&|\|\||[-+*/%&|^!=<>]=|<<|>>|.)
+    """,
+    re.VERBOSE | re.DOTALL | re.MULTILINE,
+)
+_MOTIF_INTÉRIEUR_LITTÉRAL = re.compile(r"[^\s\"']")
+_LITTÉRAUX = {"bloc_texte", "chaîne", "caractère"}
+
+
+class DélaiDépassé(RuntimeError):
+    pass
+
+
+def _vérifier_échéance(échéance: Optional[float]) -> None:
+    if échéance is not None and time.perf_counter() > échéance:
+        raise DélaiDépassé
+
+
+def analyser_texte_java(
+    fichier: Path, texte: str, échéance: Optional[float] = None
+) -> SourceJava:
     lignes: List[str] = []
-    in_block_comment = False
-    with fichier.open("r", encoding="utf-8", errors="ignore") as handle:
-        for brut in handle:
-            ligne = ""
-            idx = 0
-            longueur = len(brut)
-            while idx < longueur:
-                if in_block_comment:
-                    fin = brut.find("*/", idx)
-                    if fin == -1:
-                        idx = longueur
-                        break
-                    idx = fin + 2
-                    in_block_comment = False
-                    continue
-                début_bloc = brut.find("/*", idx)
-                double_slash = brut.find("//", idx)
-                if double_slash != -1 and (début_bloc == -1 or double_slash < début_bloc):
-                    ligne += brut[idx:double_slash]
-                    idx = longueur
-                    break
-                if début_bloc != -1:
-                    ligne += brut[idx:début_bloc]
-                    idx = début_bloc + 2
-                    in_block_comment = True
-                    continue
-                ligne += brut[idx:]
-                idx = longueur
-            lignes.append(ligne.rstrip())
-    return lignes
+    lignes_code: List[str] = []
+    jetons: List[Jeton] = []
+    tampon: List[str] = []
+    tampon_code: List[str] = []
+    loc = 0
+    numéro = 1
 
+    def terminer_ligne() -> None:
+        nonlocal loc, numéro
+        ligne = "".join(tampon).rstrip()
+        lignes.append(ligne)
+        lignes_code.append("".join(tampon_code).rstrip())
+        if ligne.strip():
+            loc += 1
+        tampon.clear()
+        tampon_code.clear()
+        numéro += 1
+        if not numéro & 0x3FF:
+            _vérifier_échéance(échéance)
 
-def extraire_classes(lignes: Sequence[str], fichier: Path) -> List[ClasseStat]:
-    classes: List[ClasseStat] = []
-    i = 0
-    longueur = len(lignes)
-    while i < longueur:
-        ligne = lignes[i]
-        if "class" not in ligne and "interface" not in ligne and "enum" not in ligne:
-        if "class" not in ligne:
-            i += 1
+    # L'échéance est aussi contrôlée au fil des lexèmes : un fichier de quelques lignes
+    # démesurées n'atteindrait jamais le contrôle par ligne.
+    for indice, correspondance in enumerate(_MOTIF_LEXÈME.finditer(texte)):
+        if not indice & 0xFFF:
+            _vérifier_échéance(échéance)
+        genre = correspondance.lastgroup
+        valeur = correspondance.group()
+        if genre == "fin_ligne":
+            terminer_ligne()
+        elif genre == "espace":
+            tampon.append(valeur)
+            tampon_code.append(valeur)
+        elif genre == "commentaire_ligne":
             continue
-        signature = ligne
-        début = i
-        while "{" not in signature and i + 1 < longueur:
-            i += 1
-            signature += " " + lignes[i]
-        if "{" not in signature or not re.search(r"\b(class|interface|enum)\b", signature):
-        if "{" not in signature or "class" not in signature:
-            i += 1
-            continue
-        if re.search(r"\bnew\s+\w+\s*\(", signature):
-            i += 1
+        elif genre == "commentaire_bloc":
+            for _ in range(valeur.count("\n")):
+                terminer_ligne()
+        elif genre in _LITTÉRAUX:
+            jetons.append(Jeton(genre, valeur, numéro))
+            morceaux = valeur.split("\n")
+            morceaux_masqués = _MOTIF_INTÉRIEUR_LITTÉRAL.sub("_", valeur).split("\n")
+            for position, (morceau, morceau_masqué) in enumerate(zip(morceaux, morceaux_masqués)):
+                if position:
+                    terminer_ligne()
+                tampon.append(morceau)
+                tampon_code.append(morceau_masqué)
+        else:
+            jetons.append(Jeton(genre, valeur, numéro))
+            tampon.append(valeur)
+            tampon_code.append(valeur)
+    if tampon:
+        terminer_ligne()
+    return SourceJava(
+        fichier=fichier, loc=loc, lignes=lignes, lignes_code=lignes_code, jetons=jetons
+    )
+
+
+def décoder_source(contenu: bytes) -> str:
+    texte = contenu.decode("utf-8", errors="ignore")
+    return texte.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def lire_source_java(
+    fichier: Path, contenu: Optional[bytes] = None, échéance: Optional[float] = None
+) -> SourceJava:
+    if contenu is None:
+        contenu = fichier.read_bytes()
+    return analyser_texte_java(fichier, décoder_source(contenu), échéance)
+
+
+# Sous-ensemble du lexeur limité aux littéraux et aux commentaires : suffisant pour compter
+# les LOC sans construire de jetons. Les autres lexèmes ne peuvent pas commencer par `"`,
+# `'` ou `/*`, si bien que sauter ce qui ne correspond pas donne les mêmes coupures.
+_MOTIF_COMMENTAIRE = re.compile(
+    r"""
+    (?P<bloc_texte>\"\"\"(?:\\.|[^\\])*?(?:\"\"\"|\Z))
+  | (?P<chaîne>"(?:\\.|[^"\\\n])*(?:"|$))
+  | (?P<caractère>'(?:\\.|[^'\\\n])*(?:'|$))
+  | (?P<commentaire>/\*.*?(?:\*/|\Z)|//[^\n]*)
+    """,
+    re.VERBOSE | re.DOTALL | re.MULTILINE,
+)
+# Octets que str.strip() considère comme des blancs sur une ligne ASCII.
+_BLANCS_OCTETS = b" \t\v\f\r\x1c\x1d\x1e\x1f"
+_TABLE_LIGNES = bytes(b"\n"[0] if octet == b"\n"[0] else b"x"[0] for octet in range(256))
+_SEUIL_MMAP = 1 << 20
+_TAILLE_MORCEAU = 1 << 20
+
+
+def _compter_loc_texte(texte: str) -> int:
+    morceaux: List[str] = []
+    position = 0
+    for correspondance in _MOTIF_COMMENTAIRE.finditer(texte):
+        if correspondance.lastgroup != "commentaire":
             continue
-        correspondance_nom = re.search(
-            r"\b(class|interface|enum)\s+([A-Za-z_][A-Za-z0-9_]*)",
-            signature,
-        )
-        if not correspondance_nom:
-            i += 1
+        morceaux.append(texte[position : correspondance.start()])
+        morceaux.append("\n" * correspondance.group().count("\n"))
+        position = correspondance.end()
+    morceaux.append(texte[position:])
+    return sum(1 for ligne in "".join(morceaux).split("\n") if ligne.strip())
+
+
+def _compter_lignes_non_vides(morceaux: Iterable[bytes]) -> int:
+    # Les blancs sont supprimés puis chaque octet restant devient `x` : une ligne non vide
+    # est exactement une occurrence de `\nx`, comptée par bytes.count sans boucle Python.
+    total = 0
+    fin_de_ligne = True
+    for morceau in morceaux:
+        réduit = morceau.translate(_TABLE_LIGNES, _BLANCS_OCTETS)
+        if not réduit:
             continue
-        nom = correspondance_nom.group(2)
-        mot_clef = correspondance_nom.group(1)
-        est_interface = mot_clef == "interface"
-        abstraite = est_interface or bool(re.search(r"\babstract\s+class\b", signature))
-        correspondance_nom = re.search(r"\bclass\s+([A-Za-z_][A-Za-z0-9_]*)", signature)
-        if not correspondance_nom:
-            i += 1
+        total += réduit.count(b"\nx") + (fin_de_ligne and réduit[0] != b"\n"[0])
+        fin_de_ligne = réduit[-1] == b"\n"[0]
+    return total
+
+
+def compter_loc_octets(contenu: bytes) -> int:
+    if b"\r" in contenu:
+        contenu = contenu.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if contenu.isascii() and b"/*" not in contenu and b"//" not in contenu:
+        return _compter_lignes_non_vides((contenu,))
+    return _compter_loc_texte(décoder_source(contenu))
+
+
+def _compter_loc_projeté(fichier: Path) -> int:
+    with fichier.open("rb") as handle, mmap.mmap(
+        handle.fileno(), 0, access=mmap.ACCESS_READ
+    ) as carte:
+        if carte.find(b"/*") < 0 and carte.find(b"//") < 0 and carte.find(b"\r") < 0:
+            morceaux = [
+                carte[début : début + _TAILLE_MORCEAU]
+                for début in range(0, len(carte), _TAILLE_MORCEAU)
+            ]
+            if all(morceau.isascii() for morceau in morceaux):
+                return _compter_lignes_non_vides(morceaux)
+        return compter_loc_octets(carte[:])
+
+
+def compter_loc_fichier(fichier: Path) -> int:
+    # Chemin rapide sur les octets ; le lexeur n'intervient que si un marqueur de
+    # commentaire ou un caractère non ASCII l'exige.
+    if os.path.getsize(fichier) >= _SEUIL_MMAP:
+        return _compter_loc_projeté(fichier)
+    return compter_loc_octets(fichier.read_bytes())
+
+
+def lignes_sans_commentaires(fichier: Path) -> List[str]:
+    return lire_source_java(fichier).lignes
+
+
+_MOTIF_MOT = re.compile(r"\w")
+
+
+@dataclass(frozen=True)
+class LignesNormalisées:
+    # Empreinte 64 bits de chaque ligne de code normalisée et son numéro dans le fichier.
+    numéros: "array[int]"
+    empreintes: "array[int]"
+
+
+def normaliser_lignes(lignes: Sequence[str]) -> LignesNormalisées:
+    # Les blancs sont réduits à une espace. Les lignes sans identifiant (accolades seules)
+    # et les déclarations de paquet ou d'import, identiques d'un fichier à l'autre sans être
+    # du code copié, sont écartées.
+    numéros = array("i")
+    empreintes = array("q")
+    for numéro, ligne in enumerate(lignes, start=1):
+        normalisée = " ".join(ligne.split())
+        if not _MOTIF_MOT.search(normalisée) or normalisée.startswith(("import ", "package ")):
             continue
-        nom = correspondance_nom.group(1)
-        abstraite = bool(re.search(r"\babstract\s+class\b", signature))
-        compte_accolades = signature.count("{") - signature.count("}")
-        fin = i
-        while compte_accolades > 0 and fin + 1 < longueur:
-            fin += 1
-            compte_accolades += lignes[fin].count("{") - lignes[fin].count("}")
-        contenu = lignes[début : fin + 1]
-        loc = sum(1 for contenu_ligne in contenu if contenu_ligne.strip())
-        classes.append(
-            ClasseStat(
-                fichier=fichier,
-                nom=nom,
-                loc=loc,
-                abstraite=abstraite,
-                est_interface=est_interface,
-                ligne_début=début + 1,
-                ligne_fin=fin + 1,
-            )
-        )
-        i = fin + 1
-    return classes
+        numéros.append(numéro)
+        empreinte = hashlib.blake2b(normalisée.encode("utf-8"), digest_size=8).digest()
+        empreintes.append(int.from_bytes(empreinte, "little", signed=True))
+    return LignesNormalisées(numéros, empreintes)
 
 
-def est_signature_méthode(signature: str) -> bool:
-    signature_sans_annotations = re.sub(r"@\w+", "", signature)
-    avant_parenthèse = signature_sans_annotations.split("(", 1)[0]
-    mots_interdits = {
+_MOTS_CLEFS_TYPE = frozenset({"class", "interface", "enum", "record"})
+_MOTS_EXCLUS_MÉTHODE = frozenset(
+    {
         "if",
         "for",
         "while",
@@ -190,99 +349,810 @@ def est_signature_méthode(signature: str) -> bool:
         "return",
         "class",
         "synchronized",
+        "try",
+        "else",
+        "finally",
     }
-    tokens = re.split(r"\s+", avant_parenthèse.strip())
-    if not tokens:
-        return False
-    if any(token in mots_interdits for token in tokens[-2:]):
-        return False
-    if "=" in avant_parenthèse:
-        return False
-    if " class " in signature_sans_annotations:
-        return False
-    if not re.search(r"\(", signature_sans_annotations):
-        return False
-    return True
-
-
-def trouver_classe_pour_ligne(classes: Sequence[ClasseStat], ligne: int) -> Optional[ClasseStat]:
-    candidates = [cls for cls in classes if cls.ligne_début <= ligne <= cls.ligne_fin]
-    if not candidates:
-        return None
-    return min(candidates, key=lambda cls: cls.ligne_fin - cls.ligne_début)
+)
+
+_CLASSE = 0
+_ANONYME = 1
+_MÉTHODE = 2
+_BLOC = 3
+
+
+@dataclass(frozen=True)
+class StructureFichier:
+    classes: List[ClasseStat]
+    méthodes: List[MéthodeStat]
+
+
+def _déclaration_type(entête: Sequence[Jeton]) -> Optional[Tuple[str, str, bool]]:
+    précédent = ""
+    for position in range(len(entête) - 1):
+        jeton = entête[position]
+        if (
+            jeton.texte in _MOTS_CLEFS_TYPE
+            and jeton.genre == "identifiant"
+            and précédent != "."
+            and entête[position + 1].genre == "identifiant"
+        ):
+            if jeton.texte == "record" and (
+                position + 2 >= len(entête) or entête[position + 2].texte not in ("(", "<")
+            ):
+                précédent = jeton.texte
+                continue
+            abstraite = jeton.texte == "interface" or any(
+                autre.texte == "abstract" for autre in entête[:position]
+            )
+            return jeton.texte, entête[position + 1].texte, abstraite
+        précédent = jeton.texte
+    return None
+
+
+def _nom_méthode(entête: Sequence[Jeton]) -> Optional[str]:
+    position = 0
+    longueur = len(entête)
+    # Les annotations (`@Nom`, `@a.b.Nom(...)`) précèdent la signature proprement dite.
+    while position + 1 < longueur and entête[position].texte == "@":
+        position += 2
+        while (
+            position + 1 < longueur
+            and entête[position].texte == "."
+            and entête[position + 1].genre == "identifiant"
+        ):
+            position += 2
+        if position < longueur and entête[position].texte == "(":
+            profondeur = 0
+            while position < longueur:
+                texte = entête[position].texte
+                profondeur += (texte == "(") - (texte == ")")
+                position += 1
+                if profondeur == 0:
+                    break
+    premier = position
+    while position < longueur:
+        texte = entête[position].texte
+        if texte == "(":
+            if position == premier:
+                return None
+            candidat = entête[position - 1]
+            if candidat.genre != "identifiant" or candidat.texte in _MOTS_EXCLUS_MÉTHODE:
+                return None
+            return candidat.texte
+        if texte == "=" or texte == "->":
+            return None
+        position += 1
+    return None
+
+
+class VisiteurMétrique(ABC):
+    """Métrique abonnée au flux de jetons parcouru par `analyser_structure`.
+
+    `ouvrir` crée l'état d'une classe ou d'une méthode à son accolade ouvrante ; les jetons
+    de son corps, accolades comprises, sont ensuite passés à `visiter` par séries de même
+    profondeur d'accolades. Chaque série n'est remise qu'à l'unité la plus proche : à la
+    fermeture d'une méthode, `fusionner` reporte son état sur celui de sa classe. Une classe
+    couvre ainsi son corps et ses méthodes, hors classes internes nommées. `valeurs` donne
+    une valeur par nom de `noms`.
+    """
+
+    noms: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def ouvrir(self, profondeur: int) -> object:
+        ...
+
+    @abstractmethod
+    def visiter(self, état: object, jetons: Sequence[Jeton], profondeur: int) -> None:
+        ...
+
+    @abstractmethod
+    def fusionner(self, état: object, état_méthode: object) -> None:
+        ...
+
+    @abstractmethod
+    def valeurs(self, état: object) -> Tuple[int, ...]:
+        ...
+
+
+_DÉCISIONS = frozenset({"if", "for", "while", "case", "catch", "&&", "||", "?"})
+
+
+class ComplexitéCyclomatique(VisiteurMétrique):
+    # 1 + points de décision ; le `?` des jokers génériques (`<?`, `, ?`) n'en est pas un.
+    noms = ("complexité",)
+
+    def ouvrir(self, profondeur: int) -> List[int]:
+        return [1]
+
+    def visiter(self, état: List[int], jetons: Sequence[Jeton], profondeur: int) -> None:
+        for position, (_, texte, _) in enumerate(jetons):
+            if texte not in _DÉCISIONS:
+                continue
+            if texte == "?" and position and jetons[position - 1].texte in ("<", ","):
+                continue
+            état[0] += 1
+
+    def fusionner(self, état: List[int], état_méthode: List[int]) -> None:
+        état[0] += état_méthode[0] - 1
+
+    def valeurs(self, état: List[int]) -> Tuple[int, ...]:
+        return (état[0],)
+
+
+class ProfondeurImbrication(VisiteurMétrique):
+    # Nombre maximal d'accolades ouvertes sous le corps de la classe ou de la méthode.
+    noms = ("imbrication",)
+
+    def ouvrir(self, profondeur: int) -> List[int]:
+        return [profondeur, 0]
+
+    def visiter(self, état: List[int], jetons: Sequence[Jeton], profondeur: int) -> None:
+        if profondeur - état[0] > état[1]:
+            état[1] = profondeur - état[0]
+
+    def fusionner(self, état: List[int], état_méthode: List[int]) -> None:
+        état[1] = max(état[1], état_méthode[0] - état[0] + état_méthode[1])
+
+    def valeurs(self, état: List[int]) -> Tuple[int, ...]:
+        return (état[1],)
+
+
+_MOTS_RÉSERVÉS = frozenset(
+    """
+    abstract assert boolean break byte case catch char class continue default do double else
+    enum extends final finally float for if implements import instanceof int interface long
+    native new package private protected public return short static strictfp super switch
+    synchronized this throw throws transient try void volatile while var yield
+    """.split()
+)
+_FERMANTS = frozenset({")", "]", "}"})
+
+
+class _ÉtatHalstead:
+    __slots__ = ("opérateurs", "opérandes", "nb_opérateurs", "nb_opérandes")
+
+    def __init__(self) -> None:
+        self.opérateurs: Set[str] = set()
+        self.opérandes: Set[str] = set()
+        self.nb_opérateurs = 0
+        self.nb_opérandes = 0
+
+
+class Halstead(VisiteurMétrique):
+    # Opérateurs : symboles (un seul compte par paire de délimiteurs) et mots réservés ;
+    # opérandes : identifiants, nombres et littéraux.
+    noms = ("opérateurs_distincts", "opérandes_distincts", "opérateurs", "opérandes")
+
+    def ouvrir(self, profondeur: int) -> _ÉtatHalstead:
+        return _ÉtatHalstead()
+
+    def visiter(self, état: _ÉtatHalstead, jetons: Sequence[Jeton], profondeur: int) -> None:
+        opérateurs = [
+            texte
+            for genre, texte, _ in jetons
+            if genre == "opérateur" or texte in _MOTS_RÉSERVÉS
+        ]
+        état.opérateurs.update(opérateurs)
+        fermants = sum(opérateurs.count(fermant) for fermant in _FERMANTS)
+        état.nb_opérateurs += len(opérateurs) - fermants
+        if len(opérateurs) < len(jetons):
+            opérandes = [
+                texte
+                for genre, texte, _ in jetons
+                if genre != "opérateur" and texte not in _MOTS_RÉSERVÉS
+            ]
+            état.opérandes.update(opérandes)
+            état.nb_opérandes += len(opérandes)
+
+    def fusionner(self, état: _ÉtatHalstead, état_méthode: _ÉtatHalstead) -> None:
+        état.opérateurs |= état_méthode.opérateurs
+        état.opérandes |= état_méthode.opérandes
+        état.nb_opérateurs += état_méthode.nb_opérateurs
+        état.nb_opérandes += état_méthode.nb_opérandes
+
+    def valeurs(self, état: _ÉtatHalstead) -> Tuple[int, ...]:
+        return (
+            len(état.opérateurs - _FERMANTS),
+            len(état.opérandes),
+            état.nb_opérateurs,
+            état.nb_opérandes,
+        )
+
+
+# Visiteurs sélectionnables par leur nom (--metriques) ; tous sont actifs par défaut.
+VISITEURS_PAR_NOM: Dict[str, VisiteurMétrique] = {
+    "complexite": ComplexitéCyclomatique(),
+    "imbrication": ProfondeurImbrication(),
+    "halstead": Halstead(),
+}
+VISITEURS_MÉTRIQUES: Tuple[VisiteurMétrique, ...] = tuple(VISITEURS_PAR_NOM.values())
+
+
+def noms_métriques(visiteurs: Sequence[VisiteurMétrique]) -> Tuple[str, ...]:
+    return tuple(nom for visiteur in visiteurs for nom in visiteur.noms)
+
+
+def _signature_visiteurs(visiteurs: Sequence[VisiteurMétrique]) -> Tuple[str, ...]:
+    # Identifie le jeu de visiteurs d'une analyse mise en cache ou partielle : un autre jeu
+    # donnerait d'autres métriques pour le même fichier.
+    return tuple(
+        f"{type(visiteur).__qualname__}({','.join(visiteur.noms)})" for visiteur in visiteurs
+    )
+
+
+def _valeurs_métriques(
+    visiteurs: Sequence[VisiteurMétrique], états: Optional[List[object]]
+) -> Tuple[Tuple[str, int], ...]:
+    if états is None:
+        return ()
+    return tuple(
+        paire
+        for visiteur, état in zip(visiteurs, états)
+        for paire in zip(visiteur.noms, visiteur.valeurs(état))
+    )
+
+
+def analyser_structure(
+    source: SourceJava,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+    échéance: Optional[float] = None,
+) -> StructureFichier:
+    # Un seul passage sur les jetons : une pile de blocs suit la profondeur des accolades
+    # et chaque `{` est classé d'après l'en-tête accumulé depuis la dernière instruction
+    # (`;`, `{` ou `}`). Aucun jeton n'est relu, le coût reste linéaire en taille de fichier.
+    # Les métriques des visiteurs sont alimentées par ce même passage.
+    fichier = source.fichier
+    cumul = [0]
+    for ligne in source.lignes_code:
+        cumul.append(cumul[-1] + (1 if ligne.strip() else 0))
+    dernière_ligne = len(source.lignes_code)
+
+    # Classes brutes : [nom, mot_clef, abstraite, début, fin, parent, qualifié, internes].
+    classes_brutes: List[list] = []
+    # Méthodes brutes : [classe, nom, début, fin].
+    méthodes_brutes: List[list] = []
+    # Pile : (genre, indice de l'enregistrement, classe nommée la plus proche, méthode la
+    # plus proche).
+    pile: List[Tuple[int, int, Optional[int], Optional[int]]] = []
+    constantes_enum: Set[int] = set()
+    jetons = source.jetons
+    début_entête = 0
+    # États des visiteurs par classe et par méthode ; `abonnés` désigne ceux de la méthode,
+    # à défaut de la classe, la plus proche. La profondeur ne change qu'aux accolades : les
+    # jetons sont transmis par séries commençant à `début_série`.
+    états_classes: List[List[object]] = []
+    états_méthodes: List[List[object]] = []
+    abonnés: List[Tuple[VisiteurMétrique, object]] = []
+    début_série = 0
+
+    def empiler(genre: int, indice: int, proche: Optional[int], méthode: Optional[int]) -> None:
+        pile.append((genre, indice, proche, méthode))
+        if not visiteurs:
+            return
+        if genre == _CLASSE:
+            états_classes.append([visiteur.ouvrir(len(pile)) for visiteur in visiteurs])
+        elif genre == _MÉTHODE:
+            états_méthodes.append([visiteur.ouvrir(len(pile)) for visiteur in visiteurs])
+        abonner()
+
+    def abonner() -> None:
+        abonnés.clear()
+        if not pile:
+            return
+        _, _, proche, méthode = pile[-1]
+        if méthode is not None:
+            abonnés.extend(zip(visiteurs, états_méthodes[méthode]))
+        elif proche is not None:
+            abonnés.extend(zip(visiteurs, états_classes[proche]))
+
+    for position, jeton in enumerate(jetons):
+        texte = jeton.texte
+        if jeton.genre != "opérateur" or texte not in "{};":
+            continue
+        if texte == ";":
+            if pile and pile[-1][0] == _CLASSE:
+                constantes_enum.discard(pile[-1][1])
+            début_entête = position + 1
+            continue
+        if texte == "}":
+            if pile:
+                if abonnés:
+                    série = jetons[début_série : position + 1]
+                    for visiteur, état in abonnés:
+                        visiteur.visiter(état, série, len(pile))
+                début_série = position + 1
+                genre, indice, proche, _ = pile.pop()
+                if genre == _CLASSE:
+                    classes_brutes[indice][4] = jeton.ligne
+                elif genre == _MÉTHODE:
+                    méthodes_brutes[indice][3] = jeton.ligne
+                    if visiteurs and proche is not None:
+                        for visiteur, état, état_méthode in zip(
+                            visiteurs, états_classes[proche], états_méthodes[indice]
+                        ):
+                            visiteur.fusionner(état, état_méthode)
+                if visiteurs:
+                    abonner()
+            début_entête = position + 1
+            continue
+
+        _vérifier_échéance(échéance)
+        if abonnés and début_série < position:
+            série = jetons[début_série:position]
+            for visiteur, état in abonnés:
+                visiteur.visiter(état, série, len(pile))
+        début_série = position
+        entête = jetons[début_entête:position]
+        début_entête = position + 1
+        ligne_début = entête[0].ligne if entête else jeton.ligne
+        sommet = pile[-1] if pile else None
+        proche = sommet[2] if sommet is not None else None
+        méthode = sommet[3] if sommet is not None else None
+        déclaration = _déclaration_type(entête)
+        if déclaration is not None:
+            mot_clef, nom, abstraite = déclaration
+            qualifié = f"{classes_brutes[proche][6]}.{nom}" if proche is not None else nom
+            if proche is not None:
+                classes_brutes[proche][7].append(nom)
+            indice = len(classes_brutes)
+            classes_brutes.append(
+                [nom, mot_clef, abstraite, ligne_début, dernière_ligne, proche, qualifié, []]
+            )
+            if mot_clef == "enum":
+                constantes_enum.add(indice)
+            empiler(_CLASSE, indice, indice, None)
+        elif sommet is not None and sommet[0] == _CLASSE and sommet[1] in constantes_enum:
+            # Corps d'une constante d'enum : classe anonyme rattachée à l'enum.
+            empiler(_ANONYME, -1, proche, méthode)
+        else:
+            dans_corps = sommet is not None and sommet[0] in (_CLASSE, _ANONYME)
+            nom_méthode = _nom_méthode(entête) if dans_corps and proche is not None else None
+            if nom_méthode is not None:
+                méthodes_brutes.append([proche, nom_méthode, ligne_début, dernière_ligne])
+                empiler(_MÉTHODE, len(méthodes_brutes) - 1, proche, len(méthodes_brutes) - 1)
+            elif entête and entête[-1].texte == ")" and any(j.texte == "new" for j in entête):
+                empiler(_ANONYME, -1, proche, méthode)
+            else:
+                empiler(_BLOC, -1, proche, méthode)
+
+    classes = [
+        ClasseStat(
+            fichier=fichier,
+            nom=nom,
+            loc=cumul[fin] - cumul[début - 1],
+            abstraite=abstraite,
+            est_interface=mot_clef == "interface",
+            ligne_début=début,
+            ligne_fin=fin,
+            englobante=classes_brutes[parent][6] if parent is not None else None,
+            internes=tuple(internes),
+            métriques=_valeurs_métriques(
+                visiteurs, états_classes[indice] if états_classes else None
+            ),
+        )
+        for indice, (nom, mot_clef, abstraite, début, fin, parent, _, internes) in enumerate(
+            classes_brutes
+        )
+    ]
+    méthodes = [
+        MéthodeStat(
+            fichier=fichier,
+            classe=classes_brutes[classe][6],
+            nom=nom,
+            loc=cumul[fin] - cumul[début - 1],
+            ligne_début=début,
+            ligne_fin=fin,
+            métriques=_valeurs_métriques(
+                visiteurs, états_méthodes[indice] if états_méthodes else None
+            ),
+        )
+        for indice, (classe, nom, début, fin) in enumerate(méthodes_brutes)
+    ]
+    return StructureFichier(classes=classes, méthodes=méthodes)
+
+
+def _structure_depuis_lignes(lignes: Sequence[str], fichier: Path) -> StructureFichier:
+    return analyser_structure(analyser_texte_java(fichier, "\n".join(lignes)))
+
+
+def extraire_classes(lignes: Sequence[str], fichier: Path) -> List[ClasseStat]:
+    return _structure_depuis_lignes(lignes, fichier).classes
+
+
+class IndexClasses:
+    """Découpe les lignes d'un fichier en segments attribués à la classe la plus interne.
+
+    Les classes d'un fichier sont imbriquées proprement : un balayage unique avec une pile
+    produit au plus 2n + 1 segments, et chaque recherche se fait ensuite par dichotomie.
+    """
+
+    def __init__(self, classes: Sequence[ClasseStat]) -> None:
+        self._classes = list(classes)
+        self._bornes: List[int] = []
+        self._occupants: List[Optional[int]] = []
+        ordre = sorted(
+            range(len(self._classes)),
+            key=lambda k: (self._classes[k].ligne_début, -self._classes[k].ligne_fin, k),
+        )
+        pile: List[int] = []
+        for k in ordre:
+            début = self._classes[k].ligne_début
+            while pile and self._classes[pile[-1]].ligne_fin < début:
+                fermée = pile.pop()
+                self._poser(self._classes[fermée].ligne_fin + 1, pile[-1] if pile else None)
+            pile.append(k)
+            self._poser(début, k)
+        while pile:
+            fermée = pile.pop()
+            self._poser(self._classes[fermée].ligne_fin + 1, pile[-1] if pile else None)
+
+    def _poser(self, position: int, occupant: Optional[int]) -> None:
+        if self._bornes and self._bornes[-1] == position:
+            self._occupants[-1] = occupant
+        else:
+            self._bornes.append(position)
+            self._occupants.append(occupant)
+
+    def segments(self) -> List[Tuple[int, Optional[ClasseStat]]]:
+        return [
+            (borne, self._classes[occupant] if occupant is not None else None)
+            for borne, occupant in zip(self._bornes, self._occupants)
+        ]
+
+    def classe_pour_ligne(self, ligne: int) -> Optional[ClasseStat]:
+        position = bisect_right(self._bornes, ligne) - 1
+        if position < 0:
+            return None
+        occupant = self._occupants[position]
+        return self._classes[occupant] if occupant is not None else None
 
 
 def extraire_méthodes(
     lignes: Sequence[str], classes: Sequence[ClasseStat], fichier: Path
 ) -> List[MéthodeStat]:
+    # Les méthodes sont rattachées aux classes fournies, comme avant l'analyse en un passage.
+    index = IndexClasses(classes)
     méthodes: List[MéthodeStat] = []
-    i = 0
-    longueur = len(lignes)
-    while i < longueur:
-        ligne = lignes[i]
-        stripped = ligne.strip()
-        if not stripped:
-            i += 1
-            continue
-        signature_lignes: List[str] = []
-        début = i
-        while stripped.startswith("@"):
-            signature_lignes.append(lignes[i])
-            i += 1
-            if i >= longueur:
-                break
-            stripped = lignes[i].strip()
-        if i >= longueur:
-            break
-        signature_lignes.append(lignes[i])
-        while "{" not in signature_lignes[-1] and i + 1 < longueur:
-            i += 1
-            signature_lignes.append(lignes[i])
-        signature = " ".join(el.strip() for el in signature_lignes)
-        if "{" not in signature:
-            i += 1
-            continue
-        if not est_signature_méthode(signature):
-            i = début + 1
-            continue
-        compte_accolades = sum(l.count("{") - l.count("}") for l in signature_lignes)
-        fin = i
-        while compte_accolades > 0 and fin + 1 < longueur:
-            fin += 1
-            compte_accolades += lignes[fin].count("{") - lignes[fin].count("}")
-        loc = sum(1 for contenu_ligne in lignes[début : fin + 1] if contenu_ligne.strip())
-        partie_avant_parenthèse = signature.split("(", 1)[0].strip()
-        nom = partie_avant_parenthèse.split()[-1]
-        classe = trouver_classe_pour_ligne(classes, début + 1)
+    for méthode in _structure_depuis_lignes(lignes, fichier).méthodes:
+        classe = index.classe_pour_ligne(méthode.ligne_début)
         if classe is not None:
-            méthodes.append(
-                MéthodeStat(
-                    fichier=fichier,
-                    classe=classe.nom,
-                    nom=nom,
-                    loc=loc,
-                    ligne_début=début + 1,
-                    ligne_fin=fin + 1,
-                )
-            )
-        i = fin + 1
+            méthodes.append(replace(méthode, classe=classe.nom_qualifié))
     return méthodes
 
 
+class RegistreFichiers:
+    # Chaque chemin n'est conservé qu'une fois ; les tables n'en stockent que l'indice.
+    def __init__(self) -> None:
+        self.chemins: List[Path] = []
+        self._indices: Dict[Path, int] = {}
+
+    def indice(self, chemin: Path) -> int:
+        indice = self._indices.get(chemin)
+        if indice is None:
+            indice = len(self.chemins)
+            self._indices[chemin] = indice
+            self.chemins.append(chemin)
+        return indice
+
+
+_ABSTRAITE = 1
+_INTERFACE = 2
+# Marque, dans une colonne de métrique, une ligne que le visiteur n'a pas mesurée (fichier
+# dégradé ou analysé par un autre jeu de visiteurs).
+_MÉTRIQUE_ABSENTE = -(1 << (8 * array("l").itemsize - 1))
+
+
+class ColonnesMétriques:
+    # Une colonne `array("l")` par nom de métrique, au lieu d'un tuple de paires par ligne.
+    def __init__(self, noms: Iterable[str] = ()) -> None:
+        self.nb_lignes = 0
+        self.colonnes: Dict[str, array] = {nom: array("l") for nom in noms}
+
+    def append(self, métriques: Tuple[Tuple[str, int], ...]) -> None:
+        for nom, valeur in métriques:
+            colonne = self.colonnes.get(nom)
+            if colonne is None:
+                colonne = self.colonnes[nom] = array("l", [_MÉTRIQUE_ABSENTE]) * self.nb_lignes
+            colonne.append(valeur)
+        self.nb_lignes += 1
+        for colonne in self.colonnes.values():
+            if len(colonne) < self.nb_lignes:
+                colonne.append(_MÉTRIQUE_ABSENTE)
+
+    def lire(self, position: int) -> Tuple[Tuple[str, int], ...]:
+        return tuple(
+            (nom, colonne[position])
+            for nom, colonne in self.colonnes.items()
+            if colonne[position] != _MÉTRIQUE_ABSENTE
+        )
+
+
+class TableClasses(Sequence[ClasseStat]):
+    """Stockage en colonnes des ClasseStat, relues à la demande sous forme d'instances."""
+
+    def __init__(
+        self,
+        registre: Optional[RegistreFichiers] = None,
+        noms_métriques: Iterable[str] = (),
+    ) -> None:
+        self.registre = registre if registre is not None else RegistreFichiers()
+        self.fichier = array("i")
+        self.loc = array("i")
+        self.ligne_début = array("i")
+        self.ligne_fin = array("i")
+        self.drapeaux = bytearray()
+        self.nom: List[str] = []
+        self.englobante: List[Optional[str]] = []
+        self.internes: List[Tuple[str, ...]] = []
+        self.métriques = ColonnesMétriques(noms_métriques)
+
+    def append(self, cls: ClasseStat) -> None:
+        self.fichier.append(self.registre.indice(cls.fichier))
+        self.loc.append(cls.loc)
+        self.ligne_début.append(cls.ligne_début)
+        self.ligne_fin.append(cls.ligne_fin)
+        self.drapeaux.append(
+            (_ABSTRAITE if cls.abstraite else 0) | (_INTERFACE if cls.est_interface else 0)
+        )
+        self.nom.append(sys.intern(cls.nom))
+        self.englobante.append(sys.intern(cls.englobante) if cls.englobante else None)
+        self.internes.append(cls.internes)
+        self.métriques.append(cls.métriques)
+
+    def extend(self, classes: Iterable[ClasseStat]) -> None:
+        for cls in classes:
+            self.append(cls)
+
+    def _lire(self, position: int) -> ClasseStat:
+        drapeaux = self.drapeaux[position]
+        return ClasseStat(
+            fichier=self.registre.chemins[self.fichier[position]],
+            nom=self.nom[position],
+            loc=self.loc[position],
+            abstraite=bool(drapeaux & _ABSTRAITE),
+            est_interface=bool(drapeaux & _INTERFACE),
+            ligne_début=self.ligne_début[position],
+            ligne_fin=self.ligne_fin[position],
+            englobante=self.englobante[position],
+            internes=self.internes[position],
+            métriques=self.métriques.lire(position),
+        )
+
+    def __len__(self) -> int:
+        return len(self.loc)
+
+    def __getitem__(self, position):  # type: ignore[override]
+        if isinstance(position, slice):
+            return [self._lire(k) for k in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self._lire(position)
+
+    def __iter__(self) -> Iterator[ClasseStat]:
+        return map(self._lire, range(len(self)))
+
+
+class TableMéthodes(Sequence[MéthodeStat]):
+    """Stockage en colonnes des MéthodeStat, sur le même principe que TableClasses."""
+
+    def __init__(
+        self,
+        registre: Optional[RegistreFichiers] = None,
+        noms_métriques: Iterable[str] = (),
+    ) -> None:
+        self.registre = registre if registre is not None else RegistreFichiers()
+        self.fichier = array("i")
+        self.loc = array("i")
+        self.ligne_début = array("i")
+        self.ligne_fin = array("i")
+        self.classe: List[str] = []
+        self.nom: List[str] = []
+        self.métriques = ColonnesMétriques(noms_métriques)
+
+    def append(self, méthode: MéthodeStat) -> None:
+        self.fichier.append(self.registre.indice(méthode.fichier))
+        self.loc.append(méthode.loc)
+        self.ligne_début.append(méthode.ligne_début)
+        self.ligne_fin.append(méthode.ligne_fin)
+        self.classe.append(sys.intern(méthode.classe))
+        self.nom.append(sys.intern(méthode.nom))
+        self.métriques.append(méthode.métriques)
+
+    def extend(self, méthodes: Iterable[MéthodeStat]) -> None:
+        for méthode in méthodes:
+            self.append(méthode)
+
+    def _lire(self, position: int) -> MéthodeStat:
+        return MéthodeStat(
+            fichier=self.registre.chemins[self.fichier[position]],
+            classe=self.classe[position],
+            nom=self.nom[position],
+            loc=self.loc[position],
+            ligne_début=self.ligne_début[position],
+            ligne_fin=self.ligne_fin[position],
+            métriques=self.métriques.lire(position),
+        )
+
+    def __len__(self) -> int:
+        return len(self.loc)
+
+    def __getitem__(self, position):  # type: ignore[override]
+        if isinstance(position, slice):
+            return [self._lire(k) for k in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self._lire(position)
+
+    def __iter__(self) -> Iterator[MéthodeStat]:
+        return map(self._lire, range(len(self)))
+
+
+class Distribution:
+    """Moyenne, variance et extrema tenus au fil de l'eau, quantiles approchés par esquisse.
+
+    La somme est tenue exactement, la variance suit l'algorithme de Welford. Les quantiles
+    reposent sur un histogramme à seaux logarithmiques (à la DDSketch) : chaque valeur
+    positive tombe dans le seau ceil(log_γ(v)), d'où une erreur relative bornée par
+    `précision` pour une mémoire logarithmique en l'étendue des valeurs.
+    """
+
+    def __init__(self, précision: float = 0.01) -> None:
+        self.précision = précision
+        self._log_gamma = math.log((1 + précision) / (1 - précision))
+        self.nombre = 0
+        self.somme = 0
+        self._m2 = 0.0
+        self.minimum: Optional[int] = None
+        self.maximum: Optional[int] = None
+        self._zéros = 0
+        self._seaux: Dict[int, int] = {}
+
+    def ajouter(self, valeur: int) -> None:
+        écart = valeur - self.moyenne
+        self.nombre += 1
+        self.somme += valeur
+        self._m2 += écart * (valeur - self.moyenne)
+        if self.minimum is None or valeur < self.minimum:
+            self.minimum = valeur
+        if self.maximum is None or valeur > self.maximum:
+            self.maximum = valeur
+        if valeur <= 0:
+            self._zéros += 1
+        else:
+            seau = math.ceil(math.log(valeur) / self._log_gamma)
+            self._seaux[seau] = self._seaux.get(seau, 0) + 1
+
+    @property
+    def moyenne(self) -> float:
+        return self.somme / self.nombre if self.nombre else 0.0
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.nombre if self.nombre else 0.0
+
+    @property
+    def écart_type(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, q: float) -> float:
+        if not self.nombre:
+            return 0.0
+        rang = q * (self.nombre - 1)
+        cumul = self._zéros
+        if rang < cumul:
+            return 0.0
+        for seau in sorted(self._seaux):
+            cumul += self._seaux[seau]
+            if rang < cumul:
+                gamma = math.exp(self._log_gamma)
+                estimation = 2 * gamma**seau / (gamma + 1)
+                # L'estimation reste dans l'étendue observée.
+                return float(min(max(estimation, self.minimum or 0), self.maximum or 0))
+        return float(self.maximum or 0)
+
+
+class PlusGrands:
+    """Les `capacité` plus grandes valeurs vues, dans un tas borné (mémoire O(capacité))."""
+
+    def __init__(self, capacité: int = 5) -> None:
+        self.capacité = capacité
+        self._tas: List[Tuple[int, str]] = []
+
+    def ajouter(self, valeur: int, étiquette: str) -> None:
+        if len(self._tas) < self.capacité:
+            heapq.heappush(self._tas, (valeur, étiquette))
+        elif (valeur, étiquette) > self._tas[0]:
+            heapq.heapreplace(self._tas, (valeur, étiquette))
+
+    def éléments(self) -> List[Tuple[int, str]]:
+        return sorted(self._tas, key=lambda élément: (-élément[0], élément[1]))
+
+
+class StatistiquesStructure:
+    """Distributions des tailles et complexités, mises à jour fichier par fichier."""
+
+    def __init__(self, nb_premiers: int = 5) -> None:
+        self.loc_classes = Distribution()
+        self.loc_méthodes = Distribution()
+        self.complexités = Distribution()
+        self.imbrications = Distribution()
+        self.nb_abstraites = 0
+        self.grandes_classes = PlusGrands(nb_premiers)
+        self.grandes_méthodes = PlusGrands(nb_premiers)
+        self.méthodes_complexes = PlusGrands(nb_premiers)
+
+    def ajouter(self, analyse: AnalyseFichier) -> None:
+        for cls in analyse.classes:
+            self.loc_classes.ajouter(cls.loc)
+            self.nb_abstraites += cls.abstraite
+            self.grandes_classes.ajouter(cls.loc, cls.nom)
+        for méthode in analyse.méthodes:
+            nom = f"{méthode.classe}.{méthode.nom}"
+            self.loc_méthodes.ajouter(méthode.loc)
+            self.grandes_méthodes.ajouter(méthode.loc, nom)
+            complexité = méthode.métrique("complexité")
+            if complexité is not None:
+                self.complexités.ajouter(complexité)
+                self.méthodes_complexes.ajouter(complexité, nom)
+            imbrication = méthode.métrique("imbrication")
+            if imbrication is not None:
+                self.imbrications.ajouter(imbrication)
+
+
 @dataclass(frozen=True)
 class RésultatAnalyse:
     total_loc: int
     détails: List[EntréeLOC]
-    classes: List[ClasseStat]
-    méthodes: List[MéthodeStat]
+    classes: TableClasses
+    méthodes: TableMéthodes
     packages: List["PackageBrut"]
+    références: List[RéférencesFichier] = field(default_factory=list)
+    statistiques: StatistiquesStructure = field(default_factory=StatistiquesStructure)
+
+
+@dataclass
+class CumulPartition:
+    # Ce que le rapport texte affiche d'une partition : les LOC par fichier et les
+    # distributions, cumulés fichier par fichier sans garder les classes ni les méthodes.
+    total_loc: int = 0
+    détails: List[EntréeLOC] = field(default_factory=list)
+    statistiques: StatistiquesStructure = field(default_factory=StatistiquesStructure)
+
+    def ajouter(self, analyse: "AnalyseFichier") -> None:
+        self.total_loc += analyse.entrée.loc
+        self.détails.append(analyse.entrée)
+        self.statistiques.ajouter(analyse)
 
 
 @dataclass
 class PackageBrut:
     nom: str
-    classes: List[ClasseStat] = field(default_factory=list)
     dépendances: Set[str] = field(default_factory=set)
+    fichiers: List[Path] = field(default_factory=list)
+    nb_classes: int = 0
+    nb_abstraites: int = 0
+
+    def ajouter(self, analyse: "AnalyseFichier", conserver_fichier: bool = True) -> None:
+        # Les classes ne sont que comptées : leurs détails vivent dans les tables de
+        # RésultatAnalyse, et la mémoire d'un paquet reste bornée par ses dépendances.
+        self.nb_classes += len(analyse.classes)
+        self.nb_abstraites += sum(1 for cls in analyse.classes if cls.abstraite)
+        self.dépendances.update(analyse.imports)
+        if conserver_fichier:
+            self.fichiers.append(analyse.entrée.chemin)
+
+    def retirer(self, analyse: "AnalyseFichier") -> None:
+        # Les dépendances ne sont pas touchées : un autre fichier du paquet peut partager
+        # le même import, seul l'appelant sait si elles disparaissent.
+        self.nb_classes -= len(analyse.classes)
+        self.nb_abstraites -= sum(1 for cls in analyse.classes if cls.abstraite)
+        self.fichiers.remove(analyse.entrée.chemin)
 
 
 @dataclass(frozen=True)
@@ -295,8 +1165,12 @@ class PackageMetrics:
     abstractness: float
     instability: float
     distance: float
-    volatility: int
+    # Nombre de commits touchant le paquet ; None sans historique git.
+    volatility: Optional[int]
     cyclic: bool
+    ca_transitif: int = 0
+    ce_transitif: int = 0
+    couche: int = 0
 
 
 def extraire_nom_package(lignes: Sequence[str]) -> str:
@@ -333,180 +1207,2304 @@ def extraire_imports(lignes: Sequence[str]) -> Set[str]:
     return imports
 
 
-def analyser_racines(racines: Sequence[Path]) -> RésultatAnalyse:
-    total = 0
-    détails: List[EntréeLOC] = []
-    classes: List[ClasseStat] = []
-    méthodes: List[MéthodeStat] = []
-    packages_temp: Dict[str, PackageBrut] = {}
-    fichiers = sorted(iterer_fichiers(racines))
-    for fichier in fichiers:
-        loc = compter_loc_fichier(fichier)
-        total += loc
-        détails.append(EntréeLOC(fichier, loc))
-        lignes = lignes_sans_commentaires(fichier)
-        classes_fichier = extraire_classes(lignes, fichier)
-        classes.extend(classes_fichier)
-        méthodes.extend(extraire_méthodes(lignes, classes_fichier, fichier))
-        nom_package = extraire_nom_package(lignes)
-        info = packages_temp.setdefault(nom_package, PackageBrut(nom_package))
-        info.classes.extend(classes_fichier)
-        info.dépendances.update(extraire_imports(lignes))
-    packages = list(packages_temp.values())
-    return RésultatAnalyse(
-        total_loc=total,
-        détails=détails,
-        classes=classes,
-        méthodes=méthodes,
-        packages=packages,
-    )
-    return RésultatAnalyse(total_loc=total, détails=détails, classes=classes, méthodes=méthodes)
-
-
-def iterer_fichiers(racines: Iterable[Path]) -> Iterable[Path]:
-    for racine in racines:
-        if racine.is_file() and racine.suffix == ".java":
-            yield racine
-        elif racine.is_dir():
-            yield from racine.rglob("*.java")
+def extraire_imports_qualifiés(lignes: Sequence[str]) -> Tuple[Set[str], Set[str]]:
+    types: Set[str] = set()
+    paquets: Set[str] = set()
+    for ligne in lignes:
+        stripped = ligne.strip()
+        if not stripped.startswith("import ") or stripped.startswith("import static "):
+            continue
+        contenu = stripped[len("import ") :].strip().rstrip(";").replace(" ", "")
+        if contenu.endswith(".*"):
+            paquets.add(contenu[:-2])
+        elif "." in contenu:
+            types.add(contenu)
+    return types, paquets
 
 
-def afficher_details_loc(titre: str, analyse: RésultatAnalyse, racine_projet: Path) -> None:
-    print(titre)
-    print("=" * len(titre))
-    print(f"Total LOC : {analyse.total_loc}")
-    for entrée in analyse.détails:
-        chemin_rel = entrée.chemin.relative_to(racine_projet)
-        print(f"  - {chemin_rel}: {entrée.loc}")
-    print()
+def extraire_références(
+    jetons: Sequence[Jeton], classes: Sequence[ClasseStat]
+) -> Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    # Pour chaque classe (nom relatif au paquet) : les identifiants capitalisés qu'elle
+    # emploie et les chaînes pointées (`a.b.Type`, `Externe.Interne`). Seules les
+    # premières composantes des chaînes comptent comme noms simples. Les jetons sont
+    # triés par ligne : les segments de l'index sont donc parcourus une seule fois.
+    segments = IndexClasses(classes).segments()
+    simples: Dict[str, Set[str]] = {}
+    pointés: Dict[str, Set[str]] = {}
+    position = -1
+    courante: Optional[ClasseStat] = None
+    chaîne: List[str] = []
+    après_point = False
+    propriétaire: Optional[ClasseStat] = None
 
+    def clore() -> None:
+        if propriétaire is None or not chaîne:
+            return
+        clé = propriétaire.nom_qualifié
+        if chaîne[0][:1].isupper():
+            simples.setdefault(clé, set()).add(chaîne[0])
+        if len(chaîne) > 1 and any(segment[:1].isupper() for segment in chaîne):
+            pointés.setdefault(clé, set()).add(".".join(chaîne))
 
-def afficher_metriques_structurales(titre: str, analyse: RésultatAnalyse) -> None:
+    for jeton in jetons:
+        while position + 1 < len(segments) and segments[position + 1][0] <= jeton.ligne:
+            position += 1
+            courante = segments[position][1]
+        if jeton.genre == "identifiant":
+            if après_point and chaîne:
+                chaîne.append(jeton.texte)
+            else:
+                clore()
+                chaîne = [jeton.texte]
+                propriétaire = courante
+            après_point = False
+        elif jeton.texte == "." and chaîne:
+            après_point = True
+        else:
+            clore()
+            chaîne = []
+            après_point = False
+    clore()
+    return {
+        clé: (tuple(sorted(simples.get(clé, ()))), tuple(sorted(pointés.get(clé, ()))))
+        for clé in sorted(set(simples) | set(pointés))
+    }
+
+
+class Profileur:
+    """Chronomètres et compteurs par étape, exportables en trace Chrome (chrome://tracing)."""
+
+    def __init__(self, nb_lents: int = 10) -> None:
+        self.nb_lents = nb_lents
+        self.durées: Dict[str, float] = {}
+        self.appels: Dict[str, int] = {}
+        self.compteurs: Dict[str, int] = {}
+        self.fichiers_lents: List[Tuple[float, str]] = []
+        self.événements: List[Tuple[str, float, float, int, Optional[str]]] = []
+
+    @contextmanager
+    def étape(self, nom: str, fichier: Optional[Path] = None) -> Iterator[None]:
+        début = time.perf_counter()
+        try:
+            yield
+        finally:
+            durée = time.perf_counter() - début
+            self.durées[nom] = self.durées.get(nom, 0.0) + durée
+            self.appels[nom] = self.appels.get(nom, 0) + 1
+            self.événements.append(
+                (nom, début, durée, os.getpid(), str(fichier) if fichier is not None else None)
+            )
+
+    def compter(self, nom: str, valeur: int = 1) -> None:
+        self.compteurs[nom] = self.compteurs.get(nom, 0) + valeur
+
+    def noter_fichier(self, fichier: Path, durée: float) -> None:
+        élément = (durée, str(fichier))
+        if len(self.fichiers_lents) < self.nb_lents:
+            heapq.heappush(self.fichiers_lents, élément)
+        elif self.nb_lents:
+            heapq.heappushpop(self.fichiers_lents, élément)
+
+    def absorber(self, autre: "Profileur") -> None:
+        for nom, durée in autre.durées.items():
+            self.durées[nom] = self.durées.get(nom, 0.0) + durée
+        for nom, appels in autre.appels.items():
+            self.appels[nom] = self.appels.get(nom, 0) + appels
+        for nom, valeur in autre.compteurs.items():
+            self.compter(nom, valeur)
+        for durée, fichier in autre.fichiers_lents:
+            self.noter_fichier(Path(fichier), durée)
+        self.événements.extend(autre.événements)
+
+    def afficher(self, sortie: TextIO) -> None:
+        titre = "Profil d'exécution"
+        print(titre, file=sortie)
+        print("-" * len(titre), file=sortie)
+        en_tête = "{:<24} {:>8} {:>10}".format("Étape", "Appels", "Temps (s)")
+        print(en_tête, file=sortie)
+        for nom, durée in sorted(self.durées.items(), key=lambda item: -item[1]):
+            print(f"{nom:<24} {self.appels[nom]:>8} {durée:>10.4f}", file=sortie)
+        for nom, valeur in sorted(self.compteurs.items()):
+            print(f"{nom} : {valeur}", file=sortie)
+        if self.fichiers_lents:
+            print("Fichiers les plus lents :", file=sortie)
+            for durée, fichier in sorted(self.fichiers_lents, reverse=True):
+                print(f"  - {fichier} : {durée * 1000:.1f} ms", file=sortie)
+        print(file=sortie)
+
+    def exporter_trace(self, chemin: Path) -> None:
+        origine = min((début for _, début, _, _, _ in self.événements), default=0.0)
+        événements = []
+        for nom, début, durée, pid, fichier in self.événements:
+            événement: Dict[str, object] = {
+                "name": nom,
+                "cat": "analyse",
+                "ph": "X",
+                "ts": (début - origine) * 1e6,
+                "dur": durée * 1e6,
+                "pid": pid,
+                "tid": pid,
+            }
+            if fichier is not None:
+                événement["args"] = {"fichier": fichier}
+            événements.append(événement)
+        contenu = {"traceEvents": événements, "displayTimeUnit": "ms"}
+        chemin.write_text(json.dumps(contenu, ensure_ascii=False), encoding="utf-8")
+
+
+def _étape(
+    profileur: Optional[Profileur], nom: str, fichier: Optional[Path] = None
+) -> ContextManager[None]:
+    return profileur.étape(nom, fichier) if profileur is not None else nullcontext()
+
+
+def _suivre(profileur: Optional[Profileur], nom: str, éléments: Iterable[T]) -> Iterator[T]:
+    # Pour un itérable consommé au fil de l'eau : seul le temps passé à produire chaque
+    # élément est compté dans l'étape, pas celui de son traitement.
+    if profileur is None:
+        yield from éléments
+        return
+    itérateur = iter(éléments)
+    while True:
+        with profileur.étape(nom):
+            try:
+                élément = next(itérateur)
+            except StopIteration:
+                return
+        yield élément
+
+
+# Niveaux d'analyse, du moins coûteux au plus complet : chacun ne fait que le travail
+# nécessaire à ses propres métriques.
+NIVEAU_LOC = "loc"
+NIVEAU_STRUCTURE = "structure"
+NIVEAU_DÉPENDANCES = "dependances"
+NIVEAUX_ANALYSE = (NIVEAU_LOC, NIVEAU_STRUCTURE, NIVEAU_DÉPENDANCES)
+
+
+def _rang_niveau(niveau: str) -> int:
+    return NIVEAUX_ANALYSE.index(niveau)
+
+
+@dataclass(frozen=True)
+class RéférencesFichier:
+    chemin: Path
+    package: str
+    imports_types: Tuple[str, ...]
+    imports_étoile: Tuple[str, ...]
+    par_classe: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]
+
+
+@dataclass(frozen=True)
+class AnalyseFichier:
+    entrée: EntréeLOC
+    classes: List[ClasseStat]
+    méthodes: List[MéthodeStat]
+    package: str
+    imports: Set[str]
+    références: Optional[RéférencesFichier] = None
+    lignes: Optional[LignesNormalisées] = None
+    # Raison pour laquelle seules les LOC ont été comptées (fichier trop gros, généré...).
+    dégradation: Optional[str] = None
+
+    def au_niveau(self, niveau: str) -> "AnalyseFichier":
+        if niveau == NIVEAU_LOC:
+            return replace(
+                self,
+                classes=[],
+                méthodes=[],
+                package="",
+                imports=set(),
+                références=None,
+                lignes=None,
+            )
+        if niveau == NIVEAU_STRUCTURE:
+            return replace(self, imports=set(), références=None)
+        return self
+
+    def en_tuple(self) -> Tuple:
+        return (
+            self.entrée.loc,
+            self.package,
+            sorted(self.imports),
+            [
+                (
+                    cls.nom,
+                    cls.loc,
+                    cls.abstraite,
+                    cls.est_interface,
+                    cls.ligne_début,
+                    cls.ligne_fin,
+                    cls.englobante,
+                    cls.internes,
+                    cls.métriques,
+                )
+                for cls in self.classes
+            ],
+            [
+                (
+                    méthode.classe,
+                    méthode.nom,
+                    méthode.loc,
+                    méthode.ligne_début,
+                    méthode.ligne_fin,
+                    méthode.métriques,
+                )
+                for méthode in self.méthodes
+            ],
+            (
+                (
+                    self.références.imports_types,
+                    self.références.imports_étoile,
+                    self.références.par_classe,
+                )
+                if self.références is not None
+                else None
+            ),
+            (
+                (self.lignes.numéros, self.lignes.empreintes)
+                if self.lignes is not None
+                else None
+            ),
+            self.dégradation,
+        )
+
+    @classmethod
+    def depuis_tuple(cls, fichier: Path, données: Tuple) -> "AnalyseFichier":
+        loc, package, imports, classes, méthodes, références, lignes, dégradation = données
+        return cls(
+            entrée=EntréeLOC(fichier, loc),
+            classes=[ClasseStat(fichier, *ligne) for ligne in classes],
+            méthodes=[MéthodeStat(fichier, *ligne) for ligne in méthodes],
+            package=package,
+            imports=set(imports),
+            références=(
+                RéférencesFichier(fichier, package, *références)
+                if références is not None
+                else None
+            ),
+            lignes=LignesNormalisées(*lignes) if lignes is not None else None,
+            dégradation=dégradation,
+        )
+
+
+def _analyser_loc(
+    fichier: Path, contenu: Optional[bytes], profileur: Optional[Profileur]
+) -> AnalyseFichier:
+    début = time.perf_counter()
+    with _étape(profileur, "fichier", fichier), _étape(profileur, "loc", fichier):
+        loc = compter_loc_fichier(fichier) if contenu is None else compter_loc_octets(contenu)
+    if profileur is not None:
+        profileur.noter_fichier(fichier, time.perf_counter() - début)
+        profileur.compter("fichiers")
+    return AnalyseFichier(
+        entrée=EntréeLOC(fichier, loc), classes=[], méthodes=[], package="", imports=set()
+    )
+
+
+@dataclass(frozen=True)
+class LimitesFichier:
+    # Au-delà de ces limites (0 : pas de limite), un fichier n'est analysé qu'au niveau loc.
+    taille_max: int = 4 << 20
+    longueur_ligne_max: int = 5000
+    durée_max: float = 10.0
+    détecter_générés: bool = True
+
+
+LIMITES_PAR_DÉFAUT = LimitesFichier()
+
+# Marqueurs usuels des générateurs (javac, protoc, ANTLR, JAXB...) cherchés dans l'en-tête :
+# l'annotation en début de ligne, ou une ligne de commentaire qui s'ouvre sur la mention du
+# générateur ou porte un « DO NOT EDIT » en capitales. Une chaîne ou un commentaire de code
+# ordinaire qui cite ces mots ne suffit pas.
+_MOTIF_GÉNÉRÉ = re.compile(
+    rb"^[ \t]*@(?:javax\.annotation\.(?:processing\.)?)?Generated\b"
+    rb"|^[ \t]*(?://+|/\*+|\*)[ \t]*(?i:<auto-generated"
+    rb"|(?:code )?generated by\b"
+    rb"|(?:this (?:file|class|code) (?:was|is) )?(?:automatically |auto-?)generated\b"
+    rb"|this (?:file|class|code) (?:was|is) generated\b)"
+    rb"|^[ \t]*(?://|/\*|\*)[^\n]*\bDO NOT EDIT\b",
+    re.MULTILINE,
+)
+_TAILLE_ENTÊTE = 2048
+# Longueur moyenne des lignes non vides au-delà de laquelle le code est jugé généré.
+_LONGUEUR_MOYENNE_GÉNÉRÉ = 150
+_MOTIF_PAQUET_OCTETS = re.compile(rb"^[ \t]*package[ \t]+([\w.]+)[ \t]*;", re.MULTILINE)
+
+
+def _motif_dégradation(contenu: bytes, limites: LimitesFichier) -> Optional[str]:
+    if limites.taille_max and len(contenu) > limites.taille_max:
+        return f"taille de {len(contenu)} octets"
+    if limites.longueur_ligne_max:
+        # Une seule recherche, menée en C, qui s'arrête à la première ligne trop longue ;
+        # l'ancrage en début de ligne évite de retenter chaque position d'une ligne courte.
+        longue = re.search(
+            rb"^[^\n]{%d,}" % (limites.longueur_ligne_max + 1), contenu, re.MULTILINE
+        )
+        if longue is not None:
+            return f"ligne de {longue.end() - longue.start()} octets"
+    if not limites.détecter_générés:
+        return None
+    if _MOTIF_GÉNÉRÉ.search(contenu, 0, _TAILLE_ENTÊTE):
+        return "code généré (en-tête)"
+    non_vides = _compter_lignes_non_vides((contenu,))
+    if non_vides and len(contenu) / non_vides > _LONGUEUR_MOYENNE_GÉNÉRÉ:
+        return "code généré (longueur des lignes)"
+    return None
+
+
+def _analyser_dégradé(
+    fichier: Path,
+    contenu: Optional[bytes],
+    profileur: Optional[Profileur],
+    dégradation: str,
+) -> AnalyseFichier:
+    analyse = _analyser_loc(fichier, contenu, profileur)
+    if contenu is None:
+        with fichier.open("rb") as handle:
+            contenu = handle.read(_TAILLE_ENTÊTE)
+    # Le paquet déclaré est retrouvé sans lexeur pour que le fichier reste compté dans
+    # son paquet.
+    paquet = _MOTIF_PAQUET_OCTETS.search(contenu)
+    if profileur is not None:
+        profileur.compter("fichiers_dégradés")
+    return replace(
+        analyse,
+        package=paquet.group(1).decode("ascii", errors="ignore") if paquet else "(default)",
+        dégradation=dégradation,
+    )
+
+
+def analyser_fichier(
+    fichier: Path,
+    contenu: Optional[bytes] = None,
+    profileur: Optional[Profileur] = None,
+    niveau: str = NIVEAU_DÉPENDANCES,
+    limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+    avec_lignes: bool = False,
+) -> AnalyseFichier:
+    # Les empreintes de lignes ne servent qu'à la détection de duplication : sans
+    # `avec_lignes`, elles ne sont ni calculées ni stockées.
+    if niveau == NIVEAU_LOC:
+        return _analyser_loc(fichier, contenu, profileur)
+    if contenu is None and limites.taille_max:
+        taille = os.stat(fichier).st_size
+        if taille > limites.taille_max:
+            return _analyser_dégradé(fichier, None, profileur, f"taille de {taille} octets")
+    début = time.perf_counter()
+    échéance = début + limites.durée_max if limites.durée_max else None
+    imports: Set[str] = set()
+    références: Optional[RéférencesFichier] = None
+    lignes_normalisées: Optional[LignesNormalisées] = None
+    if contenu is None:
+        with _étape(profileur, "lecture", fichier):
+            contenu = fichier.read_bytes()
+    dégradation = _motif_dégradation(contenu, limites)
+    if dégradation is not None:
+        return _analyser_dégradé(fichier, contenu, profileur, dégradation)
+    try:
+        with _étape(profileur, "fichier", fichier):
+            with _étape(profileur, "lexage", fichier):
+                source = lire_source_java(fichier, contenu, échéance)
+            lignes = source.lignes_code
+            with _étape(profileur, "structure", fichier):
+                structure = analyser_structure(source, visiteurs, échéance)
+            classes_fichier = structure.classes
+            méthodes = structure.méthodes
+            _vérifier_échéance(échéance)
+            if avec_lignes:
+                with _étape(profileur, "empreintes_lignes", fichier):
+                    lignes_normalisées = normaliser_lignes(source.lignes)
+            with _étape(profileur, "paquet_imports", fichier):
+                package = extraire_nom_package(lignes)
+                if niveau == NIVEAU_DÉPENDANCES:
+                    imports = extraire_imports(lignes)
+                    imports_types, imports_étoile = extraire_imports_qualifiés(lignes)
+            if niveau == NIVEAU_DÉPENDANCES:
+                _vérifier_échéance(échéance)
+                with _étape(profileur, "références", fichier):
+                    références = RéférencesFichier(
+                        chemin=fichier,
+                        package=package,
+                        imports_types=tuple(sorted(imports_types)),
+                        imports_étoile=tuple(sorted(imports_étoile)),
+                        par_classe=extraire_références(source.jetons, classes_fichier),
+                    )
+    except DélaiDépassé:
+        return _analyser_dégradé(
+            fichier, contenu, profileur, f"analyse interrompue après {limites.durée_max:g} s"
+        )
+    if profileur is not None:
+        profileur.noter_fichier(fichier, time.perf_counter() - début)
+        profileur.compter("fichiers")
+        profileur.compter("octets_lus", len(contenu))
+        profileur.compter("lignes", len(lignes))
+        profileur.compter("classes", len(classes_fichier))
+        profileur.compter("méthodes", len(méthodes))
+    return AnalyseFichier(
+        entrée=EntréeLOC(fichier, source.loc),
+        classes=classes_fichier,
+        méthodes=méthodes,
+        package=package,
+        imports=imports,
+        références=références,
+        lignes=lignes_normalisées,
+    )
+
+
+def empreinte_contenu(contenu: bytes) -> str:
+    return hashlib.sha1(contenu).hexdigest()
+
+
+@dataclass(frozen=True)
+class _TâcheAnalyse:
+    # Objet appelable plutôt que fermeture : il doit pouvoir être envoyé aux processus.
+    avec_empreinte: bool = False
+    profiler: bool = False
+    niveau: str = NIVEAU_DÉPENDANCES
+    limites: LimitesFichier = LIMITES_PAR_DÉFAUT
+    visiteurs: Tuple[VisiteurMétrique, ...] = VISITEURS_MÉTRIQUES
+    avec_lignes: bool = False
+
+    def __call__(
+        self, fichier: Path
+    ) -> Tuple[Optional[str], AnalyseFichier, Optional[Profileur]]:
+        profileur = Profileur() if self.profiler else None
+        contenu: Optional[bytes] = None
+        empreinte: Optional[str] = None
+        if self.avec_empreinte:
+            with _étape(profileur, "lecture", fichier):
+                contenu = fichier.read_bytes()
+            empreinte = empreinte_contenu(contenu)
+        analyse = analyser_fichier(
+            fichier,
+            contenu,
+            profileur,
+            self.niveau,
+            self.limites,
+            self.visiteurs,
+            self.avec_lignes,
+        )
+        return empreinte, analyse, profileur
+
+
+# Taille des lots envoyés aux processus lorsque le nombre de fichiers n'est pas connu
+# d'avance, c'est-à-dire quand ils arrivent au fil du parcours.
+_TAILLE_LOT_FLUX = 16
+
+
+def _appliquer_lot(fonction: Callable[[Path], T], lot: List[Path]) -> List[T]:
+    return [fonction(fichier) for fichier in lot]
+
+
+def appliquer_aux_fichiers(
+    fonction: Callable[[Path], T], fichiers: Iterable[Path], jobs: int
+) -> Iterator[T]:
+    # Applique `fonction` à chaque fichier, sur `jobs` processus au-delà de 1, et rend les
+    # résultats dans l'ordre des fichiers. `fonction` doit pouvoir être envoyée aux
+    # processus : un objet appelable de niveau module plutôt qu'une fermeture.
+    connus = isinstance(fichiers, Sequence)
+    if jobs <= 1 or (connus and len(fichiers) < 2):
+        yield from map(fonction, fichiers)
+        return
+    # Executor.map restitue les résultats dans l'ordre des fichiers soumis : la fusion
+    # reste donc identique à celle d'une exécution séquentielle.
+    with ProcessPoolExecutor(max_workers=jobs) as exécuteur:
+        if connus:
+            taille_lot = max(1, len(fichiers) // (jobs * 4))
+            yield from exécuteur.map(fonction, fichiers, chunksize=taille_lot)
+            return
+        # Executor.map consommerait tout l'itérable avant de rendre un résultat : les fichiers
+        # qui arrivent au fil du parcours sont soumis par lots, avec peu de lots en vol.
+        en_vol: Deque["Future[List[T]]"] = deque()
+        itérateur = iter(fichiers)
+        while True:
+            lot = list(islice(itérateur, _TAILLE_LOT_FLUX))
+            if lot:
+                en_vol.append(exécuteur.submit(_appliquer_lot, fonction, lot))
+            if en_vol and (not lot or len(en_vol) > 2 * jobs):
+                yield from en_vol.popleft().result()
+            elif not lot:
+                return
+
+
+# À incrémenter dès que l'analyseur ou le format des enregistrements change : les caches
+# écrits par une version antérieure sont alors ignorés.
+VERSION_ANALYSE = 12
+
+
+@dataclass
+class EntréeCache:
+    taille: int
+    mtime_ns: int
+    empreinte: str
+    niveau: str
+    # Limites sous lesquelles l'analyse a été faite (astuple de LimitesFichier) : sous
+    # d'autres limites, le même fichier aurait pu être dégradé.
+    limites: Tuple
+    # Signature des visiteurs de métriques qui ont parcouru le fichier.
+    visiteurs: Tuple[str, ...]
+    # Vrai si les empreintes de lignes (--duplication) ont été calculées.
+    avec_lignes: bool
+    données: Tuple
+
+
+class CacheAnalyse:
+    NOM_FICHIER = "analyses.pickle"
+
+    def __init__(self, dossier: Path) -> None:
+        self.dossier = dossier
+        self._entrées: Dict[str, EntréeCache] = {}
+        self._états: Dict[str, os.stat_result] = {}
+        self._modifié = False
+        self._charger()
+
+    def _charger(self) -> None:
+        try:
+            with (self.dossier / self.NOM_FICHIER).open("rb") as handle:
+                version, entrées = pickle.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            self._modifié = True
+            return
+        if version != VERSION_ANALYSE:
+            self._modifié = True
+            return
+        self._entrées = {
+            clé: EntréeCache(*valeur) for clé, valeur in entrées.items()
+        }
+
+    def est_à_jour(
+        self,
+        fichier: Path,
+        niveau: str = NIVEAU_DÉPENDANCES,
+        limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+        visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+        avec_lignes: bool = False,
+    ) -> bool:
+        clé = os.path.abspath(fichier)
+        état = os.stat(fichier)
+        self._états[clé] = état
+        entrée = self._entrées.get(clé)
+        # Une entrée plus complète que nécessaire sert aussi les niveaux inférieurs.
+        if entrée is None or _rang_niveau(entrée.niveau) < _rang_niveau(niveau):
+            return False
+        if entrée.limites != astuple(limites):
+            return False
+        if entrée.visiteurs != _signature_visiteurs(visiteurs):
+            return False
+        if avec_lignes and not entrée.avec_lignes:
+            return False
+        if entrée.taille != état.st_size or entrée.mtime_ns != état.st_mtime_ns:
+            if entrée.taille != état.st_size:
+                return False
+            if empreinte_contenu(fichier.read_bytes()) != entrée.empreinte:
+                return False
+            entrée.mtime_ns = état.st_mtime_ns
+            self._modifié = True
+        return True
+
+    def restituer(
+        self, fichier: Path, niveau: str = NIVEAU_DÉPENDANCES, avec_lignes: bool = False
+    ) -> AnalyseFichier:
+        entrée = self._entrées[os.path.abspath(fichier)]
+        analyse = AnalyseFichier.depuis_tuple(fichier, entrée.données).au_niveau(niveau)
+        # Une entrée avec empreintes de lignes sert aussi une analyse qui n'en veut pas.
+        return analyse if avec_lignes else replace(analyse, lignes=None)
+
+    def consulter(
+        self,
+        fichier: Path,
+        niveau: str = NIVEAU_DÉPENDANCES,
+        limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+        visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+        avec_lignes: bool = False,
+    ) -> Optional[AnalyseFichier]:
+        if not self.est_à_jour(fichier, niveau, limites, visiteurs, avec_lignes):
+            return None
+        return self.restituer(fichier, niveau, avec_lignes)
+
+    def mettre_à_jour(
+        self,
+        fichier: Path,
+        empreinte: str,
+        analyse: AnalyseFichier,
+        niveau: str = NIVEAU_DÉPENDANCES,
+        limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+        visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+        avec_lignes: bool = False,
+    ) -> None:
+        clé = os.path.abspath(fichier)
+        état = self._états.get(clé) or os.stat(fichier)
+        self._entrées[clé] = EntréeCache(
+            état.st_size,
+            état.st_mtime_ns,
+            empreinte,
+            niveau,
+            astuple(limites),
+            _signature_visiteurs(visiteurs),
+            avec_lignes,
+            analyse.en_tuple(),
+        )
+        self._modifié = True
+
+    def enregistrer(self) -> None:
+        disparus = [
+            clé
+            for clé in self._entrées
+            if clé not in self._états and not os.path.exists(clé)
+        ]
+        for clé in disparus:
+            del self._entrées[clé]
+        if not (self._modifié or disparus):
+            return
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        cible = self.dossier / self.NOM_FICHIER
+        temporaire = cible.with_suffix(".tmp")
+        entrées = {
+            clé: (
+                entrée.taille,
+                entrée.mtime_ns,
+                entrée.empreinte,
+                entrée.niveau,
+                entrée.limites,
+                entrée.visiteurs,
+                entrée.avec_lignes,
+                entrée.données,
+            )
+            for clé, entrée in self._entrées.items()
+        }
+        with temporaire.open("wb") as handle:
+            pickle.dump((VERSION_ANALYSE, entrées), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaire, cible)
+        self._modifié = False
+
+
+# Motifs au format .gitignore appliqués en plus des fichiers .gitignore rencontrés : le
+# dépôt et les classes compilées par l'IDE n'ont pas à être parcourus. Le dossier de sortie
+# de l'IDE n'est écarté qu'à la base de chaque racine : un paquet Java nommé `out` reste
+# analysé.
+EXCLUSIONS_PAR_DÉFAUT = (".git/", "/out/")
+
+
+@dataclass(frozen=True)
+class MotifIgnoré:
+    expression: "re.Pattern[str]"
+    négation: bool
+    dossier_seul: bool
+    # Un motif ancré porte sur le chemin relatif au .gitignore, les autres sur le seul nom.
+    ancré: bool
+
+    @classmethod
+    def depuis_ligne(cls, ligne: str) -> Optional["MotifIgnoré"]:
+        motif = ligne.rstrip("\n").rstrip()
+        if not motif or motif.startswith("#"):
+            return None
+        négation = motif.startswith("!")
+        if négation:
+            motif = motif[1:]
+        elif motif.startswith("\\"):
+            motif = motif[1:]
+        dossier_seul = motif.endswith("/")
+        motif = motif.rstrip("/")
+        if not motif:
+            return None
+        ancré = "/" in motif
+        motif = motif.lstrip("/")
+        return cls(re.compile(_traduire_motif(motif)), négation, dossier_seul, ancré)
+
+
+def _traduire_motif(motif: str) -> str:
+    morceaux: List[str] = []
+    position = 0
+    while position < len(motif):
+        if motif.startswith("**/", position):
+            morceaux.append("(?:.*/)?")
+            position += 3
+        elif motif.startswith("**", position):
+            morceaux.append(".*")
+            position += 2
+        elif motif[position] == "*":
+            morceaux.append("[^/]*")
+            position += 1
+        elif motif[position] == "?":
+            morceaux.append("[^/]")
+            position += 1
+        elif motif[position] == "[" and "]" in motif[position + 2 :]:
+            fin = motif.index("]", position + 2)
+            classe = motif[position + 1 : fin].replace("\\", "\\\\")
+            if classe.startswith("!"):
+                classe = "^" + classe[1:]
+            morceaux.append(f"[{classe}]")
+            position = fin + 1
+        elif motif[position] == "\\" and position + 1 < len(motif):
+            morceaux.append(re.escape(motif[position + 1]))
+            position += 2
+        else:
+            morceaux.append(re.escape(motif[position]))
+            position += 1
+    return "".join(morceaux)
+
+
+@dataclass(frozen=True)
+class RèglesIgnorées:
+    base: str
+    motifs: Tuple[MotifIgnoré, ...]
+
+    @classmethod
+    def depuis_motifs(cls, motifs: Iterable[str], base: str = "") -> "RèglesIgnorées":
+        return cls(base, tuple(filter(None, map(MotifIgnoré.depuis_ligne, motifs))))
+
+    @classmethod
+    def depuis_fichier(cls, fichier: str) -> Optional["RèglesIgnorées"]:
+        try:
+            with open(fichier, encoding="utf-8", errors="ignore") as handle:
+                motifs = tuple(filter(None, map(MotifIgnoré.depuis_ligne, handle)))
+        except OSError:
+            return None
+        return cls(os.path.dirname(fichier), motifs) if motifs else None
+
+
+def _est_ignoré(
+    règles: Sequence[RèglesIgnorées], chemin: str, nom: str, est_dossier: bool
+) -> bool:
+    # Comme pour git, le dernier motif qui correspond l'emporte, les .gitignore les plus
+    # profonds étant consultés après ceux de leurs ancêtres.
+    ignoré = False
+    for règle in règles:
+        relatif = chemin[len(règle.base) + 1 :] if règle.base else chemin
+        for motif in règle.motifs:
+            if motif.dossier_seul and not est_dossier:
+                continue
+            if motif.expression.fullmatch(relatif if motif.ancré else nom):
+                ignoré = not motif.négation
+    return ignoré
+
+
+def _règles_ancêtres(dossier: str) -> List[RèglesIgnorées]:
+    # Une racine située dans un dépôt hérite des .gitignore de ses dossiers parents,
+    # jusqu'au dossier qui contient `.git`.
+    ancêtres: List[str] = []
+    courant = os.path.dirname(dossier)
+    while True:
+        ancêtres.append(courant)
+        if os.path.exists(os.path.join(courant, ".git")):
+            break
+        parent = os.path.dirname(courant)
+        if parent == courant:
+            return []
+        courant = parent
+    règles: List[RèglesIgnorées] = []
+    for ancêtre in reversed(ancêtres):
+        règle = RèglesIgnorées.depuis_fichier(os.path.join(ancêtre, ".gitignore"))
+        if règle is not None:
+            règles.append(règle)
+    return règles
+
+
+def iterer_fichiers(
+    racines: Iterable[Path],
+    exclusions: Sequence[str] = EXCLUSIONS_PAR_DÉFAUT,
+    gitignore: bool = True,
+) -> Iterator[Path]:
+    for fichier, _ in _parcourir(racines, exclusions, gitignore, avec_état=False):
+        yield fichier
+
+
+def iterer_entrées(
+    racines: Iterable[Path],
+    exclusions: Sequence[str] = EXCLUSIONS_PAR_DÉFAUT,
+    gitignore: bool = True,
+) -> Iterator[Tuple[Path, os.stat_result]]:
+    # Comme iterer_fichiers, avec l'état de chaque fichier lu sur l'entrée du parcours.
+    for fichier, état in _parcourir(racines, exclusions, gitignore, avec_état=True):
+        assert état is not None
+        yield fichier, état
+
+
+def _parcourir(
+    racines: Iterable[Path],
+    exclusions: Sequence[str],
+    gitignore: bool,
+    avec_état: bool,
+) -> Iterator[Tuple[Path, Optional[os.stat_result]]]:
+    # Les racines puis les entrées de chaque dossier sont parcourues dans l'ordre des noms :
+    # les fichiers sortent au fil du parcours, déjà dans l'ordre de sorted(), ce qui permet
+    # de lancer l'analyse avant la fin de l'exploration d'un grand arbre. Les exclusions
+    # sont ancrées à chaque racine, comme un .gitignore posé à sa base, mais examinées à
+    # part : une négation `!motif` d'un .gitignore ne peut pas réinclure ce qu'elles
+    # écartent.
+    motifs = RèglesIgnorées.depuis_motifs(exclusions).motifs
+    dossiers_vus: Set[Tuple[int, int]] = set()
+    fichiers_vus: Set[Tuple[int, int]] = set()
+    for racine in sorted(racines):
+        chemin_racine = os.path.abspath(racine)
+        try:
+            état = os.stat(chemin_racine)
+        except OSError:
+            continue
+        if os.path.isfile(chemin_racine):
+            clé = (état.st_dev, état.st_ino)
+            if racine.suffix == ".java" and clé not in fichiers_vus:
+                fichiers_vus.add(clé)
+                yield racine, état if avec_état else None
+            continue
+        exclues = RèglesIgnorées(chemin_racine, motifs)
+        règles = _règles_ancêtres(chemin_racine) if gitignore else []
+        yield from _parcourir_dossier(
+            racine,
+            chemin_racine,
+            exclues,
+            règles,
+            gitignore,
+            dossiers_vus,
+            fichiers_vus,
+            avec_état,
+        )
+
+
+_Cadre = Tuple[Path, int, List[RèglesIgnorées], Iterator["os.DirEntry[str]"]]
+
+
+def _parcourir_dossier(
+    racine: Path,
+    chemin_racine: str,
+    exclues: RèglesIgnorées,
+    règles_racine: List[RèglesIgnorées],
+    gitignore: bool,
+    dossiers_vus: Set[Tuple[int, int]],
+    fichiers_vus: Set[Tuple[int, int]],
+    avec_état: bool = False,
+) -> Iterator[Tuple[Path, Optional[os.stat_result]]]:
+    # Parcours en profondeur sans récursion : une pile de cadres (dossier, périphérique,
+    # règles applicables, entrées restantes) remplace la pile d'appels. Avec `avec_état`,
+    # l'état de chaque fichier est pris sur son entrée, qui le garde en mémoire : un lien
+    # symbolique n'est pas relu pour sa clé.
+    pile: List[_Cadre] = []
+
+    def ouvrir(dossier: Path, chemin: str, règles: List[RèglesIgnorées]) -> bool:
+        try:
+            état = os.stat(chemin)
+        except OSError:
+            return False
+        # Un lien symbolique qui ramène vers un dossier déjà parcouru (boucle ou racines qui
+        # se recouvrent) est ignoré.
+        if (état.st_dev, état.st_ino) in dossiers_vus:
+            return False
+        dossiers_vus.add((état.st_dev, état.st_ino))
+        try:
+            with os.scandir(chemin) as itérateur:
+                entrées = sorted(itérateur, key=lambda entrée: entrée.name)
+        except OSError:
+            return False
+        if gitignore and any(entrée.name == ".gitignore" for entrée in entrées):
+            règle = RèglesIgnorées.depuis_fichier(os.path.join(chemin, ".gitignore"))
+            if règle is not None:
+                règles = règles + [règle]
+        pile.append((dossier, état.st_dev, règles, iter(entrées)))
+        return True
+
+    ouvrir(racine, chemin_racine, règles_racine)
+    while pile:
+        dossier, périphérique, règles, entrées = pile[-1]
+        for entrée in entrées:
+            try:
+                est_dossier = entrée.is_dir()
+                if not est_dossier and not (
+                    entrée.name.endswith(".java") and entrée.is_file()
+                ):
+                    continue
+                if _est_ignoré(
+                    (exclues,), entrée.path, entrée.name, est_dossier
+                ) or _est_ignoré(règles, entrée.path, entrée.name, est_dossier):
+                    continue
+                if est_dossier:
+                    if ouvrir(dossier / entrée.name, entrée.path, règles):
+                        break
+                    continue
+                if entrée.is_symlink():
+                    cible = entrée.stat()
+                    clé = (cible.st_dev, cible.st_ino)
+                else:
+                    clé = (périphérique, entrée.inode())
+                état = entrée.stat() if avec_état else None
+            except OSError:
+                continue
+            if clé not in fichiers_vus:
+                fichiers_vus.add(clé)
+                yield dossier / entrée.name, état
+        else:
+            pile.pop()
+
+
+def fusionner_analyses(
+    analyses: Iterable[AnalyseFichier],
+    niveau: str = NIVEAU_DÉPENDANCES,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+) -> RésultatAnalyse:
+    total = 0
+    détails: List[EntréeLOC] = []
+    registre = RegistreFichiers()
+    classes = TableClasses(registre, noms_métriques(visiteurs))
+    méthodes = TableMéthodes(registre, noms_métriques(visiteurs))
+    références: List[RéférencesFichier] = []
+    packages_temp: Dict[str, PackageBrut] = {}
+    statistiques = StatistiquesStructure()
+    for analyse in analyses:
+        total += analyse.entrée.loc
+        détails.append(analyse.entrée)
+        classes.extend(analyse.classes)
+        méthodes.extend(analyse.méthodes)
+        statistiques.ajouter(analyse)
+        if niveau == NIVEAU_LOC:
+            continue
+        packages_temp.setdefault(analyse.package, PackageBrut(analyse.package)).ajouter(analyse)
+        if analyse.références is not None:
+            références.append(analyse.références)
+    packages = list(packages_temp.values())
+    return RésultatAnalyse(
+        total_loc=total,
+        détails=détails,
+        classes=classes,
+        méthodes=méthodes,
+        packages=packages,
+        références=références,
+        statistiques=statistiques,
+    )
+
+
+def iterer_analyses(
+    fichiers: Iterable[Path],
+    jobs: int = 1,
+    cache: Optional[CacheAnalyse] = None,
+    profileur: Optional[Profileur] = None,
+    niveau: str = NIVEAU_DÉPENDANCES,
+    limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+    avec_lignes: bool = False,
+) -> Iterator[AnalyseFichier]:
+    tâche = _TâcheAnalyse(
+        avec_empreinte=cache is not None,
+        profiler=profileur is not None,
+        niveau=niveau,
+        limites=limites,
+        visiteurs=tuple(visiteurs),
+        avec_lignes=avec_lignes,
+    )
+    # Les fichiers peuvent arriver au fil du parcours : la file garde l'ordre de tous les
+    # fichiers vus, ceux servis par le cache étant restitués entre deux résultats d'analyse.
+    vus: Deque[Tuple[Path, bool]] = deque()
+
+    def à_analyser() -> Iterator[Path]:
+        for fichier in fichiers:
+            valide = False
+            if cache is not None:
+                with _étape(profileur, "cache"):
+                    valide = cache.est_à_jour(fichier, niveau, limites, visiteurs, avec_lignes)
+            vus.append((fichier, valide))
+            if not valide:
+                yield fichier
+
+    def depuis_cache() -> Iterator[AnalyseFichier]:
+        while vus and vus[0][1]:
+            assert cache is not None
+            yield cache.restituer(vus.popleft()[0], niveau, avec_lignes)
+
+    for empreinte, analyse, profil_fichier in appliquer_aux_fichiers(tâche, à_analyser(), jobs):
+        yield from depuis_cache()
+        fichier, _ = vus.popleft()
+        # Un fichier dégradé n'est pas mis en cache : il sera réexaminé avec les limites
+        # de la prochaine exécution.
+        if cache is not None and empreinte is not None and analyse.dégradation is None:
+            cache.mettre_à_jour(
+                fichier, empreinte, analyse, niveau, limites, visiteurs, avec_lignes
+            )
+        if profileur is not None and profil_fichier is not None:
+            profileur.absorber(profil_fichier)
+        yield analyse
+    yield from depuis_cache()
+
+
+def analyser_racines(
+    racines: Sequence[Path],
+    jobs: int = 1,
+    cache: Optional[CacheAnalyse] = None,
+    profileur: Optional[Profileur] = None,
+    niveau: str = NIVEAU_DÉPENDANCES,
+    exclusions: Sequence[str] = EXCLUSIONS_PAR_DÉFAUT,
+    gitignore: bool = True,
+    limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+) -> RésultatAnalyse:
+    # Le parcours alimente directement l'analyse : son temps est compté dans l'étape.
+    fichiers = iterer_fichiers(racines, exclusions, gitignore)
+    with _étape(profileur, "analyse"):
+        return fusionner_analyses(
+            iterer_analyses(fichiers, jobs, cache, profileur, niveau, limites, visiteurs),
+            niveau,
+            visiteurs,
+        )
+
+
+def afficher_details_loc(
+    titre: str, analyse: Union[RésultatAnalyse, CumulPartition], racine_projet: Path
+) -> None:
+    print(titre)
+    print("=" * len(titre))
+    print(f"Total LOC : {analyse.total_loc}")
+    for entrée in analyse.détails:
+        print(f"  - {_chemin_affiché(entrée.chemin, racine_projet)}: {entrée.loc}")
+    print()
+
+
+def _résumé_distribution(distribution: Distribution) -> str:
+    return (
+        f"p50 {distribution.quantile(0.5):.0f}, p90 {distribution.quantile(0.9):.0f}, "
+        f"p99 {distribution.quantile(0.99):.0f}, écart-type {distribution.écart_type:.1f}"
+    )
+
+
+def afficher_fichiers_dégradés(
+    titre: str, analyses: Sequence[AnalyseFichier], racine_projet: Path
+) -> None:
+    print(titre)
+    print("-" * len(titre))
+    for analyse in analyses:
+        print(
+            f"  - {_chemin_affiché(analyse.entrée.chemin, racine_projet)} : "
+            f"{analyse.dégradation} ({analyse.entrée.loc} LOC)"
+        )
+    print()
+
+
+def afficher_metriques_structurales(
+    titre: str, analyse: Union[RésultatAnalyse, CumulPartition]
+) -> None:
     print(titre)
     print("-" * len(titre))
-    nb_classes = len(analyse.classes)
-    nb_méthodes = len(analyse.méthodes)
-    if nb_classes:
-        moyenne_classe = mean(cls.loc for cls in analyse.classes)
-        nb_abstraites = sum(1 for cls in analyse.classes if cls.abstraite)
-        print(f"Nombre de classes : {nb_classes}")
-        print(f"  - Moyenne LOC par classe : {moyenne_classe:.1f}")
-        print(f"  - Classes abstraites : {nb_abstraites} ({nb_abstraites / nb_classes:.1%})")
-        print(f"  - Classes concrètes : {nb_classes - nb_abstraites}")
+    statistiques = analyse.statistiques
+    classes = statistiques.loc_classes
+    méthodes = statistiques.loc_méthodes
+    if classes.nombre:
+        nb_abstraites = statistiques.nb_abstraites
+        print(f"Nombre de classes : {classes.nombre}")
+        print(f"  - Moyenne LOC par classe : {classes.moyenne:.1f}")
+        print(f"  - Distribution LOC par classe : {_résumé_distribution(classes)}")
+        print(
+            f"  - Classes abstraites : {nb_abstraites} ({nb_abstraites / classes.nombre:.1%})"
+        )
+        print(f"  - Classes concrètes : {classes.nombre - nb_abstraites}")
     else:
         print("Aucune classe détectée")
-    if nb_méthodes:
-        moyenne_méthode = mean(méthode.loc for méthode in analyse.méthodes)
-        print(f"Nombre de méthodes : {nb_méthodes}")
-        print(f"  - Moyenne LOC par méthode : {moyenne_méthode:.1f}")
+    if méthodes.nombre:
+        print(f"Nombre de méthodes : {méthodes.nombre}")
+        print(f"  - Moyenne LOC par méthode : {méthodes.moyenne:.1f}")
+        print(f"  - Distribution LOC par méthode : {_résumé_distribution(méthodes)}")
+        complexités = statistiques.complexités
+        if complexités.nombre:
+            print(f"  - Complexité cyclomatique moyenne : {complexités.moyenne:.1f}")
+            print(f"  - Distribution de la complexité : {_résumé_distribution(complexités)}")
+        if statistiques.imbrications.nombre:
+            print(f"  - Imbrication maximale : {statistiques.imbrications.maximum}")
     else:
         print("Aucune méthode détectée")
-    plus_grande_classe = max(analyse.classes, key=lambda cls: cls.loc, default=None)
-    plus_grande_méthode = max(analyse.méthodes, key=lambda méthode: méthode.loc, default=None)
-    if plus_grande_classe is not None:
-        print(
-            "Classe la plus volumineuse : "
-            f"{plus_grande_classe.nom} ({plus_grande_classe.loc} LOC)"
+    if classes.nombre:
+        print("Classes les plus volumineuses :")
+        for loc, nom in statistiques.grandes_classes.éléments():
+            print(f"  - {nom} ({loc} LOC)")
+    if méthodes.nombre:
+        print("Méthodes les plus volumineuses :")
+        for loc, nom in statistiques.grandes_méthodes.éléments():
+            print(f"  - {nom} ({loc} LOC)")
+    if statistiques.complexités.nombre:
+        print("Méthodes les plus complexes :")
+        for complexité, nom in statistiques.méthodes_complexes.éléments():
+            print(f"  - {nom} (complexité {complexité})")
+    print()
+
+
+def _filtrer_dépendances(packages: Sequence[PackageBrut]) -> Dict[str, Set[str]]:
+    noms = {pkg.nom for pkg in packages}
+    dépendances_filtrées: Dict[str, Set[str]] = {}
+    for pkg in packages:
+        dépendances_filtrées[pkg.nom] = {
+            dep for dep in pkg.dépendances if dep in noms and dep != pkg.nom
+        }
+    return dépendances_filtrées
+
+
+def composantes_fortement_connexes(dépendances: Dict[str, Set[str]]) -> List[Tuple[str, ...]]:
+    # Tarjan sans récursion : la pile d'appels est remplacée par une pile explicite
+    # d'itérateurs, si bien qu'une chaîne de milliers de paquets ne bute plus sur la limite
+    # de récursion. Les composantes sortent dans l'ordre topologique inverse : celles dont
+    # on dépend précèdent celles qui en dépendent.
+    indices: Dict[str, int] = {}
+    lowlink: Dict[str, int] = {}
+    pile: List[str] = []
+    sur_pile: Set[str] = set()
+    composantes: List[Tuple[str, ...]] = []
+
+    def visiter(nom: str) -> Iterator[str]:
+        indices[nom] = lowlink[nom] = len(indices)
+        pile.append(nom)
+        sur_pile.add(nom)
+        return iter(sorted(dépendances.get(nom, ())))
+
+    for racine in sorted(dépendances):
+        if racine in indices:
+            continue
+        travail = [(racine, visiter(racine))]
+        while travail:
+            nom, successeurs = travail[-1]
+            for successeur in successeurs:
+                if successeur not in indices:
+                    travail.append((successeur, visiter(successeur)))
+                    break
+                if successeur in sur_pile:
+                    lowlink[nom] = min(lowlink[nom], indices[successeur])
+            else:
+                travail.pop()
+                if travail:
+                    parent = travail[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[nom])
+                if lowlink[nom] == indices[nom]:
+                    composante: List[str] = []
+                    while True:
+                        sommet = pile.pop()
+                        sur_pile.remove(sommet)
+                        composante.append(sommet)
+                        if sommet == nom:
+                            break
+                    composantes.append(tuple(sorted(composante)))
+    return composantes
+
+
+@dataclass(frozen=True)
+class GraphePackages:
+    composantes: List[Tuple[str, ...]]
+    composante_de: Dict[str, int]
+    successeurs: List[Set[int]]
+    couches: List[int]
+    cycliques: Set[str]
+
+    def cycles(self) -> List[Tuple[str, ...]]:
+        return sorted(
+            composante
+            for composante in self.composantes
+            if composante[0] in self.cycliques
         )
-    if plus_grande_méthode is not None:
-        print(
-            "Méthode la plus volumineuse : "
-            f"{plus_grande_méthode.classe}.{plus_grande_méthode.nom} "
-            f"({plus_grande_méthode.loc} LOC)"
+
+    def paquets_par_couche(self) -> List[List[str]]:
+        couches: List[List[str]] = [[] for _ in range(max(self.couches, default=-1) + 1)]
+        for composante, couche in zip(self.composantes, self.couches):
+            couches[couche].extend(composante)
+        return [sorted(noms) for noms in couches]
+
+
+def condenser_dépendances(dépendances: Dict[str, Set[str]]) -> GraphePackages:
+    composantes = composantes_fortement_connexes(dépendances)
+    composante_de = {
+        nom: position for position, composante in enumerate(composantes) for nom in composante
+    }
+    successeurs: List[Set[int]] = [set() for _ in composantes]
+    cycliques: Set[str] = set()
+    for position, composante in enumerate(composantes):
+        for nom in composante:
+            for dépendance in dépendances.get(nom, ()):
+                cible = composante_de[dépendance]
+                if cible != position:
+                    successeurs[position].add(cible)
+                elif len(composante) > 1 or dépendance == nom:
+                    cycliques.update(composante)
+    # Couche 0 : les composantes qui ne dépendent de rien. L'ordre de sortie de Tarjan
+    # garantit que les successeurs ont déjà leur couche.
+    couches: List[int] = []
+    for position in range(len(composantes)):
+        couches.append(1 + max((couches[cible] for cible in successeurs[position]), default=-1))
+    return GraphePackages(composantes, composante_de, successeurs, couches, cycliques)
+
+
+def _détecter_paquets_cycliques(dépendances: Dict[str, Set[str]]) -> Set[str]:
+    return condenser_dépendances(dépendances).cycliques
+
+
+def couplages_transitifs(graphe: GraphePackages) -> Dict[str, Tuple[int, int]]:
+    # Les paquets accessibles sont des entiers utilisés comme ensembles de bits ; une
+    # composante hérite de l'union de ses successeurs, parcourus dans l'ordre de Tarjan
+    # (descendants) puis dans l'ordre inverse (ascendants).
+    nb = len(graphe.composantes)
+    membres: List[int] = []
+    bit = 0
+    for composante in graphe.composantes:
+        membres.append(((1 << len(composante)) - 1) << bit)
+        bit += len(composante)
+    prédécesseurs: List[List[int]] = [[] for _ in range(nb)]
+    for position, cibles in enumerate(graphe.successeurs):
+        for cible in cibles:
+            prédécesseurs[cible].append(position)
+    descendants = [0] * nb
+    for position in range(nb):
+        for cible in graphe.successeurs[position]:
+            descendants[position] |= descendants[cible] | membres[cible]
+    ascendants = [0] * nb
+    for position in reversed(range(nb)):
+        for source in prédécesseurs[position]:
+            ascendants[position] |= ascendants[source] | membres[source]
+    couplages: Dict[str, Tuple[int, int]] = {}
+    for position, composante in enumerate(graphe.composantes):
+        # Dans un cycle, chaque paquet atteint les autres membres de sa composante.
+        voisins = len(composante) - 1 if composante[0] in graphe.cycliques else 0
+        ca = bin(ascendants[position]).count("1") + voisins
+        ce = bin(descendants[position]).count("1") + voisins
+        for nom in composante:
+            couplages[nom] = (ca, ce)
+    return couplages
+
+
+def _nom_complet(package: str, nom_qualifié: str) -> str:
+    return nom_qualifié if package == "(default)" else f"{package}.{nom_qualifié}"
+
+
+class IndexSymboles:
+    """Noms complets des classes analysées, construits une fois pour toute l'exécution."""
+
+    def __init__(self, noms_complets: Iterable[str]) -> None:
+        self.noms_complets: Set[str] = set(noms_complets)
+
+    @classmethod
+    def construire(cls, analyse: RésultatAnalyse) -> "IndexSymboles":
+        paquets = {références.chemin: références.package for références in analyse.références}
+        return cls(
+            _nom_complet(paquets.get(cls_stat.fichier, "(default)"), cls_stat.nom_qualifié)
+            for cls_stat in analyse.classes
+        )
+
+    def résoudre(
+        self,
+        nom: str,
+        package: str,
+        classe: str,
+        imports_types: Dict[str, str],
+        imports_étoile: Sequence[str],
+    ) -> Optional[str]:
+        # Ordre de résolution Java : classes internes des classes englobantes, import
+        # explicite, même paquet, puis imports à l'étoile.
+        englobante: Optional[str] = classe
+        while englobante:
+            candidat = _nom_complet(package, f"{englobante}.{nom}")
+            if candidat in self.noms_complets:
+                return candidat
+            englobante = englobante.rpartition(".")[0]
+        importé = imports_types.get(nom)
+        if importé is not None:
+            return importé if importé in self.noms_complets else None
+        candidat = _nom_complet(package, nom)
+        if candidat in self.noms_complets:
+            return candidat
+        for paquet in imports_étoile:
+            candidat = f"{paquet}.{nom}"
+            if candidat in self.noms_complets:
+                return candidat
+        return None
+
+    def résoudre_pointé(
+        self,
+        chaîne: str,
+        package: str,
+        classe: str,
+        imports_types: Dict[str, str],
+        imports_étoile: Sequence[str],
+    ) -> Optional[str]:
+        segments = chaîne.split(".")
+        for longueur in range(len(segments), 1, -1):
+            candidat = ".".join(segments[:longueur])
+            if candidat in self.noms_complets:
+                return candidat
+        base = self.résoudre(segments[0], package, classe, imports_types, imports_étoile)
+        if base is None:
+            return None
+        for segment in segments[1:]:
+            suivant = f"{base}.{segment}"
+            if suivant not in self.noms_complets:
+                break
+            base = suivant
+        return base
+
+
+@dataclass(frozen=True)
+class CouplageClasse:
+    nom: str
+    fan_in: int
+    fan_out: int
+
+
+def construire_graphe_classes(
+    analyse: RésultatAnalyse, index: Optional[IndexSymboles] = None
+) -> Dict[str, Set[str]]:
+    if index is None:
+        index = IndexSymboles.construire(analyse)
+    graphe: Dict[str, Set[str]] = {nom: set() for nom in index.noms_complets}
+    for références in analyse.références:
+        imports_types = {nom.rpartition(".")[2]: nom for nom in références.imports_types}
+        for classe, (simples, pointés) in références.par_classe.items():
+            source = _nom_complet(références.package, classe)
+            if source not in graphe:
+                continue
+            cibles = graphe[source]
+            for nom in simples:
+                cible = index.résoudre(
+                    nom, références.package, classe, imports_types, références.imports_étoile
+                )
+                if cible is not None and cible != source:
+                    cibles.add(cible)
+            for chaîne in pointés:
+                cible = index.résoudre_pointé(
+                    chaîne, références.package, classe, imports_types, références.imports_étoile
+                )
+                if cible is not None and cible != source:
+                    cibles.add(cible)
+    return graphe
+
+
+def couplages_classes(graphe: Dict[str, Set[str]]) -> List[CouplageClasse]:
+    entrants: Dict[str, int] = {nom: 0 for nom in graphe}
+    for cibles in graphe.values():
+        for cible in cibles:
+            entrants[cible] = entrants.get(cible, 0) + 1
+    return [
+        CouplageClasse(nom=nom, fan_in=entrants[nom], fan_out=len(graphe[nom]))
+        for nom in sorted(graphe)
+    ]
+
+
+def graphe_packages(packages: Sequence[PackageBrut]) -> GraphePackages:
+    return condenser_dépendances(_filtrer_dépendances(packages))
+
+
+_MODULE_EMPREINTE = (1 << 61) - 1
+_BASE_EMPREINTE = 0x100000001B3
+
+
+@dataclass(frozen=True)
+class BlocDupliqué:
+    lignes: int
+    fichier: Path
+    début: int
+    fin: int
+    fichier_copie: Path
+    début_copie: int
+    fin_copie: int
+
+
+@dataclass
+class RapportDuplication:
+    taille_fenêtre: int
+    lignes: Dict[Path, int]
+    lignes_dupliquées: Dict[Path, int]
+    lignes_inter_partitions: Dict[Path, int]
+    blocs: List[BlocDupliqué]
+
+
+def _empreintes_fenêtres(valeurs: Sequence[int], taille: int) -> Iterator[int]:
+    # Empreinte de Rabin–Karp de chaque fenêtre de `taille` lignes consécutives, mise à
+    # jour en temps constant d'une fenêtre à la suivante.
+    if len(valeurs) < taille:
+        return
+    poids_sortant = pow(_BASE_EMPREINTE, taille - 1, _MODULE_EMPREINTE)
+    empreinte = 0
+    for valeur in valeurs[:taille]:
+        empreinte = (empreinte * _BASE_EMPREINTE + valeur) % _MODULE_EMPREINTE
+    yield empreinte
+    for position in range(taille, len(valeurs)):
+        empreinte = (
+            (empreinte - valeurs[position - taille] * poids_sortant) * _BASE_EMPREINTE
+            + valeurs[position]
+        ) % _MODULE_EMPREINTE
+        yield empreinte
+
+
+def _couvrir(différences: List[int], début: int, fin: int) -> None:
+    différences[début] += 1
+    différences[fin] -= 1
+
+
+def _nb_couvertes(différences: List[int]) -> int:
+    couverture = 0
+    total = 0
+    for différence in différences[:-1]:
+        couverture += différence
+        if couverture:
+            total += 1
+    return total
+
+
+def détecter_duplications(
+    analyses: Iterable[AnalyseFichier],
+    taille_fenêtre: int = 8,
+    groupes: Optional[Dict[Path, FrozenSet[str]]] = None,
+) -> RapportDuplication:
+    # Chaque fenêtre de `taille_fenêtre` lignes normalisées est indexée par son empreinte
+    # glissante ; les fenêtres de même empreinte sont départagées par comparaison exacte.
+    # Une ligne est dupliquée si elle appartient à une fenêtre présente au moins deux fois,
+    # et inter-partitions si l'une des autres occurrences est dans un fichier ne partageant
+    # aucune partition avec le sien. Les couples de fenêtres sont prolongés en blocs
+    # maximaux le long de leur diagonale.
+    groupes = groupes or {}
+    fichiers: List[Path] = []
+    séquences: List[Sequence[int]] = []
+    numéros: List[Sequence[int]] = []
+    seaux: Dict[int, List[Tuple[int, int]]] = {}
+    for analyse in analyses:
+        if analyse.lignes is None:
+            continue
+        indice = len(fichiers)
+        fichiers.append(analyse.entrée.chemin)
+        séquences.append(analyse.lignes.empreintes)
+        numéros.append(analyse.lignes.numéros)
+        réduites = [valeur % _MODULE_EMPREINTE for valeur in analyse.lignes.empreintes]
+        for position, empreinte in enumerate(_empreintes_fenêtres(réduites, taille_fenêtre)):
+            seaux.setdefault(empreinte, []).append((indice, position))
+
+    couvertes = [[0] * (len(séquence) + 1) for séquence in séquences]
+    inter = [[0] * (len(séquence) + 1) for séquence in séquences]
+    couples: List[Tuple[int, int, int, int]] = []
+    aucun_groupe: FrozenSet[str] = frozenset()
+    for occurrences in seaux.values():
+        if len(occurrences) < 2:
+            continue
+        classes: Dict[Tuple[int, ...], List[Tuple[int, int]]] = {}
+        for indice, position in occurrences:
+            fenêtre = tuple(séquences[indice][position : position + taille_fenêtre])
+            classes.setdefault(fenêtre, []).append((indice, position))
+        for classe in classes.values():
+            if len(classe) < 2:
+                continue
+            appartenances: Dict[FrozenSet[str], int] = {}
+            for indice, _ in classe:
+                ensemble = groupes.get(fichiers[indice], aucun_groupe)
+                appartenances[ensemble] = appartenances.get(ensemble, 0) + 1
+            # Des occurrences d'un même fichier qui se chevauchent forment une suite
+            # périodique (lignes répétées, table de constantes) : elle n'est appariée que
+            # par sa première occurrence, sans quoi chaque décalage de la suite donnerait
+            # une diagonale à prolonger et le coût deviendrait quadratique.
+            suites: List[Tuple[int, List[int]]] = []
+            for indice, position in classe:
+                _couvrir(couvertes[indice], position, position + taille_fenêtre)
+                ensemble = groupes.get(fichiers[indice], aucun_groupe)
+                if ensemble and any(
+                    autre and not (autre & ensemble) for autre in appartenances
+                ):
+                    _couvrir(inter[indice], position, position + taille_fenêtre)
+                if (
+                    suites
+                    and suites[-1][0] == indice
+                    and position - suites[-1][1][-1] < taille_fenêtre
+                ):
+                    suites[-1][1].append(position)
+                else:
+                    suites.append((indice, [position]))
+            première_indice, (première_position, *_) = suites[0]
+            for indice, positions in suites:
+                début_suite = positions[0]
+                # Une suite se recopie elle-même : seul le décalage le plus proche de sa
+                # moitié est gardé, celui qui donne le plus long bloc sans recouvrement.
+                étendue = positions[-1] + taille_fenêtre - début_suite
+                décalage = min(
+                    (
+                        position - début_suite
+                        for position in positions
+                        if position - début_suite >= taille_fenêtre
+                    ),
+                    key=lambda candidat: abs(2 * candidat - étendue),
+                    default=None,
+                )
+                if décalage is not None:
+                    couples.append((indice, indice, décalage, début_suite + décalage))
+                if (indice, début_suite) != (première_indice, première_position):
+                    couples.append(
+                        (première_indice, indice, début_suite - première_position, début_suite)
+                    )
+
+    # Chaque couple est prolongé ligne à ligne le long de sa diagonale, dans les deux sens :
+    # des lignes répétées donnent à des fenêtres voisines des premières occurrences
+    # différentes, et seule la comparaison directe retrouve alors le bloc entier. Les
+    # couples suivants déjà couverts par ce bloc sont ignorés.
+    étendus: List[Tuple[int, int, int, int, int]] = []
+    couples.sort()
+    diagonale_courante: Optional[Tuple[int, int, int]] = None
+    fin_courante = 0
+    for première_indice, indice, décalage, position in couples:
+        if (première_indice, indice, décalage) == diagonale_courante and position < fin_courante:
+            continue
+        origine, copie = séquences[première_indice], séquences[indice]
+        début, fin = position, position + taille_fenêtre
+        while (
+            min(début, début - décalage) > 0
+            and origine[début - décalage - 1] == copie[début - 1]
+        ):
+            début -= 1
+        limite = min(len(copie), len(origine) + décalage)
+        while fin < limite and origine[fin - décalage] == copie[fin]:
+            fin += 1
+        diagonale_courante, fin_courante = (première_indice, indice, décalage), fin
+        if indice == première_indice:
+            # Dans une suite de lignes répétées, les deux étendues d'un même fichier se
+            # recouvrent : seule la partie qui précède la copie est gardée.
+            fin = min(fin, début + décalage)
+        étendus.append((fin - début, première_indice, indice, décalage, début))
+
+    # Un bloc dont les deux étendues sont contenues dans un bloc plus long entre les mêmes
+    # fichiers n'apporte rien : c'est le cas des diagonales voisines d'une répétition. Dans
+    # un même fichier, ces diagonales coupées ne sont plus contenues les unes dans les
+    # autres mais se chevauchent des deux côtés : elles sont écartées de même.
+    retenus: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]] = {}
+    blocs: List[BlocDupliqué] = []
+    for longueur, première_indice, indice, décalage, début in sorted(
+        étendus, key=lambda bloc: (-bloc[0],) + bloc[1:]
+    ):
+        fin = début + longueur
+        étendue = (début - décalage, fin - décalage, début, fin)
+        déjà = retenus.setdefault((première_indice, indice), [])
+        if any(
+            autre[0] <= étendue[0] and étendue[1] <= autre[1]
+            and autre[2] <= étendue[2] and étendue[3] <= autre[3]
+            for autre in déjà
+        ):
+            continue
+        if indice == première_indice and any(
+            autre[0] < étendue[1] and étendue[0] < autre[1]
+            and autre[2] < étendue[3] and étendue[2] < autre[3]
+            for autre in déjà
+        ):
+            continue
+        déjà.append(étendue)
+        blocs.append(
+            BlocDupliqué(
+                lignes=longueur,
+                fichier=fichiers[première_indice],
+                début=numéros[première_indice][début - décalage],
+                fin=numéros[première_indice][fin - 1 - décalage],
+                fichier_copie=fichiers[indice],
+                début_copie=numéros[indice][début],
+                fin_copie=numéros[indice][fin - 1],
+            )
+        )
+    blocs.sort(key=lambda bloc: (-bloc.lignes, bloc.fichier, bloc.début, bloc.fichier_copie))
+
+    return RapportDuplication(
+        taille_fenêtre=taille_fenêtre,
+        lignes={fichier: len(séquence) for fichier, séquence in zip(fichiers, séquences)},
+        lignes_dupliquées={
+            fichier: _nb_couvertes(différences)
+            for fichier, différences in zip(fichiers, couvertes)
+        },
+        lignes_inter_partitions={
+            fichier: _nb_couvertes(différences) for fichier, différences in zip(fichiers, inter)
+        },
+        blocs=blocs,
+    )
+
+
+@dataclass(frozen=True)
+class HistoriqueModifications:
+    racine: str
+    tête: str
+    nb_commits: int
+    commits_par_fichier: Dict[str, Tuple[int, ...]]
+
+    def commits_pour(self, fichier: Path) -> Tuple[int, ...]:
+        relatif = os.path.relpath(os.path.realpath(fichier), self.racine)
+        return self.commits_par_fichier.get(relatif.replace(os.sep, "/"), ())
+
+
+_HISTORIQUES: Dict[str, HistoriqueModifications] = {}
+
+
+def _git(racine: Path, *arguments: str) -> Optional[str]:
+    try:
+        résultat = subprocess.run(
+            ["git", "-C", str(racine), *arguments],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    if résultat.returncode != 0:
+        return None
+    return résultat.stdout.strip()
+
+
+def _résoudre_date(racine: Path, depuis: str) -> Optional[int]:
+    # Une date relative (« 2 weeks ago ») est ramenée à un horodatage absolu, tel que git
+    # l'interprète maintenant : la fenêtre d'historique ne dépend plus du moment de lecture.
+    sortie = _git(racine, "rev-parse", f"--since={depuis}")
+    if not sortie or not sortie.startswith("--max-age="):
+        return None
+    return int(sortie[len("--max-age=") :])
+
+
+def _parcourir_log_git(
+    racine: str, depuis: Optional[int], max_commits: Optional[int]
+) -> Tuple[int, Dict[str, Tuple[int, ...]]]:
+    commande = [
+        "git",
+        "-C",
+        racine,
+        "-c",
+        "core.quotePath=false",
+        "log",
+        "--numstat",
+        "--no-renames",
+        "--format=%x00%H",
+    ]
+    if depuis is not None:
+        commande.append(f"--max-age={depuis}")
+    if max_commits is not None:
+        commande.append(f"--max-count={max_commits}")
+    par_fichier: Dict[str, List[int]] = {}
+    index = -1
+    with subprocess.Popen(
+        commande,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    ) as processus:
+        assert processus.stdout is not None
+        for ligne in processus.stdout:
+            if ligne.startswith("\0"):
+                index += 1
+                continue
+            champs = ligne.rstrip("\n").split("\t", 2)
+            if len(champs) == 3:
+                par_fichier.setdefault(champs[2], []).append(index)
+    return index + 1, {chemin: tuple(commits) for chemin, commits in par_fichier.items()}
+
+
+def lire_historique_git(
+    racine: Path,
+    depuis: Optional[str] = None,
+    max_commits: Optional[int] = None,
+    dossier_cache: Optional[Path] = None,
+) -> Optional[HistoriqueModifications]:
+    racine_dépôt = _git(racine, "rev-parse", "--show-toplevel")
+    tête = _git(racine, "rev-parse", "HEAD")
+    if not racine_dépôt or not tête:
+        return None
+    horodatage = _résoudre_date(racine, depuis) if depuis is not None else None
+    if depuis is not None and horodatage is None:
+        return None
+    clé = hashlib.sha1(
+        f"{racine_dépôt}\0{tête}\0{horodatage}\0{max_commits}".encode()
+    ).hexdigest()
+    if clé in _HISTORIQUES:
+        return _HISTORIQUES[clé]
+    # Sans --cache, le résultat est gardé dans le dossier git du dépôt : les exécutions
+    # suivantes sur le même HEAD ne relisent pas le journal.
+    if dossier_cache is None:
+        dossier_git = _git(racine, "rev-parse", "--absolute-git-dir")
+        dossier_cache = Path(dossier_git) / "compter_loc" if dossier_git else None
+    chemin_cache = (
+        dossier_cache / f"historique-{tête[:12]}-{clé[:20]}.pickle" if dossier_cache else None
+    )
+    historique: Optional[HistoriqueModifications] = None
+    if chemin_cache is not None and chemin_cache.exists():
+        try:
+            with chemin_cache.open("rb") as handle:
+                historique = HistoriqueModifications(*pickle.load(handle))
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            historique = None
+    if historique is None:
+        nb_commits, par_fichier = _parcourir_log_git(racine_dépôt, horodatage, max_commits)
+        historique = HistoriqueModifications(racine_dépôt, tête, nb_commits, par_fichier)
+        if chemin_cache is not None:
+            try:
+                chemin_cache.parent.mkdir(parents=True, exist_ok=True)
+                # Les résultats d'un HEAD précédent ne resserviront plus.
+                for ancien in chemin_cache.parent.glob("historique-*.pickle"):
+                    if not ancien.name.startswith(f"historique-{tête[:12]}-"):
+                        ancien.unlink()
+                with chemin_cache.open("wb") as handle:
+                    pickle.dump(
+                        (historique.racine, historique.tête, historique.nb_commits, par_fichier),
+                        handle,
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+            except OSError:
+                pass
+    _HISTORIQUES[clé] = historique
+    return historique
+
+
+def calculer_volatilités(
+    packages: Sequence[PackageBrut], historique: HistoriqueModifications
+) -> Dict[str, int]:
+    volatilités: Dict[str, int] = {}
+    for pkg in packages:
+        commits: Set[int] = set()
+        for fichier in pkg.fichiers:
+            commits.update(historique.commits_pour(fichier))
+        volatilités[pkg.nom] = len(commits)
+    return volatilités
+
+
+def calculer_metriques_packages(
+    packages: Sequence[PackageBrut],
+    volatilités: Optional[Dict[str, int]] = None,
+    profileur: Optional[Profileur] = None,
+) -> List[PackageMetrics]:
+    with _étape(profileur, "graphe_paquets"):
+        dépendances = _filtrer_dépendances(packages)
+        ca_temp: Dict[str, Set[str]] = {pkg.nom: set() for pkg in packages}
+        for source, deps in dépendances.items():
+            for destination in deps:
+                ca_temp[destination].add(source)
+    with _étape(profileur, "cycles_paquets"):
+        graphe = condenser_dépendances(dépendances)
+        transitifs = couplages_transitifs(graphe)
+    métriques = [
+        _métrique_package(
+            pkg,
+            ca=len(ca_temp.get(pkg.nom, set())),
+            ce=len(dépendances.get(pkg.nom, set())),
+            cyclique=pkg.nom in graphe.cycliques,
+            transitifs=transitifs[pkg.nom],
+            couche=graphe.couches[graphe.composante_de[pkg.nom]],
+            volatilités=volatilités,
+        )
+        for pkg in packages
+    ]
+    return sorted(métriques, key=lambda metric: metric.nom)
+
+
+def _métrique_package(
+    pkg: PackageBrut,
+    ca: int,
+    ce: int,
+    cyclique: bool,
+    transitifs: Tuple[int, int],
+    couche: int,
+    volatilités: Optional[Dict[str, int]],
+) -> PackageMetrics:
+    ac = pkg.nb_abstraites
+    cc = pkg.nb_classes - ac
+    total_classes = cc + ac
+    abstractness = ac / total_classes if total_classes else 0.0
+    if ca + ce:
+        instability = ce / (ca + ce)
+    else:
+        instability = 0.0
+    distance = abs(abstractness + instability - 1)
+    return PackageMetrics(
+        nom=pkg.nom,
+        cc=cc,
+        ac=ac,
+        ca=ca,
+        ce=ce,
+        abstractness=abstractness,
+        instability=instability,
+        distance=distance,
+        volatility=volatilités.get(pkg.nom, 0) if volatilités is not None else None,
+        cyclic=cyclique,
+        ca_transitif=transitifs[0],
+        ce_transitif=transitifs[1],
+        couche=couche,
+    )
+
+
+class GrapheIncrémental:
+    """Graphe des paquets tenu à jour fichier par fichier.
+
+    Les compteurs de classes, Ca, Ce et l'appartenance aux cycles sont corrigés localement :
+    un arc ajouté entre deux composantes ne fusionne que les paquets situés sur les chemins
+    qu'il referme, un arc retiré d'une composante ne relance Tarjan que sur ses membres.
+    Les couplages transitifs et les couches sont mémorisés par composante ; un arc qui
+    change l'accessibilité entre composantes n'invalide que les ascendants de sa source et
+    les descendants de sa cible, recalculés à la demande suivante de métriques.
+    """
+
+    def __init__(self) -> None:
+        self.packages: Dict[str, PackageBrut] = {}
+        self._fichiers: Dict[Path, AnalyseFichier] = {}
+        # Nombre de fichiers du paquet qui importent chaque cible, connue ou non.
+        self._imports: Dict[str, Dict[str, int]] = {}
+        self._importeurs: Dict[str, Set[str]] = {}
+        # Arcs filtrés : uniquement entre paquets connus, sans boucle.
+        self._arcs: Dict[str, Set[str]] = {}
+        self._entrants: Dict[str, Set[str]] = {}
+        self._composante_de: Dict[str, int] = {}
+        self._membres: Dict[int, Set[str]] = {}
+        self._prochaine_composante = 0
+        self._métriques: Dict[str, PackageMetrics] = {}
+        self._à_recalculer: Set[str] = set()
+        # Chaque paquet garde le même bit tant qu'il existe : les paquets accessibles depuis
+        # une composante sont des entiers, comme dans couplages_transitifs.
+        self._bits: Dict[str, int] = {}
+        self._bits_libres: List[int] = []
+        self._descendants: Dict[int, int] = {}
+        self._ascendants: Dict[int, int] = {}
+        self._couches: Dict[int, int] = {}
+        # Arcs (source, cible) dont l'ajout ou le retrait a changé l'accessibilité entre
+        # composantes depuis le dernier calcul.
+        self._arcs_modifiés: List[Tuple[str, str]] = []
+
+    def ajouter_fichier(self, analyse: AnalyseFichier) -> None:
+        chemin = analyse.entrée.chemin
+        if chemin in self._fichiers:
+            raise ValueError(f"fichier déjà présent dans le graphe : {chemin}")
+        nom = analyse.package
+        if nom not in self.packages:
+            self._créer_paquet(nom)
+        self.packages[nom].ajouter(analyse)
+        self._fichiers[chemin] = analyse
+        for cible in analyse.imports:
+            self._compter_import(nom, cible)
+        self._à_recalculer.add(nom)
+
+    def retirer_fichier(self, chemin: Path) -> None:
+        analyse = self._fichiers.pop(chemin)
+        nom = analyse.package
+        paquet = self.packages[nom]
+        paquet.retirer(analyse)
+        for cible in analyse.imports:
+            self._décompter_import(nom, cible)
+        if paquet.fichiers:
+            self._à_recalculer.add(nom)
+        else:
+            self._supprimer_paquet(nom)
+
+    def mettre_à_jour_fichier(self, analyse: AnalyseFichier) -> None:
+        chemin = analyse.entrée.chemin
+        ancienne = self._fichiers[chemin]
+        nom = analyse.package
+        if ancienne.package != nom:
+            self.retirer_fichier(chemin)
+            self.ajouter_fichier(analyse)
+            return
+        # Même paquet : seuls les imports qui diffèrent touchent aux arcs, une modification
+        # du corps des classes ne change que les compteurs du paquet.
+        paquet = self.packages[nom]
+        paquet.retirer(ancienne)
+        paquet.ajouter(analyse)
+        self._fichiers[chemin] = analyse
+        for cible in analyse.imports - ancienne.imports:
+            self._compter_import(nom, cible)
+        for cible in ancienne.imports - analyse.imports:
+            self._décompter_import(nom, cible)
+        self._à_recalculer.add(nom)
+
+    def métriques(self, volatilités: Optional[Dict[str, int]] = None) -> List[PackageMetrics]:
+        if self._arcs_modifiés:
+            # Seuls les paquets dont un couplage transitif ou la couche a réellement changé
+            # voient leur métrique reconstruite.
+            for nom in self._invalider_accessibles():
+                ancienne = self._métriques.get(nom)
+                if ancienne is None or (
+                    ancienne.ca_transitif,
+                    ancienne.ce_transitif,
+                    ancienne.couche,
+                ) != self._globales(nom):
+                    self._à_recalculer.add(nom)
+        for nom in self._à_recalculer:
+            if nom in self.packages:
+                ca_transitif, ce_transitif, couche = self._globales(nom)
+                self._métriques[nom] = _métrique_package(
+                    self.packages[nom],
+                    ca=len(self._entrants[nom]),
+                    ce=len(self._arcs[nom]),
+                    cyclique=self.est_cyclique(nom),
+                    transitifs=(ca_transitif, ce_transitif),
+                    couche=couche,
+                    volatilités=None,
+                )
+        self._à_recalculer.clear()
+        métriques = [self._métriques[nom] for nom in sorted(self._métriques)]
+        if volatilités is not None:
+            métriques = [
+                replace(métrique, volatility=volatilités.get(métrique.nom, 0))
+                for métrique in métriques
+            ]
+        return métriques
+
+    def est_cyclique(self, nom: str) -> bool:
+        return len(self._membres[self._composante_de[nom]]) > 1
+
+    def cycles(self) -> List[Tuple[str, ...]]:
+        return sorted(
+            tuple(sorted(membres)) for membres in self._membres.values() if len(membres) > 1
         )
-    print()
 
+    def _compter_import(self, nom: str, cible: str) -> None:
+        compteurs = self._imports[nom]
+        compteurs[cible] = compteurs.get(cible, 0) + 1
+        if compteurs[cible] > 1:
+            return
+        self._importeurs.setdefault(cible, set()).add(nom)
+        if cible in self.packages and cible != nom:
+            self._ajouter_arc(nom, cible)
 
-def _filtrer_dépendances(packages: Sequence[PackageBrut]) -> Dict[str, Set[str]]:
-    noms = {pkg.nom for pkg in packages}
-    dépendances_filtrées: Dict[str, Set[str]] = {}
-    for pkg in packages:
-        dépendances_filtrées[pkg.nom] = {
-            dep for dep in pkg.dépendances if dep in noms and dep != pkg.nom
-        }
-    return dépendances_filtrées
+    def _décompter_import(self, nom: str, cible: str) -> None:
+        compteurs = self._imports[nom]
+        compteurs[cible] -= 1
+        if compteurs[cible]:
+            return
+        del compteurs[cible]
+        self.packages[nom].dépendances.discard(cible)
+        importeurs = self._importeurs[cible]
+        importeurs.discard(nom)
+        if not importeurs:
+            del self._importeurs[cible]
+        if cible in self.packages and cible != nom:
+            self._retirer_arc(nom, cible)
 
+    def _créer_paquet(self, nom: str) -> None:
+        self.packages[nom] = PackageBrut(nom)
+        self._imports[nom] = {}
+        self._arcs[nom] = set()
+        self._entrants[nom] = set()
+        self._bits[nom] = self._bits_libres.pop() if self._bits_libres else len(self._bits)
+        self._nouvelle_composante({nom})
+        for importeur in sorted(self._importeurs.get(nom, ())):
+            if importeur != nom:
+                self._ajouter_arc(importeur, nom)
 
-def _détecter_paquets_cycliques(dépendances: Dict[str, Set[str]]) -> Set[str]:
-    index = 0
-    indices: Dict[str, int] = {}
-    lowlink: Dict[str, int] = {}
-    pile: List[str] = []
-    sur_pile: Set[str] = set()
-    cycliques: Set[str] = set()
+    def _supprimer_paquet(self, nom: str) -> None:
+        # Les arcs sortants ont disparu avec les imports du dernier fichier retiré.
+        for importeur in sorted(self._entrants[nom]):
+            self._retirer_arc(importeur, nom)
+        self._oublier_composante(self._composante_de.pop(nom))
+        for table in (self.packages, self._imports, self._arcs, self._entrants):
+            del table[nom]
+        self._bits_libres.append(self._bits.pop(nom))
+        self._métriques.pop(nom, None)
+        self._à_recalculer.discard(nom)
 
-    def strongconnect(nom: str) -> None:
-        nonlocal index
-        indices[nom] = index
-        lowlink[nom] = index
-        index += 1
-        pile.append(nom)
-        sur_pile.add(nom)
+    def _nouvelle_composante(self, membres: Set[str]) -> None:
+        identifiant = self._prochaine_composante
+        self._prochaine_composante += 1
+        self._membres[identifiant] = membres
+        for membre in membres:
+            self._composante_de[membre] = identifiant
+
+    def _oublier_composante(self, identifiant: int) -> Set[str]:
+        for cache in (self._descendants, self._ascendants, self._couches):
+            cache.pop(identifiant, None)
+        return self._membres.pop(identifiant)
+
+    def _ajouter_arc(self, source: str, cible: str) -> None:
+        self._arcs[source].add(cible)
+        self._entrants[cible].add(source)
+        self._à_recalculer.update((source, cible))
+        if self._composante_de[source] == self._composante_de[cible]:
+            return
+        self._arcs_modifiés.append((source, cible))
+        # Le nouvel arc referme un cycle si la cible atteint déjà la source ; les paquets
+        # du cycle sont ceux atteints depuis la cible qui remontent aussi à la source.
+        descendants = self._parcourir((cible,), self._arcs)
+        if source not in descendants:
+            return
+        sur_cycle = self._parcourir((source,), self._entrants, descendants)
+        fusion: Set[str] = set()
+        for identifiant in {self._composante_de[nom] for nom in sur_cycle}:
+            fusion |= self._oublier_composante(identifiant)
+        self._nouvelle_composante(fusion)
+        self._à_recalculer |= fusion
+
+    def _retirer_arc(self, source: str, cible: str) -> None:
+        self._arcs[source].discard(cible)
+        self._entrants[cible].discard(source)
+        self._à_recalculer.update((source, cible))
+        identifiant = self._composante_de[source]
+        if identifiant != self._composante_de[cible]:
+            self._arcs_modifiés.append((source, cible))
+            return
+        membres = self._membres[identifiant]
+        sous_graphe = {nom: self._arcs[nom] & membres for nom in membres}
+        composantes = composantes_fortement_connexes(sous_graphe)
+        if len(composantes) == 1:
+            # La composante reste fortement connexe : rien n'a changé hors de ses arcs.
+            return
+        self._oublier_composante(identifiant)
+        for composante in composantes:
+            self._nouvelle_composante(set(composante))
+        self._à_recalculer |= membres
+        self._arcs_modifiés.append((source, cible))
+
+    def _invalider_accessibles(self) -> Set[str]:
+        # Un chemin qui passe par l'arc modifié part d'un ascendant de sa source et finit
+        # chez un descendant de sa cible : seuls ceux-là peuvent voir leurs valeurs changer.
+        sources = [source for source, _ in self._arcs_modifiés if source in self.packages]
+        cibles = [cible for _, cible in self._arcs_modifiés if cible in self.packages]
+        self._arcs_modifiés.clear()
+        amont = self._parcourir(sources, self._entrants)
+        aval = self._parcourir(cibles, self._arcs)
+        for nom in amont:
+            identifiant = self._composante_de[nom]
+            self._descendants.pop(identifiant, None)
+            self._couches.pop(identifiant, None)
+        for nom in aval:
+            self._ascendants.pop(self._composante_de[nom], None)
+        return amont | aval
+
+    def _globales(self, nom: str) -> Tuple[int, int, int]:
+        identifiant = self._composante_de[nom]
+        # Dans un cycle, chaque paquet atteint les autres membres de sa composante.
+        voisins = len(self._membres[identifiant]) - 1
+        ascendants = self._mémoriser(identifiant, self._entrants, self._ascendants, self._union)
+        descendants = self._mémoriser(identifiant, self._arcs, self._descendants, self._union)
+        couche = self._mémoriser(identifiant, self._arcs, self._couches, self._couche)
+        return (
+            bin(ascendants).count("1") + voisins,
+            bin(descendants).count("1") + voisins,
+            couche,
+        )
 
-        for successeur in dépendances.get(nom, set()):
-            if successeur not in indices:
-                strongconnect(successeur)
-                lowlink[nom] = min(lowlink[nom], lowlink[successeur])
-            elif successeur in sur_pile:
-                lowlink[nom] = min(lowlink[nom], indices[successeur])
-
-        if lowlink[nom] == indices[nom]:
-            composante: List[str] = []
-            while True:
-                sommet = pile.pop()
-                sur_pile.remove(sommet)
-                composante.append(sommet)
-                if sommet == nom:
+    def _union(self, voisines: Iterable[int], cache: Dict[int, int]) -> int:
+        accessibles = 0
+        for voisine in voisines:
+            accessibles |= cache[voisine]
+            for membre in self._membres[voisine]:
+                accessibles |= 1 << self._bits[membre]
+        return accessibles
+
+    @staticmethod
+    def _couche(voisines: Iterable[int], cache: Dict[int, int]) -> int:
+        # Couche 0 : les composantes qui ne dépendent de rien.
+        return 1 + max((cache[voisine] for voisine in voisines), default=-1)
+
+    def _mémoriser(
+        self,
+        identifiant: int,
+        voisins: Dict[str, Set[str]],
+        cache: Dict[int, int],
+        combiner: Callable[[Iterable[int], Dict[int, int]], int],
+    ) -> int:
+        # Parcours en profondeur sans récursion du graphe condensé, limité aux composantes
+        # absentes du cache ; sans cycle entre composantes, aucune n'est empilée deux fois.
+        if identifiant in cache:
+            return cache[identifiant]
+        voisines = self._voisines(identifiant, voisins)
+        travail = [(identifiant, voisines, iter(voisines))]
+        while travail:
+            courante, voisines, restantes = travail[-1]
+            for voisine in restantes:
+                if voisine not in cache:
+                    suivantes = self._voisines(voisine, voisins)
+                    travail.append((voisine, suivantes, iter(suivantes)))
                     break
-            if len(composante) > 1:
-                cycliques.update(composante)
             else:
-                successeurs = dépendances.get(nom, set())
-                if nom in successeurs:
-                    cycliques.add(nom)
+                travail.pop()
+                cache[courante] = combiner(voisines, cache)
+        return cache[identifiant]
 
-    for nom in dépendances:
-        if nom not in indices:
-            strongconnect(nom)
+    def _voisines(self, identifiant: int, voisins: Dict[str, Set[str]]) -> List[int]:
+        return sorted(
+            {
+                self._composante_de[voisin]
+                for membre in self._membres[identifiant]
+                for voisin in voisins[membre]
+            }
+            - {identifiant}
+        )
 
-    return cycliques
+    @staticmethod
+    def _parcourir(
+        départs: Iterable[str], voisins: Dict[str, Set[str]], domaine: Optional[Set[str]] = None
+    ) -> Set[str]:
+        atteints = set(départs)
+        pile = list(atteints)
+        while pile:
+            for suivant in voisins[pile.pop()]:
+                if suivant not in atteints and (domaine is None or suivant in domaine):
+                    atteints.add(suivant)
+                    pile.append(suivant)
+        return atteints
 
 
-def calculer_metriques_packages(packages: Sequence[PackageBrut]) -> List[PackageMetrics]:
-    dépendances = _filtrer_dépendances(packages)
-    ca_temp: Dict[str, Set[str]] = {pkg.nom: set() for pkg in packages}
-    for source, deps in dépendances.items():
-        for destination in deps:
-            ca_temp[destination].add(source)
-    cycliques = _détecter_paquets_cycliques(dépendances)
-    métriques: List[PackageMetrics] = []
-    for pkg in packages:
-        cc = sum(1 for cls in pkg.classes if not cls.abstraite)
-        ac = sum(1 for cls in pkg.classes if cls.abstraite)
-        total_classes = cc + ac
-        abstractness = ac / total_classes if total_classes else 0.0
-        ce = len(dépendances.get(pkg.nom, set()))
-        ca = len(ca_temp.get(pkg.nom, set()))
-        if ca + ce:
-            instability = ce / (ca + ce)
-        else:
-            instability = 0.0
-        distance = abs(abstractness + instability - 1)
-        métriques.append(
-            PackageMetrics(
-                nom=pkg.nom,
-                cc=cc,
-                ac=ac,
-                ca=ca,
-                ce=ce,
-                abstractness=abstractness,
-                instability=instability,
-                distance=distance,
-                volatility=1,
-                cyclic=pkg.nom in cycliques,
-            )
+class LecteurObjetsGit:
+    """Lit des blobs dans le magasin d'objets local par un unique `git cat-file --batch`."""
+
+    def __init__(self, racine: Path) -> None:
+        self._processus = subprocess.Popen(
+            ["git", "-C", str(racine), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
-    return sorted(métriques, key=lambda metric: metric.nom)
+
+    def lire(self, objet: str) -> bytes:
+        entrée, sortie = self._processus.stdin, self._processus.stdout
+        assert entrée is not None and sortie is not None
+        entrée.write(objet.encode("ascii") + b"\n")
+        entrée.flush()
+        entête = sortie.readline().split()
+        if len(entête) != 3:
+            raise ValueError(f"objet git introuvable : {objet}")
+        contenu = sortie.read(int(entête[2]))
+        sortie.read(1)
+        return contenu
+
+    def fermer(self) -> None:
+        if self._processus.stdin is not None:
+            self._processus.stdin.close()
+        self._processus.wait()
+        if self._processus.stdout is not None:
+            self._processus.stdout.close()
+
+    def __enter__(self) -> "LecteurObjetsGit":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.fermer()
+
+
+@dataclass(frozen=True)
+class Révision:
+    nom: str
+    commit: str
+    date: str
+
+
+@dataclass(frozen=True)
+class PointHistorique:
+    révision: Révision
+    fichiers: int
+    loc: int
+    classes: int
+    méthodes: int
+    métriques: List[PackageMetrics]
+
+
+def lister_révisions(racine: Path, révisions: Sequence[str]) -> List[Révision]:
+    # Sans révision explicite, toutes les étiquettes, de la plus ancienne à la plus récente.
+    if not révisions:
+        étiquettes = _git(
+            racine,
+            "for-each-ref",
+            "--sort=creatordate",
+            "--format=%(refname:short)",
+            "refs/tags",
+        )
+        révisions = étiquettes.splitlines() if étiquettes else []
+    if not révisions:
+        return []
+    commits = _git(racine, "rev-parse", *(f"{révision}^{{commit}}" for révision in révisions))
+    if commits is None:
+        raise ValueError("révision inconnue parmi : " + ", ".join(révisions))
+    liste_commits = commits.splitlines()
+    dates_brutes = _git(racine, "show", "-s", "--format=%H %cI", *sorted(set(liste_commits)))
+    dates = dict(ligne.split(" ", 1) for ligne in (dates_brutes or "").splitlines())
+    return [
+        Révision(nom, commit, dates.get(commit, ""))
+        for nom, commit in zip(révisions, liste_commits)
+    ]
+
+
+def _contient(base: str, chemin: str) -> bool:
+    return not base or chemin == base or chemin.startswith(base + "/")
+
+
+def _chemin_ignoré(règles: Sequence[RèglesIgnorées], base: str, relatif: str) -> bool:
+    # Chaque dossier est examiné avant ce qu'il contient : comme lors du parcours, un
+    # dossier exclu n'est jamais ouvert et un motif ne peut pas y réinclure un fichier.
+    parties = relatif.split("/")
+    chemin = base
+    for position, partie in enumerate(parties):
+        chemin = f"{chemin}/{partie}" if chemin else partie
+        if _est_ignoré(règles, chemin, partie, position < len(parties) - 1):
+            return True
+    return False
+
+
+def fichiers_révision(
+    racine: Path, commit: str, préfixes: Sequence[str], exclusions: Sequence[str]
+) -> Dict[str, str]:
+    sortie = _git(racine, "ls-tree", "-r", "-z", "--full-tree", commit, "--", *préfixes)
+    # Comme lors du parcours, les exclusions portent sur le chemin relatif à la racine qui
+    # contient le fichier ; des racines imbriquées sont parcourues depuis la plus haute.
+    bases = sorted(
+        {"" if préfixe == "." else préfixe.strip("/") for préfixe in préfixes}, key=len
+    )
+    motifs = RèglesIgnorées.depuis_motifs(exclusions).motifs
+    blobs: Dict[str, str] = {}
+    for ligne in (sortie or "").split("\0"):
+        entête, _, chemin = ligne.partition("\t")
+        champs = entête.split()
+        if len(champs) != 3 or champs[1] != "blob" or not chemin.endswith(".java"):
+            continue
+        base = next((base for base in bases if _contient(base, chemin)), "")
+        if chemin != base and _chemin_ignoré(
+            [RèglesIgnorées(base, motifs)], base, chemin[len(base) + 1 if base else 0 :]
+        ):
+            continue
+        blobs[chemin] = champs[2]
+    return blobs
+
+
+def analyser_historique(
+    racine: Path,
+    préfixes: Sequence[str],
+    révisions: Sequence[Révision],
+    exclusions: Sequence[str] = EXCLUSIONS_PAR_DÉFAUT,
+    profileur: Optional[Profileur] = None,
+    limites: LimitesFichier = LIMITES_PAR_DÉFAUT,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+) -> Iterator[PointHistorique]:
+    # Les analyses sont mémorisées par empreinte de blob : un fichier inchangé d'une
+    # révision à l'autre n'est lu et analysé qu'une fois. D'une révision à la suivante,
+    # seuls les fichiers dont le blob diffère passent par le graphe incrémental.
+    mémo: Dict[str, Tuple] = {}
+    graphe = GrapheIncrémental()
+    courants: Dict[str, str] = {}
+    analyses: Dict[str, AnalyseFichier] = {}
+    totaux = [0, 0, 0]
+
+    def cumuler(analyse: AnalyseFichier, signe: int) -> None:
+        totaux[0] += signe * analyse.entrée.loc
+        totaux[1] += signe * len(analyse.classes)
+        totaux[2] += signe * len(analyse.méthodes)
+
+    with LecteurObjetsGit(racine) as lecteur:
+        for révision in révisions:
+            with _étape(profileur, "révision"):
+                blobs = fichiers_révision(racine, révision.commit, préfixes, exclusions)
+                for chemin in sorted(courants.keys() - blobs.keys()):
+                    ancienne = analyses.pop(chemin)
+                    cumuler(ancienne, -1)
+                    graphe.retirer_fichier(ancienne.entrée.chemin)
+                for chemin, objet in sorted(blobs.items()):
+                    if courants.get(chemin) == objet:
+                        continue
+                    fichier = racine / chemin
+                    données = mémo.get(objet)
+                    if données is None:
+                        analyse = analyser_fichier(
+                            fichier,
+                            lecteur.lire(objet),
+                            profileur,
+                            limites=limites,
+                            visiteurs=visiteurs,
+                        )
+                        mémo[objet] = analyse.en_tuple()
+                    else:
+                        analyse = AnalyseFichier.depuis_tuple(fichier, données)
+                        if profileur is not None:
+                            profileur.compter("blobs_mémorisés")
+                    if chemin in analyses:
+                        cumuler(analyses[chemin], -1)
+                        graphe.mettre_à_jour_fichier(analyse)
+                    else:
+                        graphe.ajouter_fichier(analyse)
+                    cumuler(analyse, 1)
+                    analyses[chemin] = analyse
+                courants = blobs
+                métriques = graphe.métriques()
+            yield PointHistorique(révision, len(analyses), *totaux, métriques)
 
 
 def afficher_metriques_packages(titre: str, métriques: Sequence[PackageMetrics]) -> None:
@@ -534,66 +3532,1068 @@ def afficher_metriques_packages(titre: str, métriques: Sequence[PackageMetrics]
                 métrique.abstractness,
                 métrique.instability,
                 métrique.distance,
-                métrique.volatility,
+                "-" if métrique.volatility is None else métrique.volatility,
                 "Oui" if métrique.cyclic else "Non",
             )
         )
     print()
-def compter_loc(racines: Sequence[Path]) -> Tuple[int, List[EntréeLOC]]:
-    total = 0
-    détails: List[EntréeLOC] = []
-    for fichier in sorted(iterer_fichiers(racines)):
-        loc = compter_loc_fichier(fichier)
-        total += loc
-        détails.append(EntréeLOC(fichier, loc))
-    return total, détails
 
 
-if __name__ == "__main__":
-    racine_projet = Path(__file__).resolve().parents[1]
-    génériques = [
-        racine_projet / "JeuGenerique",
-        racine_projet / "MoteurGenerique",
-        racine_projet / "InterfaceGenerique",
-        racine_projet / "PersistScore",
-        racine_projet / "Utils",
-    ]
-    spécifiques = [
-        racine_projet / "MoteursSpecifiques" / "JeuTetris",
-        racine_projet / "InterfacesSpecifiques" / "IUTetris",
-        racine_projet / "Tetris.java",
+def afficher_structure_packages(titre: str, graphe: GraphePackages) -> None:
+    print(titre)
+    print("-" * len(titre))
+    cycles = graphe.cycles()
+    if cycles:
+        for numéro, cycle in enumerate(cycles, start=1):
+            print(f"Cycle {numéro} ({len(cycle)} paquets) : {', '.join(cycle)}")
+    else:
+        print("Aucun cycle de dépendances")
+    for couche, noms in enumerate(graphe.paquets_par_couche()):
+        print(f"Couche {couche} : {', '.join(noms)}")
+    print()
+
+
+def afficher_historique(titre: str, points: Iterable[PointHistorique]) -> None:
+    en_tête = "{:<20} {:<25} {:>8} {:>6} {:>7} {:>8} {:>7} {:>8} {:>6}".format(
+        "Révision", "Date", "Fichiers", "LOC", "Classes", "Méthodes", "Paquets", "Cycliques", "D"
+    )
+    print(titre)
+    print("-" * len(titre))
+    print(en_tête)
+    print("-" * len(en_tête))
+    aucun = True
+    for point in points:
+        aucun = False
+        métriques = point.métriques
+        distance = sum(m.distance for m in métriques) / len(métriques) if métriques else 0.0
+        print(
+            "{:<20} {:<25} {:>8} {:>6} {:>7} {:>8} {:>7} {:>8} {:>6.2f}".format(
+                point.révision.nom,
+                point.révision.date,
+                point.fichiers,
+                point.loc,
+                point.classes,
+                point.méthodes,
+                len(métriques),
+                sum(1 for m in métriques if m.cyclic),
+                distance,
+            )
+        )
+    if aucun:
+        print("Aucune révision à analyser")
+    print()
+
+
+def afficher_couplage_classes(
+    titre: str, couplages: Sequence[CouplageClasse], nb_premiers: int = 5
+) -> None:
+    print(titre)
+    print("-" * len(titre))
+    if not couplages:
+        print("Aucune classe détectée\n")
+        return
+    nb_arcs = sum(couplage.fan_out for couplage in couplages)
+    print(f"Classes : {len(couplages)}, dépendances entre classes : {nb_arcs}")
+    print(f"  - Fan-in moyen : {nb_arcs / len(couplages):.2f}")
+    plus_utilisées = sorted(couplages, key=lambda couplage: (-couplage.fan_in, couplage.nom))
+    print("Classes les plus utilisées (fan-in) :")
+    for couplage in plus_utilisées[:nb_premiers]:
+        print(f"  - {couplage.nom} : {couplage.fan_in}")
+    plus_dépendantes = sorted(couplages, key=lambda couplage: (-couplage.fan_out, couplage.nom))
+    print("Classes les plus dépendantes (fan-out) :")
+    for couplage in plus_dépendantes[:nb_premiers]:
+        print(f"  - {couplage.nom} : {couplage.fan_out}")
+    print()
+
+
+def _part(valeur: int, total: int) -> str:
+    return f"{valeur / total:.1%}" if total else "-"
+
+
+def afficher_duplications(
+    titre: str,
+    rapport: RapportDuplication,
+    paquets: Dict[Path, str],
+    partitions: Dict[str, Sequence[Path]],
+    racine_projet: Path,
+    nb_premiers: int = 10,
+) -> None:
+    print(titre)
+    print("-" * len(titre))
+    total = sum(rapport.lignes.values())
+    dupliquées = sum(rapport.lignes_dupliquées.values())
+    print(
+        f"Fenêtre : {rapport.taille_fenêtre} lignes normalisées, "
+        f"lignes analysées : {total}"
+    )
+    print(f"Lignes dupliquées : {dupliquées} ({_part(dupliquées, total)})")
+    print("Par partition (dupliquées / entre partitions) :")
+    for nom, membres in partitions.items():
+        lignes = sum(rapport.lignes.get(fichier, 0) for fichier in membres)
+        dans_partition = sum(rapport.lignes_dupliquées.get(fichier, 0) for fichier in membres)
+        entre = sum(rapport.lignes_inter_partitions.get(fichier, 0) for fichier in membres)
+        print(
+            f"  - {nom} : {dans_partition} ({_part(dans_partition, lignes)}) / "
+            f"{entre} ({_part(entre, lignes)})"
+        )
+    par_paquet: Dict[str, List[int]] = {}
+    for fichier, lignes in rapport.lignes.items():
+        cumul = par_paquet.setdefault(paquets.get(fichier, ""), [0, 0])
+        cumul[0] += lignes
+        cumul[1] += rapport.lignes_dupliquées[fichier]
+    print("Paquets les plus dupliqués :")
+    for nom, (lignes, nb) in sorted(
+        par_paquet.items(), key=lambda élément: (-élément[1][1], élément[0])
+    )[:nb_premiers]:
+        if nb:
+            print(f"  - {nom or '(défaut)'} : {nb} ({_part(nb, lignes)})")
+    print("Fichiers les plus dupliqués :")
+    for fichier, nb in sorted(
+        rapport.lignes_dupliquées.items(), key=lambda élément: (-élément[1], élément[0])
+    )[:nb_premiers]:
+        if nb:
+            print(
+                f"  - {_chemin_affiché(fichier, racine_projet)} : {nb} "
+                f"({_part(nb, rapport.lignes[fichier])})"
+            )
+    if rapport.blocs:
+        print("Blocs dupliqués les plus longs :")
+    for bloc in rapport.blocs[:nb_premiers]:
+        print(
+            f"  - {bloc.lignes} lignes : "
+            f"{_chemin_affiché(bloc.fichier, racine_projet)}:{bloc.début}-{bloc.fin} et "
+            f"{_chemin_affiché(bloc.fichier_copie, racine_projet)}:"
+            f"{bloc.début_copie}-{bloc.fin_copie}"
+        )
+    print()
+
+
+def champs_flux(
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+) -> Tuple[str, ...]:
+    # Les colonnes des métriques sont celles des visiteurs actifs pour l'exécution.
+    return (
+        "type",
+        "chemin",
+        "package",
+        "classe",
+        "nom",
+        "loc",
+        "dégradation",
+        "ligne_début",
+        "ligne_fin",
+        "abstraite",
+        "est_interface",
+        "englobante",
+        *noms_métriques(visiteurs),
+        "cc",
+        "ac",
+        "ca",
+        "ce",
+        "abstractness",
+        "instability",
+        "distance",
+        "volatility",
+        "cyclic",
+        "ca_transitif",
+        "ce_transitif",
+        "couche",
+        "fichiers",
+        "classes",
+        "méthodes",
+        "mesure",
+        "nombre",
+        "moyenne",
+        "écart_type",
+        "p50",
+        "p90",
+        "p99",
+        "max",
+        "révision",
+        "commit",
+        "date",
+    )
+
+
+class ÉcrivainFlux:
+    def __init__(
+        self,
+        sortie: TextIO,
+        format_sortie: str,
+        visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+    ) -> None:
+        if format_sortie not in ("jsonl", "csv"):
+            raise ValueError(f"format de flux inconnu : {format_sortie}")
+        self._sortie = sortie
+        self._csv: Optional[csv.DictWriter] = None
+        if format_sortie == "csv":
+            self._csv = csv.DictWriter(
+                sortie, fieldnames=champs_flux(visiteurs), restval="", lineterminator="\n"
+            )
+            self._csv.writeheader()
+
+    def écrire(self, enregistrement: Dict[str, object]) -> None:
+        if self._csv is not None:
+            self._csv.writerow(enregistrement)
+        else:
+            self._sortie.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+
+    def vider(self) -> None:
+        self._sortie.flush()
+
+
+def _chemin_affiché(chemin: Path, racine: Optional[Path]) -> str:
+    if racine is not None:
+        try:
+            return chemin.relative_to(racine).as_posix()
+        except ValueError:
+            pass
+    return chemin.as_posix()
+
+
+def enregistrements_fichier(
+    analyse: AnalyseFichier, racine: Optional[Path] = None
+) -> Iterator[Dict[str, object]]:
+    chemin = _chemin_affiché(analyse.entrée.chemin, racine)
+    enregistrement: Dict[str, object] = {
+        "type": "fichier",
+        "chemin": chemin,
+        "package": analyse.package,
+        "loc": analyse.entrée.loc,
+    }
+    if analyse.dégradation is not None:
+        enregistrement["dégradation"] = analyse.dégradation
+    yield enregistrement
+    for cls in analyse.classes:
+        yield {
+            "type": "classe",
+            "chemin": chemin,
+            "package": analyse.package,
+            "nom": cls.nom,
+            "loc": cls.loc,
+            "ligne_début": cls.ligne_début,
+            "ligne_fin": cls.ligne_fin,
+            "abstraite": cls.abstraite,
+            "est_interface": cls.est_interface,
+            "englobante": cls.englobante,
+            **dict(cls.métriques),
+        }
+    for méthode in analyse.méthodes:
+        yield {
+            "type": "méthode",
+            "chemin": chemin,
+            "package": analyse.package,
+            "classe": méthode.classe,
+            "nom": méthode.nom,
+            "loc": méthode.loc,
+            "ligne_début": méthode.ligne_début,
+            "ligne_fin": méthode.ligne_fin,
+            **dict(méthode.métriques),
+        }
+
+
+def enregistrements_distributions(
+    nom: str, statistiques: StatistiquesStructure
+) -> Iterator[Dict[str, object]]:
+    for mesure, distribution in (
+        ("loc_classe", statistiques.loc_classes),
+        ("loc_méthode", statistiques.loc_méthodes),
+        ("complexité", statistiques.complexités),
+    ):
+        if not distribution.nombre:
+            continue
+        yield {
+            "type": "distribution",
+            "nom": nom,
+            "mesure": mesure,
+            "nombre": distribution.nombre,
+            "moyenne": distribution.moyenne,
+            "écart_type": distribution.écart_type,
+            "p50": distribution.quantile(0.5),
+            "p90": distribution.quantile(0.9),
+            "p99": distribution.quantile(0.99),
+            "max": distribution.maximum,
+        }
+
+
+def enregistrement_package(métrique: PackageMetrics) -> Dict[str, object]:
+    return {
+        "type": "package",
+        "package": métrique.nom,
+        "cc": métrique.cc,
+        "ac": métrique.ac,
+        "ca": métrique.ca,
+        "ce": métrique.ce,
+        "abstractness": métrique.abstractness,
+        "instability": métrique.instability,
+        "distance": métrique.distance,
+        "volatility": métrique.volatility,
+        "cyclic": métrique.cyclic,
+        "ca_transitif": métrique.ca_transitif,
+        "ce_transitif": métrique.ce_transitif,
+        "couche": métrique.couche,
+    }
+
+
+def enregistrements_historique(point: PointHistorique) -> Iterator[Dict[str, object]]:
+    yield {
+        "type": "révision",
+        "révision": point.révision.nom,
+        "commit": point.révision.commit,
+        "date": point.révision.date,
+        "fichiers": point.fichiers,
+        "loc": point.loc,
+        "classes": point.classes,
+        "méthodes": point.méthodes,
+    }
+    for métrique in point.métriques:
+        yield {**enregistrement_package(métrique), "révision": point.révision.nom}
+
+
+def émettre_flux(
+    analyses: Iterable[AnalyseFichier],
+    écrivain: ÉcrivainFlux,
+    racine: Optional[Path] = None,
+    historique: Optional[HistoriqueModifications] = None,
+    profileur: Optional[Profileur] = None,
+    niveau: str = NIVEAU_DÉPENDANCES,
+    partitions: Optional[Dict[str, Set[Path]]] = None,
+) -> None:
+    # Chaque fichier est écrit dès son analyse puis oublié : seuls les agrégats par
+    # paquet et par partition survivent jusqu'aux enregistrements de fin.
+    packages: Dict[str, PackageBrut] = {}
+    commits: Dict[str, Set[int]] = {}
+    partitions = partitions or {}
+    cumuls = {nom: [0, 0] for nom in partitions}
+    statistiques = {nom: StatistiquesStructure() for nom in partitions}
+    for analyse in analyses:
+        for enregistrement in enregistrements_fichier(analyse, racine):
+            écrivain.écrire(enregistrement)
+        écrivain.vider()
+        for nom, membres in partitions.items():
+            if analyse.entrée.chemin in membres:
+                cumul = cumuls[nom]
+                cumul[0] += 1
+                cumul[1] += analyse.entrée.loc
+                statistiques[nom].ajouter(analyse)
+        if niveau != NIVEAU_DÉPENDANCES:
+            continue
+        info = packages.setdefault(analyse.package, PackageBrut(analyse.package))
+        info.ajouter(analyse, conserver_fichier=False)
+        if historique is not None:
+            commits.setdefault(analyse.package, set()).update(
+                historique.commits_pour(analyse.entrée.chemin)
+            )
+    for nom, (nb_fichiers, loc) in cumuls.items():
+        écrivain.écrire(
+            {
+                "type": "partition",
+                "nom": nom,
+                "fichiers": nb_fichiers,
+                "loc": loc,
+                "classes": statistiques[nom].loc_classes.nombre,
+                "méthodes": statistiques[nom].loc_méthodes.nombre,
+            }
+        )
+        for enregistrement in enregistrements_distributions(nom, statistiques[nom]):
+            écrivain.écrire(enregistrement)
+    écrivain.vider()
+    if niveau != NIVEAU_DÉPENDANCES:
+        return
+    volatilités = (
+        {nom: len(ensemble) for nom, ensemble in commits.items()}
+        if historique is not None
+        else None
+    )
+    métriques = calculer_metriques_packages(list(packages.values()), volatilités, profileur)
+    for métrique in métriques:
+        écrivain.écrire(enregistrement_package(métrique))
+    écrivain.vider()
+
+
+@dataclass(frozen=True)
+class Partition:
+    nom: str
+    racines: Tuple[Path, ...]
+
+
+# Configuration livrée avec l'outil : le moteur générique et une partition par jeu.
+FICHIER_PARTITIONS_PAR_DÉFAUT = Path(__file__).resolve().with_name("partitions_jeux.json")
+
+
+@dataclass(frozen=True)
+class ConfigurationPartitions:
+    racine: Path
+    partitions: List[Partition]
+
+
+def charger_partitions(fichier: Path) -> ConfigurationPartitions:
+    # Format : {"racine": "..", "partitions": [{"nom": "...", "racines": ["...", ...]}]}.
+    # Les racines sont relatives à "racine", elle-même relative au fichier de configuration.
+    try:
+        données = json.loads(fichier.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as erreur:
+        raise ValueError(f"{fichier} : JSON invalide ({erreur})") from erreur
+    if not isinstance(données, dict) or not isinstance(données.get("partitions"), list):
+        raise ValueError(f"{fichier} : une liste \"partitions\" est attendue")
+    base = (fichier.parent / str(données.get("racine", "."))).resolve()
+    partitions: List[Partition] = []
+    for position, description in enumerate(données["partitions"]):
+        if not isinstance(description, dict):
+            raise ValueError(f"{fichier} : la partition n°{position + 1} doit être un objet")
+        nom = description.get("nom")
+        racines = description.get("racines")
+        if not isinstance(nom, str) or not nom:
+            raise ValueError(f"{fichier} : la partition n°{position + 1} n'a pas de nom")
+        if not isinstance(racines, list) or not all(isinstance(r, str) for r in racines):
+            raise ValueError(f"{fichier} : la partition {nom} doit lister ses racines")
+        if any(partition.nom == nom for partition in partitions):
+            raise ValueError(f"{fichier} : partition {nom} définie deux fois")
+        partitions.append(Partition(nom, tuple(base / racine for racine in racines)))
+    return ConfigurationPartitions(base, partitions)
+
+
+def parcourir_partitions(
+    partitions: Sequence[Partition],
+    exclusions: Sequence[str] = EXCLUSIONS_PAR_DÉFAUT,
+    gitignore: bool = True,
+) -> Iterator[Tuple[Path, Tuple[str, ...]]]:
+    # Un seul parcours de toutes les racines : chaque fichier sort une fois, dans l'ordre de
+    # sorted(), avec les partitions dont une racine le contient. L'analyse peut ainsi
+    # commencer avant la fin du parcours.
+    racines = [
+        (partition.nom, racine.parts) for partition in partitions for racine in partition.racines
     ]
+    toutes = sorted({racine for partition in partitions for racine in partition.racines})
+    for fichier in iterer_fichiers(toutes, exclusions, gitignore):
+        parties = fichier.parts
+        yield fichier, tuple(
+            dict.fromkeys(nom for nom, préfixe in racines if parties[: len(préfixe)] == préfixe)
+        )
+
+
+def chemin_relatif(chemin: Path, racine: Path) -> str:
+    # Relatif sans normalisation, comme à l'affichage : `racine / relatif` redonne le chemin
+    # tel que le parcours l'a produit, y compris sous une racine "../autre".
+    return _chemin_affiché(chemin, racine)
+
+
+def numéro_shard(relatif: str, nb_parts: int) -> int:
+    # Répartition stable d'une machine à l'autre : elle ne dépend que du chemin relatif.
+    empreinte = hashlib.blake2b(relatif.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(empreinte, "big") % nb_parts
+
+
+@dataclass
+class RésultatPartiel:
+    # Analyses d'une part des fichiers ; les membres des partitions sont notés avec leur
+    # rang dans la partition complète pour que la fusion retrouve l'ordre du parcours.
+    numéro: int
+    nb_parts: int
+    niveau: str
+    membres: Dict[str, List[Tuple[int, str]]]
+    analyses: Dict[str, Tuple]
+    visiteurs: Tuple[str, ...] = ()
+    avec_lignes: bool = False
+
+
+def découper(
+    membres: Dict[str, List[Path]], racine: Path, numéro: int, nb_parts: int
+) -> Tuple[Dict[str, List[Tuple[int, str]]], List[Path]]:
+    relatifs: Dict[Path, str] = {}
+    retenus: Dict[str, List[Tuple[int, str]]] = {}
+    for nom, liste in membres.items():
+        retenus[nom] = []
+        for rang, fichier in enumerate(liste):
+            if fichier not in relatifs:
+                relatifs[fichier] = chemin_relatif(fichier, racine)
+            if numéro_shard(relatifs[fichier], nb_parts) == numéro:
+                retenus[nom].append((rang, relatifs[fichier]))
+    fichiers = sorted(
+        fichier
+        for fichier, relatif in relatifs.items()
+        if numéro_shard(relatif, nb_parts) == numéro
+    )
+    return retenus, fichiers
+
+
+def écrire_partiel(fichier: Path, partiel: RésultatPartiel) -> None:
+    contenu = (
+        VERSION_ANALYSE,
+        partiel.numéro,
+        partiel.nb_parts,
+        partiel.niveau,
+        partiel.membres,
+        partiel.analyses,
+        partiel.visiteurs,
+        partiel.avec_lignes,
+    )
+    with gzip.open(fichier, "wb") as handle:
+        pickle.dump(contenu, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def lire_partiel(fichier: Path) -> RésultatPartiel:
+    try:
+        with gzip.open(fichier, "rb") as handle:
+            version, *champs = pickle.load(handle)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError) as erreur:
+        raise ValueError(f"{fichier} : résultat partiel illisible ({erreur})") from erreur
+    if version != VERSION_ANALYSE:
+        raise ValueError(
+            f"{fichier} : résultat partiel d'une autre version de l'analyse ({version})"
+        )
+    return RésultatPartiel(*champs)
+
+
+def assembler_partiels(
+    partiels: Sequence[RésultatPartiel],
+    racine: Path,
+    noms_partitions: Sequence[str],
+    niveau: str,
+    visiteurs: Sequence[VisiteurMétrique] = VISITEURS_MÉTRIQUES,
+    avec_lignes: bool = False,
+) -> Tuple[Dict[str, List[Path]], Dict[Path, AnalyseFichier]]:
+    # Toutes les parts d'un même découpage doivent être présentes une fois et une seule :
+    # le résultat est alors celui d'une analyse sur une seule machine.
+    if not partiels:
+        raise ValueError("aucun résultat partiel à fusionner")
+    nb_parts = partiels[0].nb_parts
+    if any(partiel.nb_parts != nb_parts for partiel in partiels):
+        raise ValueError("résultats partiels issus de découpages différents")
+    numéros = sorted(partiel.numéro for partiel in partiels)
+    if numéros != list(range(nb_parts)):
+        manquants = sorted(set(range(nb_parts)) - set(numéros))
+        doublons = sorted({numéro for numéro in numéros if numéros.count(numéro) > 1})
+        détails = [f"part {numéro + 1}/{nb_parts} absente" for numéro in manquants]
+        détails += [f"part {numéro + 1}/{nb_parts} en double" for numéro in doublons]
+        raise ValueError("résultats partiels incomplets : " + ", ".join(détails))
+    membres: Dict[str, List[Tuple[int, Path]]] = {nom: [] for nom in noms_partitions}
+    analyses: Dict[Path, AnalyseFichier] = {}
+    signature = _signature_visiteurs(visiteurs)
+    for partiel in partiels:
+        if partiel.visiteurs != signature:
+            raise ValueError(
+                f"part {partiel.numéro + 1}/{nb_parts} analysée avec d'autres métriques "
+                f"({', '.join(partiel.visiteurs) or 'aucune'})"
+            )
+        if avec_lignes and not partiel.avec_lignes:
+            raise ValueError(
+                f"part {partiel.numéro + 1}/{nb_parts} analysée sans --duplication"
+            )
+        if _rang_niveau(partiel.niveau) < _rang_niveau(niveau):
+            raise ValueError(
+                f"part {partiel.numéro + 1}/{nb_parts} analysée au niveau {partiel.niveau}, "
+                f"insuffisant pour le niveau {niveau}"
+            )
+        if list(partiel.membres) != list(noms_partitions):
+            raise ValueError(
+                f"part {partiel.numéro + 1}/{nb_parts} : partitions "
+                f"{', '.join(partiel.membres)} au lieu de {', '.join(noms_partitions)}"
+            )
+        for relatif, données in partiel.analyses.items():
+            chemin = racine / relatif
+            analyses[chemin] = AnalyseFichier.depuis_tuple(chemin, données).au_niveau(niveau)
+        for nom, rangs in partiel.membres.items():
+            membres[nom].extend(
+                (rang, racine / relatif) for rang, relatif in rangs
+            )
+    ordonnés: Dict[str, List[Path]] = {}
+    for nom, rangs in membres.items():
+        rangs.sort()
+        if [rang for rang, _ in rangs] != list(range(len(rangs))):
+            raise ValueError(f"partition {nom} incomplète dans les résultats partiels")
+        ordonnés[nom] = [chemin for _, chemin in rangs]
+    return ordonnés, analyses
+
+
+def compter_loc(racines: Sequence[Path], jobs: int = 1) -> Tuple[int, List[EntréeLOC]]:
+    analyse = analyser_racines(racines, jobs, niveau=NIVEAU_LOC)
+    return analyse.total_loc, analyse.détails
+
+
+def nombre_processus(valeur: str) -> int:
+    jobs = int(valeur)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError("le nombre de processus doit être positif")
+    return jobs or os.cpu_count() or 1
+
+
+def _part_shard(valeur: str) -> Tuple[int, int]:
+    numéro, _, nb_parts = valeur.partition("/")
+    try:
+        couple = int(numéro), int(nb_parts)
+    except ValueError:
+        raise argparse.ArgumentTypeError("format attendu : I/N, par exemple 2/4") from None
+    if not 1 <= couple[0] <= couple[1]:
+        raise argparse.ArgumentTypeError("la part I doit être comprise entre 1 et N")
+    return couple[0] - 1, couple[1]
+
+
+def construire_parseur() -> argparse.ArgumentParser:
+    parseur = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parseur.add_argument(
+        "-j",
+        "--jobs",
+        type=nombre_processus,
+        default=1,
+        metavar="N",
+        help="nombre de processus d'analyse (0 : un par cœur, défaut : 1)",
+    )
+    parseur.add_argument(
+        "--partitions",
+        type=Path,
+        default=FICHIER_PARTITIONS_PAR_DÉFAUT,
+        metavar="FICHIER",
+        help="configuration JSON des partitions à analyser (défaut : partitions_jeux.json, "
+        "moteur générique puis un jeu par partition)",
+    )
+    parseur.add_argument(
+        "--shard",
+        type=_part_shard,
+        metavar="I/N",
+        help="n'analyser que la part I des N parts du projet et écrire le résultat partiel "
+        "dans le fichier donné par -o",
+    )
+    parseur.add_argument(
+        "--fusionner",
+        nargs="+",
+        type=Path,
+        metavar="PARTIEL",
+        help="produire le rapport à partir des résultats partiels de toutes les parts, "
+        "sans réanalyser les fichiers",
+    )
+    parseur.add_argument(
+        "--historique",
+        nargs="*",
+        metavar="RÉVISION",
+        help="série temporelle des totaux et métriques de paquets pour chaque révision "
+        "donnée (toutes les étiquettes si aucune), lue directement dans le dépôt git",
+    )
+    parseur.add_argument(
+        "--niveau",
+        choices=NIVEAUX_ANALYSE,
+        default=NIVEAU_DÉPENDANCES,
+        help="loc : comptage seul ; structure : classes et méthodes ; dependances : "
+        "métriques de paquets et couplage (défaut)",
+    )
+    parseur.add_argument(
+        "--duplication",
+        action="store_true",
+        help="détecter le code dupliqué (rapport texte, niveau structure ou dependances) ; "
+        "avec --shard, garde dans la part les empreintes de lignes qu'il demande",
+    )
+    parseur.add_argument(
+        "--duplication-fenetre",
+        type=int,
+        default=8,
+        metavar="N",
+        help="nombre minimal de lignes normalisées d'un bloc dupliqué (défaut : 8)",
+    )
+    parseur.add_argument(
+        "--exclure",
+        action="append",
+        default=[],
+        metavar="MOTIF",
+        help="motif au format .gitignore à exclure du parcours, en plus de "
+        + " et ".join(EXCLUSIONS_PAR_DÉFAUT)
+        + " (répétable)",
+    )
+    parseur.add_argument(
+        "--sans-gitignore",
+        action="store_true",
+        help="ne pas tenir compte des fichiers .gitignore rencontrés",
+    )
+    parseur.add_argument(
+        "--taille-max",
+        type=int,
+        default=LIMITES_PAR_DÉFAUT.taille_max,
+        metavar="OCTETS",
+        help="au-delà, un fichier n'est analysé qu'au niveau loc (0 : sans limite, "
+        f"défaut : {LIMITES_PAR_DÉFAUT.taille_max})",
+    )
+    parseur.add_argument(
+        "--longueur-ligne-max",
+        type=int,
+        default=LIMITES_PAR_DÉFAUT.longueur_ligne_max,
+        metavar="OCTETS",
+        help="longueur de ligne au-delà de laquelle un fichier n'est analysé qu'au niveau "
+        f"loc (0 : sans limite, défaut : {LIMITES_PAR_DÉFAUT.longueur_ligne_max})",
+    )
+    parseur.add_argument(
+        "--duree-max",
+        type=float,
+        default=LIMITES_PAR_DÉFAUT.durée_max,
+        metavar="SECONDES",
+        help="durée d'analyse d'un fichier au-delà de laquelle seules ses LOC sont "
+        f"comptées (0 : sans limite, défaut : {LIMITES_PAR_DÉFAUT.durée_max:g})",
+    )
+    parseur.add_argument(
+        "--analyser-generes",
+        action="store_true",
+        help="analyser entièrement le code reconnu comme généré (en-tête ou longueur des "
+        "lignes) au lieu de n'en compter que les LOC",
+    )
+    parseur.add_argument(
+        "--metriques",
+        nargs="*",
+        choices=tuple(VISITEURS_PAR_NOM),
+        metavar="VISITEUR",
+        help="visiteurs de métriques à appliquer aux classes et méthodes, parmi "
+        + ", ".join(VISITEURS_PAR_NOM)
+        + " (tous par défaut, aucun si l'option est donnée seule)",
+    )
+    parseur.add_argument(
+        "--cache",
+        type=Path,
+        metavar="DOSSIER",
+        help="dossier du cache d'analyse réutilisé d'une exécution à l'autre (l'historique "
+        "git de la volatilité est de toute façon gardé, par défaut sous .git/compter_loc)",
+    )
+    parseur.add_argument(
+        "--volatilite-depuis",
+        metavar="DATE",
+        help="fenêtre de l'historique git pour la volatilité (syntaxe de git log --since)",
+    )
+    parseur.add_argument(
+        "--volatilite-commits",
+        type=int,
+        metavar="N",
+        help="ne considérer que les N derniers commits pour la volatilité",
+    )
+    parseur.add_argument(
+        "--format",
+        dest="format_sortie",
+        choices=("texte", "jsonl", "csv"),
+        default="texte",
+        help="texte : rapport complet ; jsonl/csv : un enregistrement par fichier, classe, "
+        "méthode puis paquet, écrit au fil de l'analyse",
+    )
+    parseur.add_argument(
+        "-o",
+        "--sortie",
+        type=Path,
+        metavar="FICHIER",
+        help="fichier de sortie du flux (sortie standard par défaut)",
+    )
+    parseur.add_argument(
+        "--profile",
+        action="store_true",
+        help="chronométrer chaque étape et afficher le profil sur la sortie d'erreur",
+    )
+    parseur.add_argument(
+        "--profile-trace",
+        type=Path,
+        metavar="FICHIER",
+        help="exporter le profil au format trace Chrome (implique --profile)",
+    )
+    parseur.add_argument(
+        "--profile-lents",
+        type=int,
+        default=10,
+        metavar="N",
+        help="nombre de fichiers les plus lents à lister (défaut : 10)",
+    )
+    return parseur
+
+
+def _terminer(
+    options: argparse.Namespace, cache: Optional[CacheAnalyse], profileur: Optional[Profileur]
+) -> None:
+    if cache is not None:
+        cache.enregistrer()
+    if profileur is None:
+        return
+    profileur.afficher(sys.stderr)
+    if options.profile_trace is not None:
+        profileur.exporter_trace(options.profile_trace)
+
 
-    analyse_générique = analyser_racines(génériques)
-    analyse_spécifique = analyser_racines(spécifiques)
+def _limites_fichier(options: argparse.Namespace) -> LimitesFichier:
+    return LimitesFichier(
+        taille_max=options.taille_max,
+        longueur_ligne_max=options.longueur_ligne_max,
+        durée_max=options.duree_max,
+        détecter_générés=not options.analyser_generes,
+    )
 
-    afficher_details_loc("Partie générique", analyse_générique, racine_projet)
-    afficher_details_loc("Partie spécifique", analyse_spécifique, racine_projet)
 
-    afficher_metriques_structurales(
-        "Métriques structurelles (générique)", analyse_générique
+def _exécuter_historique(
+    options: argparse.Namespace,
+    configuration: ConfigurationPartitions,
+    profileur: Optional[Profileur],
+    visiteurs: Sequence[VisiteurMétrique],
+) -> None:
+    sommet = _git(configuration.racine, "rev-parse", "--show-toplevel")
+    if sommet is None:
+        raise SystemExit(f"{configuration.racine} n'est pas dans un dépôt git")
+    dépôt = Path(sommet)
+    préfixes = sorted(
+        {
+            Path(os.path.relpath(racine, dépôt)).as_posix()
+            for partition in configuration.partitions
+            for racine in partition.racines
+        }
     )
-    afficher_metriques_structurales(
-        "Métriques structurelles (spécifique)", analyse_spécifique
+    try:
+        révisions = lister_révisions(dépôt, options.historique)
+    except ValueError as erreur:
+        raise SystemExit(str(erreur)) from erreur
+    exclusions = EXCLUSIONS_PAR_DÉFAUT + tuple(options.exclure)
+    points = analyser_historique(
+        dépôt, préfixes, révisions, exclusions, profileur, _limites_fichier(options), visiteurs
     )
+    if options.format_sortie == "texte":
+        afficher_historique("Historique des révisions", points)
+        return
+    with (
+        options.sortie.open("w", encoding="utf-8", newline="")
+        if options.sortie is not None
+        else nullcontext(sys.stdout)
+    ) as sortie:
+        écrivain = ÉcrivainFlux(sortie, options.format_sortie, visiteurs)
+        for point in points:
+            for enregistrement in enregistrements_historique(point):
+                écrivain.écrire(enregistrement)
+            écrivain.vider()
+
+
+def main(
+    arguments: Optional[Sequence[str]] = None,
+    visiteurs: Optional[Sequence[VisiteurMétrique]] = None,
+) -> None:
+    # `visiteurs` permet à un appelant d'injecter ses propres métriques ; à défaut, ce
+    # sont celles choisies par --metriques.
+    parseur = construire_parseur()
+    options = parseur.parse_args(arguments)
+    if visiteurs is None:
+        visiteurs = (
+            tuple(VISITEURS_PAR_NOM[nom] for nom in dict.fromkeys(options.metriques))
+            if options.metriques is not None
+            else VISITEURS_MÉTRIQUES
+        )
+    try:
+        configuration = charger_partitions(options.partitions)
+    except (OSError, ValueError) as erreur:
+        parseur.error(str(erreur))
+    racine_projet = configuration.racine
+    cache = CacheAnalyse(options.cache) if options.cache is not None else None
+    profileur = (
+        Profileur(options.profile_lents)
+        if options.profile or options.profile_trace is not None
+        else None
+    )
+
+    if options.shard is not None and (
+        options.fusionner is not None or options.historique is not None
+    ):
+        parseur.error("--shard est incompatible avec --fusionner et --historique")
+    if options.shard is not None and options.sortie is None:
+        parseur.error("--shard demande un fichier de sortie (-o)")
+    if options.historique is not None:
+        _exécuter_historique(options, configuration, profileur, visiteurs)
+        _terminer(options, cache, profileur)
+        return
+
+    niveau = options.niveau
+    limites = _limites_fichier(options)
+    if options.duplication and niveau == NIVEAU_LOC:
+        parseur.error("--duplication demande le niveau structure ou dependances")
+    if options.duplication_fenetre < 1:
+        parseur.error("--duplication-fenetre doit être strictement positif")
+    exclusions = EXCLUSIONS_PAR_DÉFAUT + tuple(options.exclure)
+    gitignore = not options.sans_gitignore
+    noms_partitions = [partition.nom for partition in configuration.partitions]
+    fusionnées: Optional[Dict[Path, AnalyseFichier]] = None
+    # Un fichier commun à plusieurs partitions n'est analysé qu'une fois. Les membres des
+    # partitions se remplissent au fil du parcours, avant que chaque fichier soit analysé.
+    membres: Dict[str, List[Path]] = {nom: [] for nom in noms_partitions}
+    ensembles: Dict[str, Set[Path]] = {nom: set() for nom in noms_partitions}
+    fichiers: Iterable[Path]
+    if options.fusionner is not None:
+        with _étape(profileur, "fusion_partiels"):
+            try:
+                membres, fusionnées = assembler_partiels(
+                    [lire_partiel(fichier) for fichier in options.fusionner],
+                    racine_projet,
+                    noms_partitions,
+                    niveau,
+                    visiteurs,
+                    options.duplication,
+                )
+            except ValueError as erreur:
+                parseur.error(str(erreur))
+        ensembles = {nom: set(liste) for nom, liste in membres.items()}
+        fichiers = sorted(set().union(*membres.values()))
+    else:
+
+        def parcourir() -> Iterator[Path]:
+            for fichier, noms in _suivre(
+                profileur,
+                "parcours",
+                parcourir_partitions(configuration.partitions, exclusions, gitignore),
+            ):
+                for nom in noms:
+                    membres[nom].append(fichier)
+                    ensembles[nom].add(fichier)
+                yield fichier
+
+        fichiers = parcourir()
+
+    if options.shard is not None:
+        numéro, nb_parts = options.shard
+        # Le découpage a besoin des partitions complètes : le parcours est mené à son terme.
+        fichiers = list(fichiers)
+        retenus, à_analyser = découper(membres, racine_projet, numéro, nb_parts)
+        with _étape(profileur, "analyse"):
+            analyses_part = {
+                chemin_relatif(analyse.entrée.chemin, racine_projet): analyse.en_tuple()
+                for analyse in iterer_analyses(
+                    à_analyser,
+                    options.jobs,
+                    cache,
+                    profileur,
+                    niveau,
+                    limites,
+                    visiteurs,
+                    options.duplication,
+                )
+            }
+        écrire_partiel(
+            options.sortie,
+            RésultatPartiel(
+                numéro,
+                nb_parts,
+                niveau,
+                retenus,
+                analyses_part,
+                _signature_visiteurs(visiteurs),
+                options.duplication,
+            ),
+        )
+        _terminer(options, cache, profileur)
+        return
+
+    def analyser() -> Iterator[AnalyseFichier]:
+        if fusionnées is not None:
+            return (fusionnées[fichier] for fichier in fichiers)
+        return iterer_analyses(
+            fichiers,
+            options.jobs,
+            cache,
+            profileur,
+            niveau,
+            limites,
+            visiteurs,
+            options.duplication,
+        )
+
+    def lire_historique() -> Optional[HistoriqueModifications]:
+        with _étape(profileur, "historique_git"):
+            return lire_historique_git(
+                racine_projet,
+                depuis=options.volatilite_depuis,
+                max_commits=options.volatilite_commits,
+                dossier_cache=options.cache,
+            )
+
+    if options.format_sortie != "texte":
+        historique = lire_historique() if niveau == NIVEAU_DÉPENDANCES else None
+        analyses = analyser()
+        if options.sortie is not None:
+            with options.sortie.open("w", encoding="utf-8", newline="") as sortie:
+                écrivain = ÉcrivainFlux(sortie, options.format_sortie, visiteurs)
+                émettre_flux(
+                    analyses, écrivain, racine_projet, historique, profileur, niveau, ensembles
+                )
+        else:
+            écrivain = ÉcrivainFlux(sys.stdout, options.format_sortie, visiteurs)
+            émettre_flux(
+                analyses, écrivain, racine_projet, historique, profileur, niveau, ensembles
+            )
+        _terminer(options, cache, profileur)
+        return
+
+    # Chaque fichier n'est analysé qu'une fois puis versé, dès son arrivée, dans le cumul
+    # de chacune de ses partitions et dans l'analyse de l'ensemble du projet. Seuls les
+    # fichiers dégradés, et les lignes normalisées pour --duplication, sont conservés.
+    cumuls = {nom: CumulPartition() for nom in noms_partitions}
+    dégradés: List[AnalyseFichier] = []
+    à_comparer: List[AnalyseFichier] = []
+
+    def répartir(analyses: Iterable[AnalyseFichier]) -> Iterator[AnalyseFichier]:
+        for analyse in analyses:
+            for nom, cumul in cumuls.items():
+                if analyse.entrée.chemin in ensembles[nom]:
+                    cumul.ajouter(analyse)
+            if analyse.dégradation is not None:
+                dégradés.append(analyse)
+            if options.duplication:
+                à_comparer.append(
+                    replace(analyse, classes=[], méthodes=[], imports=set(), références=None)
+                )
+            yield analyse
+
+    analyse_combinée: Optional[RésultatAnalyse] = None
+    with _étape(profileur, "analyse"):
+        if niveau == NIVEAU_DÉPENDANCES:
+            analyse_combinée = fusionner_analyses(répartir(analyser()), niveau, visiteurs)
+        else:
+            deque(répartir(analyser()), maxlen=0)
+
+    for nom, cumul in cumuls.items():
+        afficher_details_loc(f"Partie {nom}", cumul, racine_projet)
+    if dégradés:
+        afficher_fichiers_dégradés(
+            "Fichiers dégradés (LOC seulement)", dégradés, racine_projet
+        )
+    if niveau == NIVEAU_LOC:
+        _terminer(options, cache, profileur)
+        return
+
+    for nom, cumul in cumuls.items():
+        afficher_metriques_structurales(f"Métriques structurelles ({nom})", cumul)
+    if options.duplication:
+        groupes: Dict[Path, Set[str]] = {}
+        for nom, liste in membres.items():
+            for fichier in liste:
+                groupes.setdefault(fichier, set()).add(nom)
+        with _étape(profileur, "duplication"):
+            rapport = détecter_duplications(
+                à_comparer,
+                options.duplication_fenetre,
+                {fichier: frozenset(noms) for fichier, noms in groupes.items()},
+            )
+        afficher_duplications(
+            "Duplication de code (ensemble du projet)",
+            rapport,
+            {analyse.entrée.chemin: analyse.package for analyse in à_comparer},
+            membres,
+            racine_projet,
+        )
+    if analyse_combinée is None:
+        _terminer(options, cache, profileur)
+        return
 
-    analyse_combinée = analyser_racines(génériques + spécifiques)
+    historique = lire_historique()
+    volatilités = (
+        calculer_volatilités(analyse_combinée.packages, historique)
+        if historique is not None
+        else None
+    )
     afficher_metriques_packages(
         "Métriques de type JDepend (ensemble du projet)",
-        calculer_metriques_packages(analyse_combinée.packages),
+        calculer_metriques_packages(analyse_combinée.packages, volatilités, profileur),
     )
+    afficher_structure_packages(
+        "Cycles et couches de dépendances (ensemble du projet)",
+        graphe_packages(analyse_combinée.packages),
+    )
+    with _étape(profileur, "graphe_classes"):
+        couplages = couplages_classes(construire_graphe_classes(analyse_combinée))
+    afficher_couplage_classes("Couplage entre classes (ensemble du projet)", couplages)
 
-    total_générique, détails_génériques = compter_loc(génériques)
-    total_spécifique, détails_spécifiques = compter_loc(spécifiques)
+    _terminer(options, cache, profileur)
 
-    def afficher(titre: str, total: int, détails: Sequence[EntréeLOC]) -> None:
-        print(titre)
-        print("=" * len(titre))
-        print(f"Total LOC : {total}")
-        for entrée in détails:
-            chemin_rel = entrée.chemin.relative_to(racine_projet)
-            print(f"  - {chemin_rel}: {entrée.loc}")
-        print()
 
-    afficher("Partie générique", total_générique, détails_génériques)
-    afficher("Partie spécifique", total_spécifique, détails_spécifiques)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Garde l'analyse de compter_loc.py en mémoire et la sert sur un socket Unix local.
+
+Le mode veille relève périodiquement un instantané (taille, mtime) des fichiers Java trouvés
+par `compter_loc.iterer_entrées`, ne réanalyse que les fichiers ajoutés ou modifiés et
+oublie les fichiers supprimés. Les totaux sont corrigés fichier par fichier et les métriques
+de paquets tenues à jour par un `GrapheIncrémental`. Les clients interrogent l'état courant
+par un protocole d'une ligne JSON par requête et par réponse :
+
+    {"requête": "totaux"}
+    {"requête": "paquets"}
+    {"requête": "paquet", "nom": "MoteurGenerique"}
+    {"requête": "fichier", "chemin": "MoteurGenerique/Moteur.java"}
+
+Exemple :
+
+    python veille_compter_loc.py servir --socket /tmp/loc.sock ..
+    python veille_compter_loc.py interroger --socket /tmp/loc.sock paquet MoteurGenerique
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import compter_loc
+from compter_loc import AnalyseFichier, PackageMetrics
+
+Instantané = Dict[Path, Tuple[int, int]]
+
+
+def prendre_instantané(
+    racines: Sequence[Path],
+    exclusions: Sequence[str] = compter_loc.EXCLUSIONS_PAR_DÉFAUT,
+    gitignore: bool = True,
+) -> Instantané:
+    # L'état vient de l'entrée du parcours : aucun second appel à stat par fichier.
+    return {
+        fichier: (état.st_size, état.st_mtime_ns)
+        for fichier, état in compter_loc.iterer_entrées(racines, exclusions, gitignore)
+    }
+
+
+@dataclass(frozen=True)
+class Modifications:
+    ajoutés: List[Path] = field(default_factory=list)
+    modifiés: List[Path] = field(default_factory=list)
+    supprimés: List[Path] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.ajoutés or self.modifiés or self.supprimés)
+
+
+def comparer_instantanés(ancien: Instantané, nouveau: Instantané) -> Modifications:
+    return Modifications(
+        ajoutés=sorted(chemin for chemin in nouveau if chemin not in ancien),
+        modifiés=sorted(
+            chemin
+            for chemin, état in nouveau.items()
+            if chemin in ancien and ancien[chemin] != état
+        ),
+        supprimés=sorted(chemin for chemin in ancien if chemin not in nouveau),
+    )
+
+
+@dataclass(frozen=True)
+class _AnalyseTolérante:
+    # Objet appelable pour pouvoir être envoyé aux processus par appliquer_aux_fichiers.
+    niveau: str
+
+    def __call__(self, fichier: Path) -> Optional[AnalyseFichier]:
+        try:
+            return compter_loc.analyser_fichier(fichier, niveau=self.niveau)
+        except OSError:
+            return None
+
+
+class ÉtatAnalyse:
+    def __init__(
+        self,
+        racines: Sequence[Path],
+        niveau: str = compter_loc.NIVEAU_DÉPENDANCES,
+        jobs: int = 1,
+    ) -> None:
+        self.racines = list(racines)
+        self.niveau = niveau
+        self.jobs = jobs
+        self.génération = 0
+        self._verrou = threading.Lock()
+        self._instantané: Instantané = {}
+        self._analyses: Dict[Path, AnalyseFichier] = {}
+        # Totaux (LOC, classes, méthodes) et nombre de fichiers par paquet, corrigés à
+        # chaque fichier ajouté, modifié ou supprimé.
+        self._totaux = [0, 0, 0]
+        self._fichiers_par_paquet: Dict[str, int] = {}
+        self._graphe = (
+            compter_loc.GrapheIncrémental()
+            if niveau == compter_loc.NIVEAU_DÉPENDANCES
+            else None
+        )
+
+    def rafraîchir(self) -> Modifications:
+        return self.appliquer(prendre_instantané(self.racines))
+
+    def appliquer(self, nouveau: Instantané) -> Modifications:
+        # L'instantané et les analyses sont calculés hors du verrou : les requêtes continuent
+        # d'être servies sur l'état précédent pendant la réanalyse.
+        modifications = comparer_instantanés(self._instantané, nouveau)
+        if not modifications:
+            return modifications
+        nouveau = dict(nouveau)
+        à_analyser = modifications.ajoutés + modifications.modifiés
+        analyses = compter_loc.appliquer_aux_fichiers(
+            _AnalyseTolérante(self.niveau), à_analyser, self.jobs
+        )
+        nouvelles: Dict[Path, AnalyseFichier] = {}
+        for chemin, analyse in zip(à_analyser, analyses):
+            if analyse is not None:
+                nouvelles[chemin] = analyse
+            else:
+                # Supprimé ou renommé depuis l'instantané (enregistrement par fichier
+                # temporaire) : il est traité comme disparu, le prochain relevé tranchera.
+                del nouveau[chemin]
+        modifications = Modifications(
+            ajoutés=[chemin for chemin in modifications.ajoutés if chemin in nouvelles],
+            modifiés=[chemin for chemin in modifications.modifiés if chemin in nouvelles],
+            supprimés=sorted(
+                modifications.supprimés
+                + [chemin for chemin in modifications.modifiés if chemin not in nouvelles]
+            ),
+        )
+        with self._verrou:
+            for chemin in modifications.supprimés:
+                self._cumuler(self._analyses.pop(chemin), -1)
+            for chemin in modifications.modifiés:
+                self._cumuler(self._analyses[chemin], -1)
+            for analyse in nouvelles.values():
+                self._cumuler(analyse, 1)
+            if self._graphe is not None:
+                for chemin in modifications.supprimés:
+                    self._graphe.retirer_fichier(chemin)
+                for chemin in modifications.ajoutés:
+                    self._graphe.ajouter_fichier(nouvelles[chemin])
+                for chemin in modifications.modifiés:
+                    self._graphe.mettre_à_jour_fichier(nouvelles[chemin])
+            self._analyses.update(nouvelles)
+            self._instantané = nouveau
+            self.génération += 1
+        return modifications
+
+    def _cumuler(self, analyse: AnalyseFichier, signe: int) -> None:
+        self._totaux[0] += signe * analyse.entrée.loc
+        self._totaux[1] += signe * len(analyse.classes)
+        self._totaux[2] += signe * len(analyse.méthodes)
+        if self.niveau == compter_loc.NIVEAU_LOC:
+            return
+        nombre = self._fichiers_par_paquet.get(analyse.package, 0) + signe
+        if nombre:
+            self._fichiers_par_paquet[analyse.package] = nombre
+        else:
+            del self._fichiers_par_paquet[analyse.package]
+
+    def _métriques_courantes(self) -> List[PackageMetrics]:
+        # Le graphe des paquets suit les fichiers un par un : après une modification, seul
+        # le voisinage des paquets touchés est recalculé.
+        assert self._graphe is not None
+        return self._graphe.métriques()
+
+    def _trouver_fichier(self, chemin: str) -> Optional[AnalyseFichier]:
+        candidat = Path(chemin)
+        if candidat.is_absolute():
+            return self._analyses.get(candidat)
+        for racine in self.racines:
+            analyse = self._analyses.get(racine / candidat)
+            if analyse is not None:
+                return analyse
+        return None
+
+    def répondre(self, requête: Dict[str, object]) -> Dict[str, object]:
+        genre = requête.get("requête")
+        with self._verrou:
+            if genre == "totaux":
+                loc, classes, méthodes = self._totaux
+                return {
+                    "génération": self.génération,
+                    "fichiers": len(self._analyses),
+                    "loc": loc,
+                    "classes": classes,
+                    "méthodes": méthodes,
+                    "paquets": len(self._fichiers_par_paquet),
+                }
+            if genre in ("paquets", "paquet"):
+                if self._graphe is None:
+                    return {"erreur": f"pas de métriques de paquets au niveau {self.niveau}"}
+                métriques = self._métriques_courantes()
+                if genre == "paquets":
+                    return {
+                        "génération": self.génération,
+                        "paquets": [compter_loc.enregistrement_package(m) for m in métriques],
+                    }
+                nom = requête.get("nom")
+                for métrique in métriques:
+                    if métrique.nom == nom:
+                        return {
+                            "génération": self.génération,
+                            "paquet": compter_loc.enregistrement_package(métrique),
+                        }
+                return {"erreur": f"paquet inconnu : {nom}"}
+            if genre == "fichier":
+                analyse = self._trouver_fichier(str(requête.get("chemin", "")))
+                if analyse is None:
+                    return {"erreur": f"fichier inconnu : {requête.get('chemin')}"}
+                return {
+                    "génération": self.génération,
+                    "enregistrements": list(compter_loc.enregistrements_fichier(analyse)),
+                }
+        return {"erreur": f"requête inconnue : {genre}"}
+
+
+class _GestionnaireRequêtes(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        état: ÉtatAnalyse = self.server.état  # type: ignore[attr-defined]
+        for ligne in self.rfile:
+            try:
+                requête = json.loads(ligne)
+                réponse = (
+                    état.répondre(requête)
+                    if isinstance(requête, dict)
+                    else {"erreur": "la requête doit être un objet JSON"}
+                )
+            except json.JSONDecodeError as erreur:
+                réponse = {"erreur": f"JSON invalide : {erreur}"}
+            self.wfile.write((json.dumps(réponse, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class ServeurVeille(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, chemin_socket: Path, état: ÉtatAnalyse) -> None:
+        if chemin_socket.exists():
+            chemin_socket.unlink()
+        self.état = état
+        super().__init__(str(chemin_socket), _GestionnaireRequêtes)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def veiller(état: ÉtatAnalyse, intervalle: float, arrêt: threading.Event) -> None:
+    while not arrêt.wait(intervalle):
+        modifications = état.rafraîchir()
+        if modifications:
+            print(
+                f"génération {état.génération} : {len(modifications.ajoutés)} ajouté(s), "
+                f"{len(modifications.modifiés)} modifié(s), "
+                f"{len(modifications.supprimés)} supprimé(s)",
+                file=sys.stderr,
+            )
+
+
+def interroger(chemin_socket: Path, requête: Dict[str, object]) -> Dict[str, object]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(chemin_socket))
+        client.sendall((json.dumps(requête, ensure_ascii=False) + "\n").encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile("rb") as lecteur:
+            return json.loads(lecteur.readline())
+
+
+def construire_parseur() -> argparse.ArgumentParser:
+    parseur = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commandes = parseur.add_subparsers(dest="commande", required=True)
+
+    servir = commandes.add_parser("servir", help="analyser puis surveiller les racines")
+    servir.add_argument("racines", nargs="+", type=Path)
+    servir.add_argument("--socket", type=Path, required=True, metavar="CHEMIN")
+    servir.add_argument(
+        "--intervalle",
+        type=float,
+        default=1.0,
+        metavar="SECONDES",
+        help="délai entre deux relevés de l'arborescence (défaut : 1)",
+    )
+    servir.add_argument(
+        "--niveau",
+        choices=compter_loc.NIVEAUX_ANALYSE,
+        default=compter_loc.NIVEAU_DÉPENDANCES,
+    )
+    servir.add_argument("-j", "--jobs", type=compter_loc.nombre_processus, default=1)
+
+    client = commandes.add_parser("interroger", help="interroger un serveur en cours")
+    client.add_argument("--socket", type=Path, required=True, metavar="CHEMIN")
+    client.add_argument("requête", choices=("totaux", "paquets", "paquet", "fichier"))
+    client.add_argument("argument", nargs="?", help="nom du paquet ou chemin du fichier")
+    return parseur
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    options = construire_parseur().parse_args(arguments)
+    if options.commande == "interroger":
+        requête: Dict[str, object] = {"requête": options.requête}
+        if options.requête == "paquet":
+            requête["nom"] = options.argument
+        elif options.requête == "fichier":
+            requête["chemin"] = options.argument
+        réponse = interroger(options.socket, requête)
+        print(json.dumps(réponse, ensure_ascii=False, indent=2))
+        return 1 if "erreur" in réponse else 0
+
+    état = ÉtatAnalyse(
+        [racine.resolve() for racine in options.racines], options.niveau, options.jobs
+    )
+    état.rafraîchir()
+    arrêt = threading.Event()
+    with ServeurVeille(options.socket, état) as serveur:
+        fil = threading.Thread(target=serveur.serve_forever, daemon=True)
+        fil.start()
+        print(f"En écoute sur {options.socket}", file=sys.stderr)
+        try:
+            veiller(état, options.intervalle, arrêt)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            arrêt.set()
+            serveur.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
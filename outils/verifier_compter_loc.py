@@ -0,0 +1,508 @@
+"""Vérifie hors ligne, sur des arborescences temporaires, les modes de compter_loc.py.
+
+Chaque vérification construit son propre petit projet Java dans un dossier temporaire et
+n'a besoin ni du réseau ni du dépôt courant :
+
+    python verifier_compter_loc.py            # toutes les vérifications
+    python verifier_compter_loc.py veille     # seulement celles nommées
+
+Le code de sortie est 1 si une vérification échoue.
+
+Les outils n'embarquent aucune dépendance : le lint, lui, se lance avec pyflakes installé
+dans l'environnement de développement (`pip install pyflakes`, puis
+`python -m pyflakes outils`).
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import compter_loc
+import veille_compter_loc
+
+
+class ÉchecVérification(Exception):
+    pass
+
+
+def _vérifier(condition: bool, message: str) -> None:
+    if not condition:
+        raise ÉchecVérification(message)
+
+
+def _écrire_java(racine: Path, paquet: str, classe: str, imports: Sequence[str] = ()) -> Path:
+    chemin = racine / paquet.replace(".", "/") / f"{classe}.java"
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    lignes = [f"package {paquet};", ""]
+    lignes += [f"import {cible};" for cible in imports]
+    lignes += [
+        "",
+        f"public class {classe} {{",
+        "    public int calcul(int a) {",
+        "        if (a > 0) {",
+        "            return a;",
+        "        }",
+        "        return -a;",
+        "    }",
+        "}",
+    ]
+    chemin.write_text("\n".join(lignes) + "\n", encoding="utf-8")
+    return chemin
+
+
+def _toucher(chemin: Path) -> None:
+    # Deux écritures dans la même tranche de mtime passeraient inaperçues du relevé.
+    état = chemin.stat()
+    os.utime(chemin, ns=(état.st_atime_ns, état.st_mtime_ns + 1_000_000_000))
+
+
+def _par_paquet(enregistrements: Iterable[Dict[str, object]]) -> List[Dict[str, object]]:
+    return sorted(enregistrements, key=lambda enregistrement: str(enregistrement["package"]))
+
+
+def vérifier_veille(dossier: Path) -> None:
+    racine = dossier / "src"
+    _écrire_java(racine, "app.noyau", "Moteur", ["app.outils.Aide"])
+    _écrire_java(racine, "app.outils", "Aide")
+    vue = _écrire_java(racine, "app.vue", "Vue", ["app.noyau.Moteur"])
+
+    état = veille_compter_loc.ÉtatAnalyse([racine])
+    état.rafraîchir()
+    chemin_socket = dossier / "veille.sock"
+    with veille_compter_loc.ServeurVeille(chemin_socket, état) as serveur:
+        fil = threading.Thread(target=serveur.serve_forever, daemon=True)
+        fil.start()
+        try:
+            totaux = veille_compter_loc.interroger(chemin_socket, {"requête": "totaux"})
+            _vérifier(totaux.get("fichiers") == 3, f"totaux inattendus : {totaux}")
+            réponse = veille_compter_loc.interroger(
+                chemin_socket, {"requête": "paquet", "nom": "app.noyau"}
+            )
+            paquet = réponse.get("paquet")
+            _vérifier(
+                isinstance(paquet, dict) and paquet["ca"] == 1 and paquet["ce"] == 1,
+                f"métriques de app.noyau inattendues : {réponse}",
+            )
+            réponse = veille_compter_loc.interroger(
+                chemin_socket, {"requête": "fichier", "chemin": "app/vue/Vue.java"}
+            )
+            _vérifier("enregistrements" in réponse, f"fichier introuvable : {réponse}")
+            réponse = veille_compter_loc.interroger(chemin_socket, {"requête": "inconnue"})
+            _vérifier("erreur" in réponse, f"requête inconnue acceptée : {réponse}")
+
+            # Un import change : les métriques incrémentales doivent rejoindre celles d'une
+            # analyse complète de l'arborescence modifiée.
+            _écrire_java(racine, "app.vue", "Vue", ["app.outils.Aide"])
+            _toucher(vue)
+            modifications = état.rafraîchir()
+            _vérifier(
+                modifications.modifiés == [vue], f"modification manquée : {modifications}"
+            )
+            réponse = veille_compter_loc.interroger(chemin_socket, {"requête": "paquets"})
+            analyse = compter_loc.analyser_racines([racine])
+            complet = compter_loc.calculer_metriques_packages(analyse.packages)
+            attendu = _par_paquet(compter_loc.enregistrement_package(m) for m in complet)
+            obtenu = _par_paquet(réponse.get("paquets", []))
+            _vérifier(obtenu == attendu, f"métriques divergentes : {obtenu} != {attendu}")
+            totaux = veille_compter_loc.interroger(chemin_socket, {"requête": "totaux"})
+            attendus = (3, analyse.total_loc, len(analyse.classes), len(analyse.méthodes), 3)
+            obtenus = tuple(
+                totaux.get(clé) for clé in ("fichiers", "loc", "classes", "méthodes", "paquets")
+            )
+            _vérifier(obtenus == attendus, f"totaux divergents : {obtenus} != {attendus}")
+        finally:
+            serveur.shutdown()
+    _vérifier(not chemin_socket.exists(), "le socket n'a pas été retiré à l'arrêt")
+
+    # Un fichier qui disparaît entre le relevé et son analyse est traité comme supprimé.
+    éphémère = _écrire_java(racine, "app.vue", "Temporaire")
+    instantané = veille_compter_loc.prendre_instantané([racine])
+    éphémère.unlink()
+    _toucher(vue)
+    instantané[vue] = (vue.stat().st_size, vue.stat().st_mtime_ns)
+    vue.unlink()
+    génération = état.génération
+    modifications = état.appliquer(instantané)
+    _vérifier(
+        modifications.ajoutés == [] and modifications.supprimés == [vue],
+        f"fichiers disparus mal traités : {modifications}",
+    )
+    totaux = état.répondre({"requête": "totaux"})
+    _vérifier(
+        totaux["fichiers"] == 2 and totaux["génération"] == génération + 1,
+        f"totaux inattendus après disparition : {totaux}",
+    )
+    _vérifier(not état.rafraîchir(), "le relevé suivant aurait dû être stable")
+
+
+def vérifier_parcours(dossier: Path) -> None:
+    dépôt = dossier / "dépôt"
+    racine = dépôt / "src"
+    for paquet, classe in (
+        ("corpus.module1", "A"),
+        ("corpus.module2", "B"),
+        ("a.b", "X"),
+        ("a.b", "Y"),
+        ("x.a.b", "X"),
+    ):
+        _écrire_java(racine, paquet, classe)
+    git = ["git", "-C", str(dépôt), "-c", "user.name=v", "-c", "user.email=v@v"]
+    for commande in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "corpus"]):
+        subprocess.run(git + commande, check=True, stdout=subprocess.DEVNULL)
+
+    # Sans --cache, l'historique de volatilité est gardé sous .git pour le HEAD courant,
+    # et celui d'un HEAD précédent est retiré.
+    gardés = dépôt / ".git" / "compter_loc"
+    for _ in range(2):
+        historique = compter_loc.lire_historique_git(dépôt)
+        _vérifier(
+            historique is not None and len(list(gardés.glob("historique-*.pickle"))) == 1,
+            "historique git non conservé d'une exécution à l'autre",
+        )
+        subprocess.run(
+            git + ["commit", "-q", "--allow-empty", "-m", "suite"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    tous = {
+        "a/b/X.java",
+        "a/b/Y.java",
+        "corpus/module1/A.java",
+        "corpus/module2/B.java",
+        "x/a/b/X.java",
+    }
+    # Les exclusions portent sur le chemin relatif à la racine, en parcours comme en mode
+    # historique (où la racine est un préfixe du dépôt).
+    for motif, exclus in (
+        ("module1/", {"corpus/module1/A.java"}),
+        ("corpus/module1/", {"corpus/module1/A.java"}),
+        ("/corpus/module1", {"corpus/module1/A.java"}),
+        ("a/b/X.java", {"a/b/X.java"}),
+        ("**/b/", {"a/b/X.java", "a/b/Y.java", "x/a/b/X.java"}),
+    ):
+        exclusions = compter_loc.EXCLUSIONS_PAR_DÉFAUT + (motif,)
+        parcourus = {
+            compter_loc.chemin_relatif(fichier, racine)
+            for fichier in compter_loc.iterer_fichiers([racine], exclusions, gitignore=False)
+        }
+        _vérifier(parcourus == tous - exclus, f"parcours avec {motif!r} : {sorted(parcourus)}")
+        historiques = {
+            chemin[len("src/") :]
+            for chemin in compter_loc.fichiers_révision(dépôt, "HEAD", ["src"], exclusions)
+        }
+        _vérifier(
+            historiques == parcourus, f"historique avec {motif!r} : {sorted(historiques)}"
+        )
+
+    # Seul le dossier `out` à la base d'une racine est écarté par défaut, et une négation
+    # d'un .gitignore ne réinclut pas ce que --exclure écarte.
+    autre = dossier / "sorties"
+    _écrire_java(autre, "out", "Compilee")
+    _écrire_java(autre, "app.out", "Sortie")
+    _écrire_java(autre, "app.secret", "Cle")
+    (autre / ".gitignore").write_text("!secret/\n!Cle.java\n", encoding="utf-8")
+    exclusions = compter_loc.EXCLUSIONS_PAR_DÉFAUT + ("secret/",)
+    parcourus = {
+        compter_loc.chemin_relatif(fichier, autre)
+        for fichier in compter_loc.iterer_fichiers([autre], exclusions)
+    }
+    _vérifier(parcourus == {"app/out/Sortie.java"}, f"exclusions par défaut : {parcourus}")
+
+    # Avec plusieurs processus, l'analyse commence avant la fin du parcours : le premier
+    # résultat arrive alors que la plupart des fichiers n'ont pas encore été produits.
+    for numéro in range(200):
+        _écrire_java(dossier / "flux", "flux", f"Classe{numéro}")
+    produits = 0
+
+    def parcourir() -> Iterator[Path]:
+        nonlocal produits
+        for fichier in compter_loc.iterer_fichiers([dossier / "flux"]):
+            produits += 1
+            yield fichier
+
+    analyses = compter_loc.iterer_analyses(parcourir(), jobs=2)
+    next(analyses)
+    _vérifier(produits < 200, f"{produits} fichiers parcourus avant le premier résultat")
+    _vérifier(len(list(analyses)) == 199, "des analyses ont été perdues en route")
+
+
+def vérifier_dégradés(dossier: Path) -> None:
+    racine = dossier / "src"
+    généré = racine / "Genere.java"
+    généré.parent.mkdir(parents=True)
+    généré.write_text(
+        "// Generated by the protocol buffer compiler.  DO NOT EDIT!\n"
+        "public class Genere { int f() { return 1; } }\n",
+        encoding="utf-8",
+    )
+    ordinaire = _écrire_java(racine, "app", "Ordinaire")
+    ordinaire.write_text(
+        ordinaire.read_text(encoding="utf-8").replace(
+            "return a;", 'return "do not edit".length() + a; // generated by the caller'
+        ),
+        encoding="utf-8",
+    )
+    # Seul l'en-tête de générateur dégrade ; un fichier sans paquet reste dans (default).
+    analyses = {
+        analyse.entrée.chemin: analyse
+        for analyse in compter_loc.iterer_analyses(compter_loc.iterer_fichiers([racine]))
+    }
+    dégradée = analyses[généré]
+    _vérifier(
+        dégradée.dégradation is not None and dégradée.package == "(default)",
+        f"fichier généré mal traité : {dégradée}",
+    )
+    _vérifier(
+        analyses[ordinaire].dégradation is None,
+        f"fichier ordinaire dégradé : {analyses[ordinaire].dégradation}",
+    )
+
+    # Une analyse mise en cache sous d'autres limites n'est pas resservie.
+    cache = compter_loc.CacheAnalyse(dossier / "cache")
+    sans_limites = compter_loc.LimitesFichier(détecter_générés=False)
+    list(compter_loc.iterer_analyses([généré], cache=cache, limites=sans_limites))
+    _vérifier(
+        cache.est_à_jour(généré, limites=sans_limites), "l'analyse n'a pas été mise en cache"
+    )
+    _vérifier(
+        not cache.est_à_jour(généré),
+        "analyse complète resservie alors que les limites dégradent le fichier",
+    )
+    (analyse,) = compter_loc.iterer_analyses([généré], cache=cache)
+    _vérifier(analyse.dégradation is not None, "limites ignorées à la relecture du cache")
+
+    # La ligne trop longue est trouvée même en dernière position, sans fin de ligne.
+    longue = racine / "Longue.java"
+    longue.write_bytes(b"class Longue {\n}\n" + b"/" * 40)
+    bornée = compter_loc.LimitesFichier(longueur_ligne_max=39)
+    analyse = compter_loc.analyser_fichier(longue, limites=bornée)
+    _vérifier(
+        analyse.dégradation == "ligne de 40 octets", f"ligne longue : {analyse.dégradation}"
+    )
+    tolérante = replace(bornée, longueur_ligne_max=40)
+    analyse = compter_loc.analyser_fichier(longue, limites=tolérante)
+    _vérifier(
+        analyse.dégradation is None, f"ligne à la limite dégradée : {analyse.dégradation}"
+    )
+
+    # Une seule ligne démesurée n'échappe pas à l'échéance du lexeur.
+    try:
+        compter_loc.analyser_texte_java(longue, "int a;" * 10000, time.perf_counter() - 1)
+    except compter_loc.DélaiDépassé:
+        pass
+    else:
+        raise ÉchecVérification("échéance ignorée sur une ligne unique")
+
+
+class _NombreAppels(compter_loc.VisiteurMétrique):
+    # Métrique hors du jeu par défaut : ses valeurs doivent suivre tout le chemin d'analyse.
+    noms = ("appels",)
+
+    def ouvrir(self, profondeur: int) -> List[int]:
+        return [0]
+
+    def visiter(
+        self, état: List[int], jetons: Sequence[compter_loc.Jeton], profondeur: int
+    ) -> None:
+        état[0] += sum(1 for _, texte, _ in jetons if texte == "(")
+
+    def fusionner(self, état: List[int], état_méthode: List[int]) -> None:
+        état[0] += état_méthode[0]
+
+    def valeurs(self, état: List[int]) -> tuple:
+        return (état[0],)
+
+
+def vérifier_visiteurs(dossier: Path) -> None:
+    racine = dossier / "src"
+    _écrire_java(racine, "app", "Client", ["lib.Service"])
+    _écrire_java(racine, "lib", "Service")
+    fichiers = list(compter_loc.iterer_fichiers([racine]))
+    cache = compter_loc.CacheAnalyse(dossier / "cache")
+    visiteurs = (compter_loc.VISITEURS_PAR_NOM["complexite"], _NombreAppels())
+    for _ in range(2):
+        # Le second passage relit le cache : il doit avoir retenu les visiteurs employés.
+        analyses = list(compter_loc.iterer_analyses(fichiers, cache=cache, visiteurs=visiteurs))
+        noms = {nom for analyse in analyses for cls in analyse.classes for nom, _ in cls.métriques}
+        _vérifier(noms == {"complexité", "appels"}, f"métriques inattendues : {sorted(noms)}")
+    défaut = list(compter_loc.iterer_analyses(fichiers, cache=cache))
+    noms = {nom for analyse in défaut for cls in analyse.classes for nom, _ in cls.métriques}
+    _vérifier(
+        "imbrication" in noms and "appels" not in noms,
+        "analyse en cache réutilisée pour un autre jeu de visiteurs",
+    )
+    # Les tables en colonnes rendent les métriques telles que l'analyse les a produites,
+    # y compris pour un jeu de visiteurs qu'elles ne connaissaient pas à leur création.
+    jeux = ((visiteurs, analyses), (compter_loc.VISITEURS_MÉTRIQUES, analyses + défaut))
+    for jeu, liste in jeux:
+        résultat = compter_loc.fusionner_analyses(liste, visiteurs=jeu)
+        attendues = [méthode for analyse in liste for méthode in analyse.méthodes]
+        _vérifier(list(résultat.méthodes) == attendues, "métriques des méthodes altérées")
+        attendues = [cls for analyse in liste for cls in analyse.classes]
+        _vérifier(list(résultat.classes) == attendues, "métriques des classes altérées")
+    sortie = io.StringIO()
+    compter_loc.émettre_flux(analyses, compter_loc.ÉcrivainFlux(sortie, "csv", visiteurs))
+    entête = sortie.getvalue().splitlines()[0].split(",")
+    _vérifier("appels" in entête and "imbrication" not in entête, f"colonnes : {entête}")
+
+
+def vérifier_structure(dossier: Path) -> None:
+    # Deux classes internes homonymes dans des classes différentes restent distinctes.
+    fichier = dossier / "Externe.java"
+    fichier.write_text(
+        "class A {\n"
+        "    static class Noeud { void visiter() { } }\n"
+        "}\n"
+        "class B {\n"
+        "    static class Noeud { void visiter() { } }\n"
+        "}\n",
+        encoding="utf-8",
+    )
+    analyse = compter_loc.analyser_fichier(fichier)
+    classes = sorted(méthode.classe for méthode in analyse.méthodes)
+    _vérifier(classes == ["A.Noeud", "B.Noeud"], f"méthodes mal rattachées : {classes}")
+
+    # Une suite de lignes répétées n'est pas rapportée comme un bloc qui se recouvre.
+    répété = dossier / "Repete.java"
+    répété.write_text(
+        "class Repete {\n    void f() {\n"
+        + "        total += appel(valeur);\n" * 30
+        + "    }\n}\n",
+        encoding="utf-8",
+    )
+    rapport = compter_loc.détecter_duplications(
+        [compter_loc.analyser_fichier(répété, avec_lignes=True)]
+    )
+    blocs = [(bloc.début, bloc.fin, bloc.début_copie, bloc.fin_copie) for bloc in rapport.blocs]
+    _vérifier(
+        bool(blocs) and all(fin < début_copie for _, fin, début_copie, _ in blocs),
+        f"blocs qui se recouvrent : {blocs}",
+    )
+
+    # Une longue table constante n'est appariée qu'une fois : un seul bloc, sa moitié.
+    table = dossier / "Table.java"
+    table.write_text(
+        "class Table {\n    int[] t = {\n" + "        0, 0, 0,\n" * 4000 + "    };\n}\n",
+        encoding="utf-8",
+    )
+    rapport = compter_loc.détecter_duplications(
+        [compter_loc.analyser_fichier(table, avec_lignes=True)]
+    )
+    blocs = [(bloc.lignes, bloc.début, bloc.début_copie) for bloc in rapport.blocs]
+    _vérifier(blocs == [(2000, 3, 2003)], f"table constante : {blocs}")
+
+    # Les empreintes de lignes ne sont calculées et mises en cache que pour --duplication.
+    cache = compter_loc.CacheAnalyse(dossier / "cache")
+    (analyse,) = compter_loc.iterer_analyses([répété], cache=cache)
+    _vérifier(analyse.lignes is None, "empreintes de lignes calculées sans --duplication")
+    _vérifier(
+        not cache.est_à_jour(répété, avec_lignes=True),
+        "analyse sans empreintes de lignes resservie pour --duplication",
+    )
+    (analyse,) = compter_loc.iterer_analyses([répété], cache=cache, avec_lignes=True)
+    _vérifier(analyse.lignes is not None, "empreintes de lignes absentes avec --duplication")
+    (analyse,) = compter_loc.iterer_analyses([répété], cache=cache)
+    _vérifier(analyse.lignes is None, "empreintes de lignes restituées sans --duplication")
+
+    # Sans historique git, la volatilité est absente plutôt qu'inventée.
+    résultat = compter_loc.fusionner_analyses(compter_loc.iterer_analyses([fichier, répété]))
+    métriques = compter_loc.calculer_metriques_packages(résultat.packages)
+    _vérifier(
+        all(métrique.volatility is None for métrique in métriques),
+        f"volatilité sans historique : {[m.volatility for m in métriques]}",
+    )
+    sortie = io.StringIO()
+    with contextlib.redirect_stdout(sortie):
+        compter_loc.afficher_metriques_packages("Paquets", métriques)
+    ligne = sortie.getvalue().splitlines()[-2].split()
+    _vérifier(ligne[-2] == "-", f"volatilité absente mal affichée : {ligne}")
+
+
+def vérifier_parts(dossier: Path) -> None:
+    # Chaque part est analysée par un processus séparé, comme sur des machines distinctes ;
+    # une racine hors de la base ("../autre") vérifie que les chemins sont rebâtis tels que
+    # le parcours les produit.
+    projet = dossier / "projet"
+    for numéro in range(12):
+        _écrire_java(projet / "src", f"app.m{numéro % 3}", f"C{numéro}", [f"lib.L{numéro}"])
+        _écrire_java(dossier / "autre", "lib", f"L{numéro}")
+    configuration = projet / "partitions.json"
+    configuration.write_text(
+        '{"racine": ".", "partitions": ['
+        '{"nom": "app", "racines": ["src"]}, {"nom": "lib", "racines": ["../autre"]}]}',
+        encoding="utf-8",
+    )
+    script = [sys.executable, compter_loc.__file__, "--partitions", str(configuration)]
+
+    def lancer(*arguments: str) -> bytes:
+        return subprocess.run(script + list(arguments), check=True, capture_output=True).stdout
+
+    nb_parts = 3
+    partiels = [str(dossier / f"part{numéro}.gz") for numéro in range(1, nb_parts + 1)]
+    for numéro, partiel in enumerate(partiels, 1):
+        lancer("--shard", f"{numéro}/{nb_parts}", "-o", partiel)
+    # Des parts sans empreintes de lignes ne peuvent pas servir à --duplication.
+    refus = subprocess.run(
+        script + ["--duplication", "--fusionner", *partiels], capture_output=True
+    )
+    _vérifier(
+        refus.returncode != 0 and b"sans --duplication" in refus.stderr,
+        "parts sans empreintes de lignes acceptées pour --duplication",
+    )
+    for numéro, partiel in enumerate(partiels, 1):
+        lancer("--shard", f"{numéro}/{nb_parts}", "--duplication", "-o", partiel)
+    for format_sortie in ("texte", "jsonl", "csv"):
+        seul = lancer("--format", format_sortie, "--duplication")
+        fusionné = lancer("--format", format_sortie, "--duplication", "--fusionner", *partiels)
+        _vérifier(seul == fusionné, f"fusion des parts différente en {format_sortie}")
+        _vérifier(b"../autre/lib/L0.java" in seul, f"chemin hors base absent en {format_sortie}")
+
+
+VÉRIFICATIONS: Dict[str, Callable[[Path], None]] = {
+    "veille": vérifier_veille,
+    "parcours": vérifier_parcours,
+    "dégradés": vérifier_dégradés,
+    "structure": vérifier_structure,
+    "visiteurs": vérifier_visiteurs,
+    "parts": vérifier_parts,
+}
+
+
+def main(arguments: Optional[Sequence[str]] = None) -> int:
+    parseur = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parseur.add_argument(
+        "noms",
+        nargs="*",
+        metavar="VÉRIFICATION",
+        help=f"parmi : {', '.join(VÉRIFICATIONS)} (toutes par défaut)",
+    )
+    options = parseur.parse_args(arguments)
+    inconnues = [nom for nom in options.noms if nom not in VÉRIFICATIONS]
+    if inconnues:
+        parseur.error(f"vérification inconnue : {', '.join(inconnues)}")
+    échecs = 0
+    for nom in options.noms or VÉRIFICATIONS:
+        with tempfile.TemporaryDirectory(prefix="verifier_loc_") as temporaire:
+            try:
+                VÉRIFICATIONS[nom](Path(temporaire))
+            except ÉchecVérification as erreur:
+                échecs += 1
+                print(f"{nom} : ÉCHEC — {erreur}")
+            else:
+                print(f"{nom} : ok")
+    return 1 if échecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())